@@ -0,0 +1,41 @@
+import logging
+import redis
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from .tokens import TOKEN_VERSION_CLAIM, get_token_version, user_claims
+
+logger = logging.getLogger(__name__)
+
+
+class ClaimsUser(TokenUser):
+    """Usuário montado só com as claims do token (role, is_admin, name, phone, email, barber_id).
+
+    Não é uma instância de User: filtros usam `client_id=user.pk` e
+    `barber_id=user.barber_id`.
+    """
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """JWT sem consulta ao banco: o usuário vem das claims e a revogação, do Redis.
+
+    Tokens emitidos antes das claims (sem `ver`) ainda são aceitos: o usuário é
+    lido do banco uma vez por requisição, como no JWTAuthentication, até expirarem.
+    """
+
+    def get_user(self, validated_token):
+        if TOKEN_VERSION_CLAIM not in validated_token:
+            user = super().get_user(validated_token)
+            for claim, value in user_claims(user).items():
+                validated_token[claim] = value
+            return ClaimsUser(validated_token)
+
+        user = ClaimsUser(validated_token)
+        try:
+            current = get_token_version(user.pk)
+        except redis.RedisError:
+            logger.warning("Redis indisponível, aceitando token sem checar revogação.", exc_info=True)
+            return user
+        if validated_token[TOKEN_VERSION_CLAIM] != current:
+            raise AuthenticationFailed("Sessão encerrada. Faça login novamente.", code="token_revoked")
+        return user
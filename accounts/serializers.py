@@ -1,8 +1,9 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
 from core.utils import generate_code, clean_phone, validate_code
 from core.choices import UserRole
+from messaging.outbox import queue_message
 from .models import User
+from .tokens import issue_tokens
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -35,10 +36,8 @@ class LoginSerializer(serializers.Serializer):
         if role_desejado == "client" and user.role not in [UserRole.CLIENT, UserRole.BARBER] and not user.is_admin:
             raise serializers.ValidationError("Não é possível acessar como cliente.")
 
-        refresh = RefreshToken.for_user(user)
         return {
-            "access": str(refresh.access_token),
-            "refresh": str(refresh),
+            **issue_tokens(user),
             "user": UserSerializer(user).data
         }
 
@@ -69,7 +68,8 @@ class SendLoginCodeSerializer(serializers.Serializer):
         if role_in == "client" and user_role not in ["client", "barber", "admin"]:
             raise serializers.ValidationError("Não é possível acessar como cliente.")
 
-        generate_code(phone, f"login_code:{phone}",)
+        if generate_code(phone, f"login_code:{phone}"):
+            queue_message(phone, "login_code")
 
         return {"role": user_role, "is_admin": user.is_admin}
 
@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from barbers.models import Barber
+from .models import User
+from .tokens import revoke_tokens
+
+# Campos copiados para as claims do token ou que decidem se ele ainda vale.
+TOKEN_FIELDS = ("role", "is_admin", "name", "phone", "email", "is_active")
+
+
+@receiver(pre_save, sender=User)
+def revoke_tokens_on_user_change(sender, instance, **kwargs):
+    if instance._state.adding:
+        return
+    old = User.objects.filter(pk=instance.pk).values(*TOKEN_FIELDS).first()
+    if old and any(old[field] != getattr(instance, field) for field in TOKEN_FIELDS):
+        transaction.on_commit(lambda: revoke_tokens(instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def revoke_tokens_on_user_delete(sender, instance, **kwargs):
+    transaction.on_commit(lambda: revoke_tokens(instance.pk))
+
+
+@receiver(post_save, sender=Barber)
+@receiver(post_delete, sender=Barber)
+def revoke_tokens_on_barber_change(sender, instance, created=True, **kwargs):
+    # Só criar ou remover o barbeiro muda a claim barber_id.
+    if created:
+        transaction.on_commit(lambda: revoke_tokens(instance.user_id))
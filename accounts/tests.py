@@ -0,0 +1,142 @@
+from unittest import skipIf
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework import serializers
+from core.redis_client import InMemoryRedis, reset_redis
+from core.utils import CODE_MAX_ATTEMPTS, GENERATE_CODE_SCRIPT, VALIDATE_CODE_SCRIPT, generate_code, validate_code
+from .models import User
+from .tokens import get_token_version, issue_tokens, revoke_tokens
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+PHONE = "21999990001"
+KEY = f"login_code:{PHONE}"
+
+
+class LoginCodeTestsMixin:
+    """Regras do código de login, rodadas contra cada implementação dos scripts."""
+
+    def make_redis(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.r = self.make_redis()
+
+    def generate(self):
+        return generate_code(PHONE, KEY, r=self.r)
+
+    def validate(self, code):
+        try:
+            return validate_code(code, KEY, PHONE, r=self.r)
+        except serializers.ValidationError as exc:
+            return str(exc.detail[0])
+
+    def test_resend_within_cooldown_keeps_the_first_code(self):
+        code = self.generate()
+        self.assertEqual(len(code), 6)
+        self.assertIsNone(self.generate())
+        self.assertEqual(self.r.get(KEY), code.encode())
+
+        self.r.delete(f"{KEY}:cooldown")
+        self.assertIsNotNone(self.generate())
+
+    def test_right_code_is_consumed(self):
+        code = self.generate()
+        self.assertIs(self.validate(code), True)
+        self.assertEqual(self.validate(code), "O código informado está incorreto ou expirado.")
+        # Consumir libera o reenvio na hora.
+        self.assertIsNotNone(self.generate())
+
+    def test_locks_out_after_max_attempts(self):
+        code = self.generate()
+        wrong = "000000" if code != "000000" else "111111"
+        for _ in range(CODE_MAX_ATTEMPTS):
+            self.assertEqual(self.validate(wrong), "O código informado está incorreto ou expirado.")
+        self.assertEqual(self.validate(code), "Muitas tentativas inválidas. Tente novamente em alguns minutos.")
+        self.assertEqual(self.r.get(KEY), code.encode())
+        self.assertGreater(self.r.ttl(f"login_attempts:{PHONE}"), 0)
+
+
+class InMemoryLoginCodeTests(LoginCodeTestsMixin, SimpleTestCase):
+    def make_redis(self):
+        return InMemoryRedis()
+
+
+class LuaLoginCodeTests(LoginCodeTestsMixin, SimpleTestCase):
+    def make_redis(self):
+        if fakeredis is None:
+            self.skipTest("fakeredis não instalado")
+        return fakeredis.FakeRedis()
+
+
+@skipIf(fakeredis is None, "fakeredis não instalado")
+class LoginCodeScriptParityTests(SimpleTestCase):
+    """O Lua e a versão Python dos scripts dão o mesmo resultado para a mesma sequência de chamadas."""
+    keys = [KEY, f"login_attempts:{PHONE}", f"{KEY}:cooldown"]
+
+    def run_steps(self, r):
+        generate = lambda code: GENERATE_CODE_SCRIPT(r, keys=[KEY, f"{KEY}:cooldown"], args=[code, 300, 60])
+        validate = lambda code: VALIDATE_CODE_SCRIPT(r, keys=self.keys, args=[code, 3, 300])
+        results = [
+            generate("123456"), generate("654321"), validate("000000"), validate("123456"),
+            validate("123456"), generate("222222"), validate("000000"), validate("000000"),
+            validate("000000"), validate("222222"), r.get(KEY), r.get(self.keys[1]),
+        ]
+        r.delete(self.keys[1])
+        return results + [validate("222222"), r.exists(*self.keys)]
+
+    def test_same_results(self):
+        self.assertEqual(self.run_steps(fakeredis.FakeRedis()), self.run_steps(InMemoryRedis()))
+
+
+@override_settings(REDIS_URL="memory://")
+class StatelessJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        reset_redis()
+        self.addCleanup(reset_redis)
+        self.user = User.objects.create_user(phone=PHONE, name="Cliente")
+
+    def me(self, token):
+        return self.client.get("/api/v1/auth/me/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_authenticates_from_claims_without_queries(self):
+        token = issue_tokens(self.user)["access"]
+        with self.assertNumQueries(0):
+            response = self.me(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["phone"], PHONE)
+
+        # Só o SELECT da listagem: o usuário vem do token.
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/v1/appointments/me/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.status_code, 200)
+
+    def test_revoked_token_is_rejected(self):
+        token = issue_tokens(self.user)["access"]
+        revoke_tokens(self.user.pk)
+
+        response = self.me(token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["code"], "token_revoked")
+        self.assertEqual(self.me(issue_tokens(self.user)["access"]).status_code, 200)
+
+    def test_claim_field_change_revokes_tokens(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.last_login = None
+            self.user.save()
+        self.assertEqual(get_token_version(self.user.pk), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.name = "Outro Nome"
+            self.user.save()
+        self.assertEqual(get_token_version(self.user.pk), 1)
+
+    def test_legacy_token_without_version_reads_the_user(self):
+        token = AccessToken.for_user(self.user)
+        with self.assertNumQueries(2):
+            response = self.me(str(token))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["name"], "Cliente")
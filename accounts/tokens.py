@@ -0,0 +1,58 @@
+"""Emissão e revogação dos tokens JWT.
+
+O token carrega tudo o que as views autenticadas usam do usuário (papel, nome,
+telefone, id do barbeiro), então a autenticação não precisa ir ao banco (ver
+accounts/authentication.py). Para revogar, cada usuário tem um contador em
+`token_version:{id}` no Redis: o token guarda o valor da emissão na claim
+`ver`, e incrementar o contador invalida todos os tokens anteriores.
+"""
+import logging
+import redis
+from rest_framework_simplejwt.tokens import RefreshToken
+from barbers.models import Barber
+from core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION_CLAIM = "ver"
+
+
+def token_version_key(user_id):
+    return f"token_version:{user_id}"
+
+
+def get_token_version(user_id, r=None):
+    r = r or get_redis()
+    return int(r.get(token_version_key(user_id)) or 0)
+
+
+def revoke_tokens(user_id, r=None):
+    """Invalida todos os tokens já emitidos para o usuário."""
+    r = r or get_redis()
+    try:
+        r.incr(token_version_key(user_id))
+    except redis.RedisError:
+        logger.warning("Não foi possível revogar os tokens de %s.", user_id, exc_info=True)
+
+
+def user_claims(user):
+    return {
+        "role": user.role,
+        "is_admin": user.is_admin,
+        "name": user.name,
+        "phone": user.phone,
+        "email": user.email,
+        "barber_id": Barber.objects.filter(user=user).values_list("id", flat=True).first(),
+    }
+
+
+def issue_tokens(user):
+    """Par access/refresh com as claims do usuário e a versão atual dos tokens dele."""
+    refresh = RefreshToken.for_user(user)
+    for claim, value in user_claims(user).items():
+        refresh[claim] = value
+    try:
+        refresh[TOKEN_VERSION_CLAIM] = get_token_version(user.pk)
+    except redis.RedisError:
+        logger.warning("Redis indisponível, emitindo token de %s sem versão.", user.pk, exc_info=True)
+    return {"access": str(refresh.access_token), "refresh": str(refresh)}
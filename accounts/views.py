@@ -1,8 +1,10 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
+from core.throttling import IPRateThrottle, PhoneRateThrottle
 from core.utils import clean_phone
 from . import serializers, models
+from .authentication import StatelessJWTAuthentication
 
 
 class LoginView(APIView):
@@ -14,6 +16,9 @@ class LoginView(APIView):
 
 
 class SendLoginCodeView(APIView):
+    throttle_classes = [IPRateThrottle, PhoneRateThrottle]
+    throttle_scope = "login_code"
+
     def post(self, request):
         serializer = serializers.SendLoginCodeSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
@@ -22,6 +27,9 @@ class SendLoginCodeView(APIView):
 
 
 class ClientCheckView(APIView):
+    throttle_classes = [IPRateThrottle, PhoneRateThrottle]
+    throttle_scope = "client_check"
+
     def get(self, request):
         raw_phone = request.query_params.get("phone", "")
         phone = clean_phone(raw_phone)
@@ -35,6 +43,7 @@ class ClientCheckView(APIView):
 
 
 class MeView(APIView):
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
@@ -0,0 +1,177 @@
+from functools import cached_property
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from accounts.models import User
+from barbers.occupancy import get_busy_masks, time_mask
+from core.choices import AppointmentStatus
+from core.intervals import to_minutes
+from core.utils import load_shifts, compute_day_slots, get_slot_holds
+from plans.entitlements import get_entitlement, invalidate_entitlement
+from plans.ledger import consume_credit
+from services.models import Service
+from .models import Appointment
+
+
+class BookingError(Exception):
+    """Falha ao gravar um agendamento já validado."""
+
+
+class SlotUnavailable(BookingError):
+    """O banco recusou o horário: outro agendamento ocupa parte do intervalo."""
+
+
+class CreditUnavailable(BookingError):
+    """O crédito do plano acabou entre a validação e a gravação."""
+
+
+# Restrições que barram dois agendamentos no mesmo trecho (ver migração 0004).
+SLOT_CONSTRAINTS = ("appointment_no_overlap", "unique_appointment_slot")
+
+
+def is_slot_conflict(exc):
+    """Se o IntegrityError veio de uma das SLOT_CONSTRAINTS, e não de outra restrição da transação."""
+    constraint = getattr(getattr(exc.__cause__, "diag", None), "constraint_name", None)
+    if constraint:
+        return constraint in SLOT_CONSTRAINTS
+    # SQLite: o trigger levanta o nome da restrição; o índice único cita as colunas.
+    message = str(exc)
+    return (
+        any(name in message for name in SLOT_CONSTRAINTS)
+        or "UNIQUE constraint failed: appointments_appointment.barber_id" in message
+    )
+
+
+def commit_booking(client, barber_id, service, date, start_time, end_time, credit_id=None, subscription_id=None):
+    """Grava o agendamento e consome o crédito do plano numa única transação.
+
+    Não há checagem prévia de conflito: a sobreposição é barrada pelo banco
+    (ver migração 0004) e o crédito só é consumido se ainda houver saldo
+    (plans.ledger.consume_credit). Qualquer uma das falhas desfaz a transação inteira;
+    outros erros de integridade sobem como estão.
+    """
+    try:
+        with transaction.atomic():
+            appointment = Appointment.objects.create(
+                client_id=client.pk,
+                service=service,
+                barber_id=barber_id,
+                date=date,
+                start_time=start_time,
+                end_time=end_time,
+                status=AppointmentStatus.SCHEDULED,
+                paid_with_plan=credit_id is not None,
+                plan_subscription_id=subscription_id,
+            )
+            if credit_id is not None:
+                if not consume_credit(credit_id, appointment):
+                    raise CreditUnavailable("Você não possui créditos disponíveis para este serviço.")
+                transaction.on_commit(lambda: invalidate_entitlement(client.phone))
+    except IntegrityError as exc:
+        if not is_slot_conflict(exc):
+            raise
+        raise SlotUnavailable("Esse horário não está mais disponível.") from exc
+    return appointment
+
+
+class BookingContext:
+    """Dados de uma tentativa de agendamento, carregados no máximo uma vez por requisição.
+
+    AppointmentCreateSerializer e AppointmentConfirmSerializer fazem todas as
+    consultas por aqui: cliente, serviço, expediente e ocupação do dia custam uma
+    consulta cada, por mais validações que os usem. Assinatura, benefícios e
+    créditos vêm juntos do retrato de plano do cliente (plans/entitlements.py).
+    """
+
+    def __init__(self, request, phone, barber_id, date):
+        self.request = request
+        self.is_public = not request.user.is_authenticated
+        self.phone = phone
+        self.barber_id = int(barber_id)
+        self.date = date
+        self._services = {}
+
+    @cached_property
+    def client(self):
+        """Cliente do agendamento: o User do telefone ou, autenticado, o ClaimsUser do token."""
+        if not self.is_public:
+            return self.request.user
+        return User.objects.filter(phone=self.phone).first()
+
+    def has_open_appointment(self):
+        if self.client is None:
+            return False
+        status = [AppointmentStatus.PENDING, AppointmentStatus.SCHEDULED]
+        # Agendados de dias passados ainda não encerrados (close_past_appointments) não contam.
+        return Appointment.objects.filter(
+            client_id=self.client.pk, status__in=status, date__gte=timezone.localdate()
+        ).exists()
+
+    def service(self, service_id):
+        if service_id not in self._services:
+            self._services[service_id] = Service.objects.filter(id=service_id).first()
+        return self._services[service_id]
+
+    @cached_property
+    def _schedule(self):
+        shifts, slot_intervals = load_shifts([self.barber_id], [self.date.weekday()])
+        return shifts.get((self.barber_id, self.date.weekday()), []), slot_intervals.get(self.barber_id)
+
+    @property
+    def shifts(self):
+        return self._schedule[0]
+
+    @cached_property
+    def busy_mask(self):
+        if not self.shifts:
+            return 0
+        return get_busy_masks([(self.barber_id, self.date)])[(self.barber_id, self.date)]
+
+    @property
+    def hold_owner(self):
+        return self.phone or self.client.phone
+
+    @cached_property
+    def holds(self):
+        """Trechos do dia segurados por outros clientes que ainda não confirmaram."""
+        holds = get_slot_holds([self.barber_id], [self.date], exclude_owner=self.hold_owner)
+        return holds.get((self.barber_id, self.date), [])
+
+    def in_shift(self, start_time):
+        minute = to_minutes(start_time)
+        return any(shift_start <= minute < shift_end for shift_start, shift_end in self.shifts)
+
+    def is_busy_at(self, start_time):
+        minute = to_minutes(start_time)
+        if self.busy_mask >> minute & 1:
+            return True
+        return any(h_start <= minute < h_end for h_start, h_end in self.holds)
+
+    def is_free(self, start_time, end_time):
+        start_min, end_min = to_minutes(start_time), to_minutes(end_time)
+        if self.busy_mask & time_mask(start_time, end_time):
+            return False
+        return not any(h_start < end_min and h_end > start_min for h_start, h_end in self.holds)
+
+    def available_slots(self, service):
+        return compute_day_slots(
+            self.date, self.shifts, self.busy_mask, int(service.duration), self._schedule[1], holds=self.holds
+        )
+
+    @cached_property
+    def entitlement(self):
+        if self.client is None:
+            return None
+        return get_entitlement(self.client.phone)
+
+    @property
+    def subscription(self):
+        """Assinatura ativa na data do agendamento (plans.entitlements.Subscription)."""
+        if self.entitlement is None:
+            return None
+        return self.entitlement.subscription(self.date)
+
+    def benefit(self, service):
+        """Benefício do plano para o serviço, já com o saldo de crédito."""
+        if self.subscription is None:
+            return None
+        return self.subscription.benefit(service.id)
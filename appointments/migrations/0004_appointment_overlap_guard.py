@@ -0,0 +1,89 @@
+# Generated by Django 5.2.5 on 2026-10-17 14:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+POSTGRES_GUARD = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    """
+    ALTER TABLE appointments_appointment
+    ADD CONSTRAINT appointment_no_overlap
+    EXCLUDE USING gist (
+        barber_id WITH =,
+        tsrange(date + start_time, date + end_time, '[)') WITH &&
+    ) WHERE (status <> 'canceled')
+    """,
+]
+
+SQLITE_GUARD = [
+    """
+    CREATE TRIGGER appointment_no_overlap_insert
+    BEFORE INSERT ON appointments_appointment
+    WHEN NEW.status <> 'canceled' AND EXISTS (
+        SELECT 1 FROM appointments_appointment
+        WHERE barber_id = NEW.barber_id AND date = NEW.date AND status <> 'canceled'
+        AND start_time < NEW.end_time AND end_time > NEW.start_time
+    )
+    BEGIN
+        SELECT RAISE(ABORT, 'appointment_no_overlap');
+    END
+    """,
+    """
+    CREATE TRIGGER appointment_no_overlap_update
+    BEFORE UPDATE OF barber_id, date, start_time, end_time, status ON appointments_appointment
+    WHEN NEW.status <> 'canceled' AND EXISTS (
+        SELECT 1 FROM appointments_appointment
+        WHERE id <> NEW.id AND barber_id = NEW.barber_id AND date = NEW.date AND status <> 'canceled'
+        AND start_time < NEW.end_time AND end_time > NEW.start_time
+    )
+    BEGIN
+        SELECT RAISE(ABORT, 'appointment_no_overlap');
+    END
+    """,
+]
+
+
+def add_overlap_guard(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = POSTGRES_GUARD if vendor == 'postgresql' else SQLITE_GUARD if vendor == 'sqlite' else []
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def remove_overlap_guard(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("ALTER TABLE appointments_appointment DROP CONSTRAINT IF EXISTS appointment_no_overlap")
+    elif vendor == 'sqlite':
+        schema_editor.execute("DROP TRIGGER IF EXISTS appointment_no_overlap_insert")
+        schema_editor.execute("DROP TRIGGER IF EXISTS appointment_no_overlap_update")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0003_appointment_paid_with_plan_and_more'),
+        ('barbers', '0006_dailyoccupancy'),
+        ('plans', '0002_remove_plan_price_original_plansubscription_and_more'),
+        ('services', '0003_service_is_popular'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='appointment',
+            name='unique_appointment_slot',
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='service',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='appointments', to='services.service'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'canceled'), _negated=True), fields=('barber', 'date', 'start_time'), name='unique_appointment_slot'),
+        ),
+        migrations.RunPython(add_overlap_guard, remove_overlap_guard),
+    ]
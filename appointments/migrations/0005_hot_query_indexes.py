@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-17 14:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0004_appointment_overlap_guard'),
+        ('barbers', '0007_hot_query_indexes'),
+        ('plans', '0003_hot_query_indexes'),
+        ('services', '0003_service_is_popular'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['barber', 'date', 'status'], name='appt_barber_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['client', 'status'], name='appt_client_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'created_at'], name='appt_status_created_idx'),
+        ),
+    ]
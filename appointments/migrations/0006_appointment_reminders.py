@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-17 15:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_hot_query_indexes'),
+        ('barbers', '0007_hot_query_indexes'),
+        ('plans', '0007_plan_credit_ledger'),
+        ('services', '0003_service_is_popular'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='reminded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'date', 'start_time'], name='appt_status_date_start_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0006_appointment_reminders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='checked_in_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -22,6 +22,11 @@ class Appointment(models.Model):
     canceled_at = models.DateTimeField(blank=True, null=True)
     canceled_by = models.CharField(max_length=20, choices=UserRole.choices, blank=True, null=True)
 
+    # Gravado por send_appointment_reminders ao pôr o lembrete na fila.
+    reminded_at = models.DateTimeField(blank=True, null=True)
+    # Chegada do cliente, marcada pelo barbeiro (AppointmentAttendanceView).
+    checked_in_at = models.DateTimeField(blank=True, null=True)
+
     def cancel(self, reason="", canceled_by="client"):
         self.status = AppointmentStatus.CANCELED
         self.cancel_reason = reason
@@ -33,6 +38,15 @@ class Appointment(models.Model):
         constraints = [
             models.UniqueConstraint(
                 fields=['barber', 'date', 'start_time'],
+                condition=~models.Q(status=AppointmentStatus.CANCELED),
                 name='unique_appointment_slot'
             )
         ]
+        indexes = [
+            models.Index(fields=['barber', 'date', 'status'], name='appt_barber_date_status_idx'),
+            models.Index(fields=['client', 'status'], name='appt_client_status_idx'),
+            models.Index(fields=['status', 'created_at'], name='appt_status_created_idx'),
+            models.Index(fields=['status', 'date', 'start_time'], name='appt_status_date_start_idx'),
+        ]
+        # A sobreposição de intervalos é garantida pelo banco na migração 0004
+        # (exclusion constraint no PostgreSQL, triggers no SQLite).
@@ -1,14 +1,25 @@
 from datetime import datetime, timedelta
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
-from core.utils import clean_phone, generate_code, get_available_slots, validate_code, delete_key_redis
+from core.utils import clean_phone, generate_code, validate_code, hold_slot, release_slot_hold
 from core.choices import AppointmentStatus, UserRole
-from barbers.models import WorkingHour, BlockedTime
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Coalesce
 from accounts.models import User
-from services.models import Service
+from accounts.tokens import issue_tokens
+from barbers.models import Barber
+from messaging.outbox import queue_message
+from plans.ledger import refund_credit
+from .booking import BookingContext, BookingError, commit_booking
 from .models import Appointment
 from django.utils import timezone
-from plans.models import PlanSubscription, PlanSubscriptionCredit, PlanBenefit
+
+
+CANCELED_BY_LABELS = {
+    'client': 'Cliente',
+    'barber': 'Barbeiro',
+    'admin': 'Administrador'
+}
 
 
 class AppointmentSerializer(serializers.ModelSerializer):
@@ -37,71 +48,91 @@ class AppointmentSerializer(serializers.ModelSerializer):
         }
 
     def get_canceled_by(self, obj):
-        mapping = {
-            'client': 'Cliente',
-            'barber': 'Barbeiro',
-            'admin': 'Administrador'
+        return CANCELED_BY_LABELS.get(obj.canceled_by, obj.canceled_by or '—')
+
+
+class AppointmentListSerializer(serializers.BaseSerializer):
+    """Mesma saída do AppointmentSerializer, montada direto de linhas de values().
+
+    Usado na listagem: evita instanciar modelos e os campos do DRF linha a linha.
+    """
+    VALUES = (
+        'id', 'status', 'date', 'start_time', 'end_time', 'cancel_reason', 'canceled_at', 'canceled_by',
+        'barber_id', 'barber__photo', 'barber__user__name', 'barber__user__phone',
+        'service_id', 'service__name', 'service__price', 'service__duration',
+    )
+    date_field = serializers.DateField()
+    time_field = serializers.TimeField()
+    datetime_field = serializers.DateTimeField()
+    photo_storage = Barber._meta.get_field('photo').storage
+
+    @classmethod
+    def setup_queryset(cls, queryset):
+        return queryset.values(*cls.VALUES, *queryset.query.annotations)
+
+    def to_representation(self, row):
+        canceled_at = row['canceled_at']
+        return {
+            'id': row['id'],
+            'status': row['status'],
+            'date': self.date_field.to_representation(row['date']),
+            'start_time': self.time_field.to_representation(row['start_time']),
+            'end_time': self.time_field.to_representation(row['end_time']),
+            'barber': {
+                'id': row['barber_id'],
+                'name': row['barber__user__name'],
+                'phone': row['barber__user__phone'],
+                'photo': self.photo_storage.url(row['barber__photo']) if row['barber__photo'] else None
+            },
+            'service': {
+                'id': row['service_id'],
+                'name': row['service__name'],
+                'price': float(row['service__price']),
+                'duration_min': row['service__duration']
+            },
+            'cancel_reason': row['cancel_reason'],
+            'canceled_at': self.datetime_field.to_representation(canceled_at) if canceled_at else None,
+            'canceled_by': CANCELED_BY_LABELS.get(row['canceled_by'], row['canceled_by'] or '—'),
         }
-        return mapping.get(obj.canceled_by, obj.canceled_by or '—')
 
 
-class AppointmentCreateSerializer(serializers.Serializer):
-    name = serializers.CharField(required=False, allow_blank=True)
-    phone = serializers.CharField(required=False, allow_blank=True)
-    service_id = serializers.IntegerField()
-    barber_id = serializers.IntegerField()
-    date = serializers.DateField()
-    start_time = serializers.TimeField()
-    use_plan = serializers.BooleanField(required=False, default=False)
+class BookingValidationMixin:
+    """Validações compartilhadas entre o início e a confirmação de um agendamento.
 
-    def _validate_phone(self, attrs, is_public):
-        if is_public:
-            attrs['phone'] = clean_phone(attrs.get('phone'))
-        return attrs
+    Todas leem os dados de `self.booking` (um BookingContext), criado no início
+    do validate de cada serializer.
+    """
 
-    def _check_existing_appointment(self, attrs, request, phone, is_public):
-        status = [AppointmentStatus.PENDING, AppointmentStatus.SCHEDULED]
-        if is_public:
-            phone = attrs.get('phone')
-            exists = Appointment.objects.filter(client__phone=phone, status__in=status).exists()
-        else:
-            exists = Appointment.objects.filter(client=request.user, status__in=status).exists()
-        if exists:
+    def _check_existing_appointment(self, attrs):
+        if self.booking.has_open_appointment():
             raise serializers.ValidationError('Você já tem agendamento aberto ou pendente.')
         return attrs
 
+    def _validate_service(self, attrs):
+        service = self.booking.service(attrs.get('service_id'))
+        if not service:
+            raise serializers.ValidationError('Serviço inválido ou indisponível.')
+        attrs['service'] = service
+        return attrs
+
     def _validate_availability(self, attrs):
-        date = attrs.get('date')
-        barber_id = attrs.get('barber_id')
         start_time = attrs.get('start_time')
-        weekday = date.weekday()
-        working_hours = WorkingHour.objects.only('start_time', 'end_time').filter(barber_id=barber_id, weekday=weekday).first()
 
-        if not working_hours:
+        if not self.booking.shifts:
             raise serializers.ValidationError('Barbeiro(a) não irá funcionar nesse dia.')
-        if not (working_hours.start_time <= start_time < working_hours.end_time):
+        if not self.booking.in_shift(start_time):
             raise serializers.ValidationError('Horário fora do expediente do barbeiro.')
 
-        is_blocked = BlockedTime.objects.filter(barber_id=barber_id, date=date, start_time__lte=start_time, end_time__gt=start_time).exists()
-        if is_blocked:
+        if self.booking.is_busy_at(start_time):
             raise serializers.ValidationError('Esse horário não está mais disponível.')
         return attrs
 
-    def _validate_service(self, attrs):
-        try:
-            service_id = attrs.get('service_id')
-            attrs['service'] = Service.objects.get(id=service_id)
-        except Service.DoesNotExist:
-            raise serializers.ValidationError('Serviço inválido ou indisponível.')
-        return attrs
-
     def _validate_slot(self, attrs):
-        barber_id = attrs.get('barber_id')
         date = attrs.get('date')
         start_time = attrs.get('start_time')
         service = attrs.get('service')
 
-        slots = get_available_slots(barber_id, date, service)
+        slots = self.booking.available_slots(service)
         if start_time.strftime('%H:%M') not in slots:
             raise serializers.ValidationError('Horário inválido ou indisponível.')
 
@@ -109,16 +140,12 @@ class AppointmentCreateSerializer(serializers.Serializer):
         end_dt = start_dt + timedelta(minutes=service.duration)
         end_time = end_dt.time()
 
-        conflict = Appointment.objects.filter(
-            barber_id=barber_id, date=date, start_time__lt=end_time, end_time__gt=start_time
-        ).exclude(status=AppointmentStatus.CANCELED).exists()
-
-        if conflict:
+        if not self.booking.is_free(start_time, end_time):
             raise serializers.ValidationError('Esse horário não está mais disponível.')
         attrs['end_time'] = end_time
         return attrs
 
-    def _validate_allowed_days(self, attrs, subscription):
+    def _validate_allowed_days(self, attrs):
 
         if not attrs.get("use_plan"):
             return attrs
@@ -129,92 +156,92 @@ class AppointmentCreateSerializer(serializers.Serializer):
         if not service or not appointment_date:
             return attrs
 
-        benefit = PlanBenefit.objects.filter(plan=subscription.plan, service=service).first()
+        benefit = self.booking.benefit(service)
         if not benefit:
             raise serializers.ValidationError("Este serviço não faz parte do seu plano.")
 
-        allowed_days = benefit.allowed_days or []
-        if not allowed_days:
-            return attrs
-
-        day_map = {0: "mon", 1: "tue", 2: "wed", 3: "thu", 4: "fri", 5: "sat", 6: "sun"}
-        pt_map = {"mon": "Segunda", "tue": "Terça", "wed": "Quarta", "thu": "Quinta", "fri": "Sexta", "sat": "Sábado", "sun": "Domingo"}
-
-        weekday_code = day_map[appointment_date.weekday()]
-
-        if weekday_code not in allowed_days:
-            dias_permitidos = [pt_map[d] for d in allowed_days]
-            dias_fmt = ", ".join(dias_permitidos)
+        if not benefit.allows(appointment_date):
             raise serializers.ValidationError(
-                f"Este benefício só pode ser usado em: {dias_fmt}."
+                f"Este benefício só pode ser usado em: {benefit.allowed_days_pt()}."
             )
 
         return attrs
 
-    def _validate_plan(self, attrs, request, is_public):
+    def _validate_plan(self, attrs):
         if attrs.get('use_plan'):
-            client = User.objects.filter(phone=attrs.get("phone")).first() if is_public else request.user
+            client = self.booking.client
             if not client:
                 raise serializers.ValidationError('Cliente não encontrado para o uso do plano.')
 
-            subscription = PlanSubscription.objects.filter(user=client, status='active', start_date__lte=attrs['date'], end_date__gte=attrs['date']).first()
+            subscription = self.booking.subscription
             if not subscription:
                 raise serializers.ValidationError('O cliente não possui plano ativo para esta data.')
 
-            attrs = self._validate_allowed_days(attrs, subscription)
-            service_id = attrs["service"].id
-            credits = PlanSubscriptionCredit.objects.filter(subscription=subscription, service_id=service_id).first()
+            attrs = self._validate_allowed_days(attrs)
+            benefit = self.booking.benefit(attrs["service"])
 
-            if not credits or credits.remaining() <= 0:
+            if benefit.credit_id is None or benefit.remaining() <= 0:
                 raise serializers.ValidationError("Você não possui créditos disponíveis para este serviço.")
-            attrs["plan_credit"] = credits
-            attrs["plan_subscription"] = subscription
+            attrs["plan_credit_id"] = benefit.credit_id
+            attrs["plan_subscription_id"] = subscription.id
+        return attrs
+
+
+    def _commit_booking(self, validated_data, client):
+        try:
+            return commit_booking(
+                client=client,
+                barber_id=validated_data["barber_id"],
+                service=validated_data["service"],
+                date=validated_data["date"],
+                start_time=validated_data["start_time"],
+                end_time=validated_data["end_time"],
+                credit_id=validated_data.get("plan_credit_id"),
+                subscription_id=validated_data.get("plan_subscription_id"),
+            )
+        except BookingError as exc:
+            raise serializers.ValidationError(str(exc))
+
+
+class AppointmentCreateSerializer(BookingValidationMixin, serializers.Serializer):
+    name = serializers.CharField(required=False, allow_blank=True)
+    phone = serializers.CharField(required=False, allow_blank=True)
+    service_id = serializers.IntegerField()
+    barber_id = serializers.IntegerField()
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    use_plan = serializers.BooleanField(required=False, default=False)
+
+    def _validate_phone(self, attrs, is_public):
+        if is_public:
+            attrs['phone'] = clean_phone(attrs.get('phone'))
         return attrs
 
-    def _set_plan_info(self, attrs, user_lookup):
+    def _set_plan_info(self, attrs):
         attrs["can_use_plan"] = False
         attrs["remaining_credits"] = 0
         attrs["plan_name"] = None
 
-        if not user_lookup:
+        if not self.booking.client:
             return attrs
 
-        appointment_date = attrs.get("date") or timezone.localdate()
         service = attrs.get("service")
         if not service:
             return attrs
 
-        active_plan = PlanSubscription.objects.filter(
-            user=user_lookup,
-            status="active",
-            start_date__lte=appointment_date,
-            end_date__gte=appointment_date,
-        ).first()
+        active_plan = self.booking.subscription
         if not active_plan:
             return attrs
 
-        attrs["plan_name"] = active_plan.plan.name
+        attrs["plan_name"] = active_plan.plan_name
 
-        benefit = PlanBenefit.objects.filter(
-            plan=active_plan.plan, service=service
-        ).first()
-        if not benefit:
+        benefit = self.booking.benefit(service)
+        if not benefit or not benefit.allows(attrs.get("date")):
             return attrs
 
-        allowed_days = benefit.allowed_days or []
-        if allowed_days:
-            day_map = {0: "mon", 1: "tue", 2: "wed", 3: "thu", 4: "fri", 5: "sat", 6: "sun"}
-            weekday_code = day_map[appointment_date.weekday()]
-            if weekday_code not in allowed_days:
-                return attrs
-
-        credit = PlanSubscriptionCredit.objects.filter(
-            subscription=active_plan, service=service
-        ).first()
-
-        if credit and credit.remaining() > 0:
+        if benefit.credit_id is not None and benefit.remaining() > 0:
             attrs["can_use_plan"] = True
-            attrs["remaining_credits"] = credit.remaining()
+            attrs["remaining_credits"] = benefit.remaining()
 
         return attrs
 
@@ -223,41 +250,29 @@ class AppointmentCreateSerializer(serializers.Serializer):
         is_public = not request.user.is_authenticated
 
         attrs = self._validate_phone(attrs, is_public)
-        attrs = self._check_existing_appointment(attrs, request, attrs.get("phone"), is_public)
+        self.booking = BookingContext(request, attrs.get("phone"), attrs["barber_id"], attrs["date"])
+        attrs = self._check_existing_appointment(attrs)
 
         attrs = self._validate_service(attrs)
         attrs = self._validate_availability(attrs)
         attrs = self._validate_slot(attrs)
-        attrs = self._validate_plan(attrs, request, is_public)
+        attrs = self._validate_plan(attrs)
+        attrs = self._set_plan_info(attrs)
+
+        if is_public:
+            attrs = self._hold_slot(attrs)
 
-        user_lookup = User.objects.filter(phone=attrs["phone"]).first() if is_public else request.user
-        attrs = self._set_plan_info(attrs, user_lookup)
+        return attrs
 
+    def _hold_slot(self, attrs):
+        held = hold_slot(attrs["barber_id"], attrs["date"], attrs["start_time"], attrs["end_time"], attrs["phone"])
+        if not held:
+            raise serializers.ValidationError('Esse horário está reservado por outro cliente. Escolha outro horário.')
         return attrs
 
     def _create_authenticaded_appointment(self, validated_data, request):
         user = request.user
-        service = validated_data["service"]
-        barber = validated_data["barber_id"]
-        date = validated_data["date"]
-        start_time = validated_data["start_time"]
-        end_time = validated_data["end_time"]
-        appointment = Appointment.objects.create(
-            client=user,
-            service=service,
-            barber_id=barber,
-            date=date,
-            start_time=start_time,
-            end_time=end_time,
-            status=AppointmentStatus.SCHEDULED,
-            paid_with_plan=validated_data.get("use_plan", False),
-            plan_subscription=validated_data.get("plan_credit").subscription if validated_data.get("plan_credit") else None
-        )
-
-        if validated_data.get("plan_credit"):
-            credit = validated_data["plan_credit"]
-            credit.used += 1
-            credit.save()
+        appointment = self._commit_booking(validated_data, user)
 
         return {
             "appointment_id": appointment.id,
@@ -271,12 +286,14 @@ class AppointmentCreateSerializer(serializers.Serializer):
         name = validated_data.get("name")
         phone = validated_data["phone"]
 
-        user, created = User.objects.get_or_create(
-            phone=phone,
-            defaults={"name": name, "role": UserRole.CLIENT},
-        )
+        if not self.booking.client:
+            User.objects.get_or_create(
+                phone=phone,
+                defaults={"name": name, "role": UserRole.CLIENT},
+            )
 
-        generate_code(phone, f"login_code:{phone}")
+        if generate_code(phone, f"login_code:{phone}"):
+            queue_message(phone, "login_code")
 
         return {
             "code_sent": True,
@@ -293,7 +310,7 @@ class AppointmentCreateSerializer(serializers.Serializer):
             return self._create_public_appointment(validated_data)
 
 
-class AppointmentConfirmSerializer(serializers.Serializer):
+class AppointmentConfirmSerializer(BookingValidationMixin, serializers.Serializer):
     phone = serializers.CharField()
     code = serializers.CharField()
     service_id = serializers.IntegerField()
@@ -306,138 +323,31 @@ class AppointmentConfirmSerializer(serializers.Serializer):
         attrs['phone'] = clean_phone(attrs.get('phone'))
         return attrs
 
-    def _check_existing_appointment(self, attrs, request, phone, is_public):
-        status = [AppointmentStatus.PENDING, AppointmentStatus.SCHEDULED]
-        if is_public:
-            phone = attrs.get('phone')
-            exists = Appointment.objects.filter(client__phone=phone, status__in=status).exists()
-        else:
-            exists = Appointment.objects.filter(client=request.user, status__in=status).exists()
-        if exists:
-            raise serializers.ValidationError('Você já tem agendamento aberto ou pendente.')
-        return attrs
-
     def _validate_code(self, attrs):
         code = attrs['code']
         phone = attrs['phone']
         validate_code(code, f'login_code:{phone}', phone)
         return attrs
 
-    def _validate_service(self, attrs):
-        try:
-            attrs['service'] = Service.objects.get(id=attrs['service_id'])
-        except Service.DoesNotExist:
-            raise serializers.ValidationError('Serviço inválido ou não disponivel.')
-        return attrs
-
-    def _validate_availability(self, attrs):
-        date = attrs.get('date')
-        barber_id = attrs.get('barber_id')
-        start_time = attrs.get('start_time')
-        weekday = date.weekday()
-        working_hours = WorkingHour.objects.only('start_time', 'end_time').filter(barber_id=barber_id, weekday=weekday).first()
-
-        if not working_hours:
-            raise serializers.ValidationError('Barbeiro(a) não irá funcionar nesse dia.')
-        if not (working_hours.start_time <= start_time < working_hours.end_time):
-            raise serializers.ValidationError('Horário fora do expediente do barbeiro.')
-
-        is_blocked = BlockedTime.objects.filter(barber_id=barber_id, date=date, start_time__lte=start_time, end_time__gt=start_time).exists()
-        if is_blocked:
-            raise serializers.ValidationError('Esse horário não está mais disponível.')
-        return attrs
-
-    def _validate_slot(self, attrs):
-        barber_id = attrs.get('barber_id')
-        date = attrs.get('date')
-        start_time = attrs.get('start_time')
-        service = attrs.get('service')
-
-        slots = get_available_slots(barber_id, date, service)
-        if start_time.strftime('%H:%M') not in slots:
-            raise serializers.ValidationError('Horário inválido ou indisponível.')
-
-        start_dt = datetime.combine(date, start_time)
-        end_dt = start_dt + timedelta(minutes=service.duration)
-        end_time = end_dt.time()
-
-        conflict = Appointment.objects.filter(
-            barber_id=barber_id, date=date, start_time__lt=end_time, end_time__gt=start_time
-        ).exclude(status=AppointmentStatus.CANCELED).exists()
-
-        if conflict:
-            raise serializers.ValidationError('Esse horário não está mais disponível.')
-        attrs['end_time'] = end_time
-        return attrs
-
-    def _validate_allowed_days(self, attrs, subscription):
-
-        if not attrs.get("use_plan"):
-            return attrs
-
-        service = attrs.get("service")
-        appointment_date = attrs.get("date")
-
-        if not service or not appointment_date:
-            return attrs
-
-        benefit = PlanBenefit.objects.filter(plan=subscription.plan, service=service).first()
-        if not benefit:
-            raise serializers.ValidationError("Este serviço não faz parte do seu plano.")
-
-        allowed_days = benefit.allowed_days or []
-        if not allowed_days:
-            return attrs
-
-        day_map = {0: "mon", 1: "tue", 2: "wed", 3: "thu", 4: "fri", 5: "sat", 6: "sun"}
-        pt_map = {"mon": "Segunda", "tue": "Terça", "wed": "Quarta", "thu": "Quinta", "fri": "Sexta", "sat": "Sábado", "sun": "Domingo"}
-
-        weekday_code = day_map[appointment_date.weekday()]
-
-        if weekday_code not in allowed_days:
-            dias_permitidos = [pt_map[d] for d in allowed_days]
-            dias_fmt = ", ".join(dias_permitidos)
-            raise serializers.ValidationError(
-                f"Este benefício só pode ser usado em: {dias_fmt}."
-            )
-
-        return attrs
-
-    def _validate_plan(self, attrs, request, is_public):
+    def _validate_plan(self, attrs):
+        attrs = super()._validate_plan(attrs)
         if attrs.get('use_plan'):
-            client = User.objects.filter(phone=attrs.get("phone")).first() if is_public else request.user
-            if not client:
-                raise serializers.ValidationError('Cliente não encontrado para o uso do plano.')
-            attrs['name'] = client.name or 'Usuario'
-
-            subscription = PlanSubscription.objects.filter(user=client, status='active', start_date__lte=attrs['date'], end_date__gte=attrs['date']).first()
-
-            if not subscription:
-                raise serializers.ValidationError('O cliente não possui plano ativo.')
-
-            attrs = self._validate_allowed_days(attrs, subscription)
-
-            service_id = attrs["service"].id
-            credits = PlanSubscriptionCredit.objects.filter(subscription=subscription, service_id=service_id).first()
-            if not credits or credits.remaining() <= 0:
-                raise serializers.ValidationError("Você não possui créditos disponíveis para este serviço.")
-
-            attrs["plan_credit"] = credits
-            attrs["plan_subscription"] = subscription
+            attrs['name'] = self.booking.client.name or 'Usuario'
         return attrs
 
     def validate(self, attrs):
         request = self.context.get("request")
-        is_public = not request.user.is_authenticated
 
         attrs = self._validate_phone(attrs)
-        attrs = self._check_existing_appointment(attrs, request, attrs.get("phone"), is_public)
-        attrs = self._validate_code(attrs)
+        self.booking = BookingContext(request, attrs["phone"], attrs["barber_id"], attrs["date"])
+        attrs = self._check_existing_appointment(attrs)
         attrs = self._validate_service(attrs)
 
         attrs = self._validate_availability(attrs)
         attrs = self._validate_slot(attrs)
-        attrs = self._validate_plan(attrs, request, is_public)
+        attrs = self._validate_plan(attrs)
+        # Por último: um código certo é invalidado na hora em que é conferido.
+        attrs = self._validate_code(attrs)
 
         return attrs
 
@@ -445,32 +355,17 @@ class AppointmentConfirmSerializer(serializers.Serializer):
         phone = validated_data['phone']
         name = validated_data.get('name') or 'Usuario'
 
-        user, _ = User.objects.get_or_create(phone=phone, defaults={'name': name, 'role': UserRole.CLIENT})
-
-        appointment = Appointment.objects.create(
-            client=user,
-            service=validated_data['service'],
-            barber_id=validated_data['barber_id'],
-            date=validated_data['date'],
-            start_time=validated_data['start_time'],
-            end_time=validated_data['end_time'],
-            status=AppointmentStatus.SCHEDULED,
-            paid_with_plan=validated_data.get('use_plan', False),
-            plan_subscription=validated_data.get('plan_subscription')
-        )
+        user = self.booking.client if self.booking.is_public else None
+        if user is None:
+            user, _ = User.objects.get_or_create(phone=phone, defaults={'name': name, 'role': UserRole.CLIENT})
 
-        if validated_data.get('use_plan') and validated_data.get('plan_credit'):
-            credit_entry = validated_data['plan_credit']
-            credit_entry.used += 1
-            credit_entry.save()
+        appointment = self._commit_booking(validated_data, user)
 
-        delete_key_redis(phone)
-        refresh = RefreshToken.for_user(user)
+        release_slot_hold(validated_data['barber_id'], validated_data['date'], phone)
         return {
             'status': 'ok',
             'appointment_id': appointment.id,
-            'access': str(refresh.access_token),
-            'refresh': str(refresh)
+            **issue_tokens(user),
         }
 
 
@@ -513,9 +408,71 @@ class AppointmentCancelSerializer(serializers.Serializer):
         if request.user.role in ['barber', 'admin']:
             canceled_by = request.user.role
 
-        appointment.cancel(reason=reason, canceled_by=canceled_by)
+        with transaction.atomic():
+            appointment.cancel(reason=reason, canceled_by=canceled_by)
+            credit_refunded = refund_credit(appointment)
         return {
             'appointment_id': appointment.id,
             'canceled_by': canceled_by,
-            'reason': reason
+            'reason': reason,
+            'credit_refunded': credit_refunded
+        }
+
+
+class AppointmentAttendanceSerializer(serializers.Serializer):
+    """Check-in e faltas em lote, marcados pelo barbeiro (ou pelo dono) no dia.
+
+    Só valem agendamentos do próprio barbeiro que já começaram e não foram
+    cancelados; os demais ids voltam em `ignored`. Uma falta marcada por engano
+    pode ser corrigida com um check-in, e vice-versa.
+    """
+    MAX_IDS = 200
+    ELIGIBLE_STATUS = [AppointmentStatus.SCHEDULED, AppointmentStatus.COMPLETED, AppointmentStatus.NO_SHOW]
+
+    check_in = serializers.ListField(child=serializers.IntegerField(), required=False, default=list, max_length=MAX_IDS)
+    no_show = serializers.ListField(child=serializers.IntegerField(), required=False, default=list, max_length=MAX_IDS)
+
+    def _is_admin(self, user):
+        return user.role == 'admin' or bool(user.is_admin)
+
+    def validate(self, attrs):
+        request = self.context.get('request')
+        if request.user.role != 'barber' and not self._is_admin(request.user):
+            raise serializers.ValidationError('Apenas barbeiros ou administradores podem marcar presença.')
+        if not attrs['check_in'] and not attrs['no_show']:
+            raise serializers.ValidationError('Informe ao menos um agendamento em check_in ou no_show.')
+        if set(attrs['check_in']) & set(attrs['no_show']):
+            raise serializers.ValidationError('Um agendamento não pode estar em check_in e no_show ao mesmo tempo.')
+        return attrs
+
+    def save(self):
+        request = self.context.get('request')
+        check_in = self.validated_data['check_in']
+        no_show = self.validated_data['no_show']
+
+        now = timezone.localtime()
+        eligible = Appointment.objects.filter(
+            Q(date__lt=now.date()) | Q(date=now.date(), start_time__lte=now.time()),
+            id__in=[*check_in, *no_show],
+            status__in=self.ELIGIBLE_STATUS,
+        )
+        if not self._is_admin(request.user):
+            eligible = eligible.filter(barber_id=request.user.barber_id)
+
+        with transaction.atomic():
+            ids = set(eligible.select_for_update().values_list('id', flat=True))
+            checked_in = Appointment.objects.filter(id__in=ids.intersection(check_in)).update(
+                checked_in_at=Coalesce('checked_in_at', Value(timezone.now())),
+                status=Case(
+                    When(status=AppointmentStatus.NO_SHOW, then=Value(AppointmentStatus.COMPLETED)),
+                    default=F('status'),
+                ),
+            )
+            missed = Appointment.objects.filter(id__in=ids.intersection(no_show)).update(
+                checked_in_at=None, status=AppointmentStatus.NO_SHOW,
+            )
+        return {
+            'checked_in': checked_in,
+            'no_show': missed,
+            'ignored': sorted(set(check_in + no_show) - ids),
         }
@@ -0,0 +1,85 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from barbers.occupancy import mark_booked, release_booked
+from core.choices import AppointmentStatus
+from core.utils import invalidate_available_days
+from .models import Appointment
+
+# Campos que decidem o intervalo que o agendamento ocupa no mapa do barbeiro.
+SLOT_FIELDS = ("barber_id", "date", "start_time", "end_time", "status")
+SLOT_UPDATE_FIELDS = {"barber", *SLOT_FIELDS}
+
+_bulk_occupancy = ContextVar("bulk_occupancy", default=False)
+
+
+@contextmanager
+def occupancy_handled_in_bulk():
+    """Desliga os receivers de ocupação e de cache dentro do bloco.
+
+    Para operações em lote (ex.: clear_pending_appointments) que atualizam os
+    mapas e invalidam o cache de uma vez, em vez de uma vez por linha.
+    """
+    token = _bulk_occupancy.set(True)
+    try:
+        yield
+    finally:
+        _bulk_occupancy.reset(token)
+
+
+def _slot(instance):
+    return tuple(getattr(instance, field) for field in SLOT_FIELDS)
+
+
+def _occupies(slot):
+    return slot is not None and slot[4] != AppointmentStatus.CANCELED
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_appointment_slot(sender, instance, update_fields=None, **kwargs):
+    # Guarda o estado gravado: o post_save precisa desligar o intervalo antigo
+    # quando o agendamento muda de horário, de dia ou de barbeiro.
+    instance._previous_slot = None
+    if instance._state.adding:
+        return
+    if update_fields is not None and not SLOT_UPDATE_FIELDS & set(update_fields):
+        instance._previous_slot = _slot(instance)
+        return
+    instance._previous_slot = Appointment.objects.filter(pk=instance.pk).values_list(*SLOT_FIELDS).first()
+
+
+@receiver(post_save, sender=Appointment)
+def update_appointment_occupancy(sender, instance, **kwargs):
+    if _bulk_occupancy.get():
+        return
+    previous = getattr(instance, "_previous_slot", None)
+    current = _slot(instance)
+    if previous == current or (_occupies(previous) and _occupies(current) and previous[:4] == current[:4]):
+        return
+    # Um agendamento já cancelado não ocupa nada: liberar o intervalo dele
+    # apagaria os bits de quem reservou o mesmo horário depois.
+    if _occupies(previous):
+        release_booked(*previous[:4])
+    if _occupies(current):
+        mark_booked(*current[:4])
+
+
+@receiver(post_delete, sender=Appointment)
+def release_appointment_occupancy(sender, instance, **kwargs):
+    if _bulk_occupancy.get():
+        return
+    if instance.status != AppointmentStatus.CANCELED:
+        release_booked(instance.barber_id, instance.date, instance.start_time, instance.end_time)
+
+
+@receiver([post_save, post_delete], sender=Appointment)
+def invalidate_appointment_availability(sender, instance, **kwargs):
+    if _bulk_occupancy.get():
+        return
+    days = {(instance.barber_id, instance.date)}
+    previous = getattr(instance, "_previous_slot", None)
+    if previous is not None:
+        days.add(previous[:2])
+    transaction.on_commit(lambda: invalidate_available_days(days))
@@ -1,14 +1,172 @@
+import time
+import logging
 from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
+from barbers.occupancy import release_booked_many
+from core.utils import invalidate_available_days
+from messaging.models import OutboundMessage
+from messaging.outbox import queue_messages
 from .models import Appointment, AppointmentStatus
+from .signals import occupancy_handled_in_bulk
+
+logger = logging.getLogger(__name__)
+
+PENDING_TTL = timedelta(minutes=5)
+PENDING_BATCH_SIZE = 500
+PENDING_TIME_BUDGET = 30
+
+REMINDER_BATCH_SIZE = 500
+REMINDER_MAX_BATCHES = 20
+
+CLOSE_BATCH_SIZE = 1000
+CLOSE_MAX_BATCHES = 50
 
 
 @shared_task
-def clear_pending_appointments():
-    cutoff = timezone.now() - timedelta(minutes=5)
-    deleted_count, _ = Appointment.objects.filter(
-        status=AppointmentStatus.PENDING,
-        created_at__lt=cutoff
-    ).delete()
-    return f"{deleted_count} agendamentos pendentes excluidos."
+def clear_pending_appointments(batch_size=PENDING_BATCH_SIZE, time_budget=PENDING_TIME_BUDGET):
+    """Apaga os agendamentos pendentes há mais de PENDING_TTL, em lotes por id.
+
+    Cada lote trava até `batch_size` pendentes (pulando os travados por uma
+    confirmação em andamento) e os apaga pelo id com QuerySet.delete(), que
+    cuida das chaves estrangeiras. Os receivers de ocupação ficam desligados
+    no lote: a ocupação dos dias afetados é liberada de uma vez e o cache de
+    disponibilidade deles, invalidado no commit. Não começa lote novo depois
+    de `time_budget` segundos; o que sobrar fica para a próxima execução.
+    """
+    started = time.monotonic()
+    cutoff = timezone.now() - PENDING_TTL
+    scanned = deleted = batches = 0
+
+    while time.monotonic() - started < time_budget:
+        with transaction.atomic(), occupancy_handled_in_bulk():
+            rows = list(
+                Appointment.objects.select_for_update(skip_locked=True, of=("self",))
+                .filter(status=AppointmentStatus.PENDING, created_at__lt=cutoff)
+                .order_by("created_at", "id")
+                .values_list("id", "barber_id", "date", "start_time", "end_time")[:batch_size]
+            )
+            if not rows:
+                break
+            scanned += len(rows)
+
+            _, per_model = Appointment.objects.filter(id__in=[row[0] for row in rows]).delete()
+            deleted += per_model.get(Appointment._meta.label, 0)
+
+            release_booked_many(row[1:] for row in rows)
+            barber_days = {(barber_id, date) for _, barber_id, date, _, _ in rows}
+            transaction.on_commit(lambda barber_days=barber_days: invalidate_available_days(barber_days))
+        batches += 1
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        "Pendentes: %s lidos, %s apagados em %s lotes (%.2fs).", scanned, deleted, batches, elapsed,
+        extra={"scanned": scanned, "deleted": deleted, "batches": batches, "duration": elapsed},
+    )
+    return f"{deleted} agendamentos pendentes excluidos ({scanned} lidos, {batches} lotes, {elapsed:.2f}s)."
+
+
+def reminder_window(now, hours):
+    """Agendados que começam entre `now` e `now + hours`, numa faixa de (date, start_time)."""
+    end = now + timedelta(hours=hours)
+    return (
+        (Q(date__gt=now.date()) | Q(date=now.date(), start_time__gte=now.time()))
+        & (Q(date__lt=end.date()) | Q(date=end.date(), start_time__lte=end.time()))
+    )
+
+
+@shared_task
+def send_appointment_reminders(hours=None, batch_size=REMINDER_BATCH_SIZE, max_batches=REMINDER_MAX_BATCHES):
+    """Põe na fila de WhatsApp um lembrete para cada agendamento das próximas `hours` horas.
+
+    Cada lote, numa transação: trava até `batch_size` agendamentos ainda sem
+    lembrete (os travados por outra execução são pulados), marca todos com um
+    UPDATE e insere as mensagens de uma vez. A dedupe_key de cada mensagem
+    garante um lembrete por agendamento mesmo se o lote for repetido.
+    """
+    started = time.monotonic()
+    now = timezone.localtime()
+    hours = hours or settings.APPOINTMENT_REMINDER_HOURS
+    window = reminder_window(now, hours)
+    queued = batches = 0
+
+    while batches < max_batches:
+        with transaction.atomic():
+            rows = list(
+                Appointment.objects.select_for_update(skip_locked=True, of=("self",))
+                .filter(window, status=AppointmentStatus.SCHEDULED, reminded_at__isnull=True)
+                .order_by("date", "start_time", "id")
+                .values_list(
+                    "id", "date", "start_time", "client__phone", "client__name",
+                    "barber__user__name", "service__name",
+                )[:batch_size]
+            )
+            if not rows:
+                break
+
+            Appointment.objects.filter(id__in=[row[0] for row in rows]).update(reminded_at=timezone.now())
+            queued += queue_messages([
+                OutboundMessage(
+                    phone=phone,
+                    kind="appointment_reminder",
+                    dedupe_key=f"appointment_reminder:{appointment_id}",
+                    payload={
+                        "appointment_id": appointment_id, "date": day.isoformat(), "start_time": start.isoformat(),
+                        "client": client_name, "barber": barber_name, "service": service_name,
+                    },
+                )
+                for appointment_id, day, start, phone, client_name, barber_name, service_name in rows
+            ])
+        batches += 1
+
+    elapsed = time.monotonic() - started
+    logger.info("Lembretes: %s na fila em %s lotes (%.2fs).", queued, batches, elapsed)
+    return f"{queued} lembretes na fila em {batches} lotes ({elapsed:.2f}s)."
+
+
+@shared_task
+def close_past_appointments(batch_size=CLOSE_BATCH_SIZE, max_batches=CLOSE_MAX_BATCHES):
+    """Encerra os agendamentos cujo horário já passou e que ainda estão "scheduled".
+
+    Os que tiveram check-in viram "completed"; os demais recebem
+    APPOINTMENT_UNCHECKED_STATUS. Cada lote trava até `batch_size` linhas e faz
+    no máximo dois UPDATEs. UPDATE não dispara sinais, mas nenhum dos dois status
+    libera o horário, então ocupação e cache de disponibilidade não mudam.
+    """
+    started = time.monotonic()
+    now = timezone.localtime() - timedelta(minutes=settings.APPOINTMENT_CLOSE_GRACE_MINUTES)
+    unchecked_status = settings.APPOINTMENT_UNCHECKED_STATUS
+    if unchecked_status not in (AppointmentStatus.COMPLETED, AppointmentStatus.NO_SHOW):
+        raise ValueError(f"APPOINTMENT_UNCHECKED_STATUS inválido: {unchecked_status}")
+    ended = Q(date__lt=now.date()) | Q(date=now.date(), end_time__lte=now.time())
+    completed = no_show = batches = 0
+
+    while batches < max_batches:
+        with transaction.atomic():
+            rows = list(
+                Appointment.objects.select_for_update(skip_locked=True, of=("self",))
+                .filter(ended, status=AppointmentStatus.SCHEDULED)
+                .order_by("date", "start_time", "id")
+                .values_list("id", "checked_in_at")[:batch_size]
+            )
+            if not rows:
+                break
+
+            checked_in = [appointment_id for appointment_id, checked_in_at in rows if checked_in_at]
+            unchecked = [appointment_id for appointment_id, checked_in_at in rows if not checked_in_at]
+            for ids, status in ((checked_in, AppointmentStatus.COMPLETED), (unchecked, unchecked_status)):
+                if not ids:
+                    continue
+                updated = Appointment.objects.filter(id__in=ids).update(status=status)
+                if status == AppointmentStatus.COMPLETED:
+                    completed += updated
+                else:
+                    no_show += updated
+        batches += 1
+
+    elapsed = time.monotonic() - started
+    logger.info("Agendamentos encerrados: %s concluídos, %s faltas em %s lotes (%.2fs).", completed, no_show, batches, elapsed)
+    return f"{completed} agendamentos concluídos, {no_show} faltas em {batches} lotes ({elapsed:.2f}s)."
@@ -0,0 +1,388 @@
+import json
+import base64
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+import redis
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from accounts.models import User
+from accounts.tokens import issue_tokens
+from barbers.models import Barber, BlockedTime, WorkingHour
+from barbers.occupancy import find_drift, get_busy_masks, rebuild
+from core.pagination import KeysetPagination
+from core.redis_client import InMemoryRedis, get_redis, reset_redis
+from core.utils import _availability_day_version_key, get_available_slots
+from messaging.models import OutboundMessage
+from plans.entitlements import load_entitlement
+from plans.models import Plan, PlanBenefit, PlanCreditEntry, PlanSubscription
+from plans.provisioning import provision_credits
+from services.models import Service
+from .booking import CreditUnavailable, SlotUnavailable, commit_booking
+from .models import Appointment
+from .tasks import clear_pending_appointments, close_past_appointments, send_appointment_reminders
+
+
+@override_settings(REDIS_URL="memory://")
+class BookingTestCase(TestCase):
+    day = date(2030, 1, 7)  # segunda-feira
+
+    def setUp(self):
+        reset_redis()
+        self.addCleanup(reset_redis)
+        self.barber = Barber.objects.create(user=User.objects.create_user(phone="21999990000", name="Barbeiro", role="barber"))
+        WorkingHour.objects.create(barber=self.barber, weekday=0, start_time=time(9), end_time=time(18))
+        self.service = Service.objects.create(name="Corte", duration=30, price=40)
+        self.barber.services.add(self.service)
+        plan = Plan.objects.create(name="Mensal", slug="mensal", price=100)
+        PlanBenefit.objects.create(plan=plan, service=self.service, quantity=4)
+        self.client_user = User.objects.create_user(phone="21999990001", name="Cliente")
+        self.subscription = PlanSubscription.objects.create(user=self.client_user, plan=plan, end_date=date(2031, 1, 1))
+        provision_credits([self.subscription])
+
+    def post(self, action, hour=10, **extra):
+        return self.client.post(f"/api/v1/appointments/{action}/", self.payload(hour, **extra), content_type="application/json")
+
+    def payload(self, hour=10, **extra):
+        return {
+            "service_id": self.service.id, "barber_id": self.barber.id, "date": self.day.isoformat(),
+            "start_time": f"{hour:02d}:00", "use_plan": True, **extra,
+        }
+
+
+class BookingQueryCountTests(BookingTestCase):
+    """Orçamento de consultas do agendamento com plano, com o mapa do dia já montado.
+
+    Contam também os SAVEPOINTs das transações aninhadas.
+    """
+
+    def setUp(self):
+        super().setUp()
+        get_busy_masks([(self.barber.id, self.day)])
+
+    def test_authenticated_create(self):
+        token = issue_tokens(self.client_user)["access"]
+        with self.assertNumQueries(14):
+            response = self.client.post(
+                "/api/v1/appointments/create/", self.payload(), content_type="application/json",
+                HTTP_AUTHORIZATION=f"Bearer {token}",
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.json()["can_use_plan"])
+
+    def test_public_create_and_confirm(self):
+        with self.assertNumQueries(7):
+            response = self.post("create", phone=self.client_user.phone)
+        self.assertEqual(response.status_code, 201)
+
+        code = get_redis().get(f"login_code:{self.client_user.phone}").decode()
+        with self.assertNumQueries(15):
+            response = self.post("confirm", phone=self.client_user.phone, code=code)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Appointment.objects.filter(pk=response.json()["appointment_id"], paid_with_plan=True).exists())
+
+
+class ConfirmBookingTests(BookingTestCase):
+    def test_redis_failure_after_commit_keeps_the_booking(self):
+        self.assertEqual(self.post("create", phone=self.client_user.phone).status_code, 201)
+        code = get_redis().get(f"login_code:{self.client_user.phone}").decode()
+
+        with mock.patch.object(InMemoryRedis, "hdel", side_effect=redis.ConnectionError):
+            response = self.post("confirm", phone=self.client_user.phone, code=code)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Appointment.objects.filter(pk=response.json()["appointment_id"]).exists())
+
+
+class CommitBookingTests(BookingTestCase):
+    def commit(self, start, end, credit=True):
+        credit_id = self.subscription.credits.get().id if credit else None
+        return commit_booking(
+            self.client_user, self.barber.id, self.service, self.day, start, end,
+            credit_id=credit_id, subscription_id=self.subscription.id if credit else None,
+        )
+
+    def test_database_rejects_overlapping_intervals(self):
+        self.commit(time(10), time(10, 30), credit=False)
+
+        for start, end in [(time(10), time(10, 30)), (time(9, 45), time(10, 15)), (time(10, 15), time(10, 45))]:
+            with self.assertRaises(SlotUnavailable):
+                self.commit(start, end, credit=False)
+        self.commit(time(10, 30), time(11), credit=False)
+        self.assertEqual(Appointment.objects.count(), 2)
+
+    def test_last_credit_is_spent_once(self):
+        self.subscription.credits.update(used=3)
+
+        self.commit(time(10), time(10, 30))
+        with self.assertRaises(CreditUnavailable):
+            self.commit(time(11), time(11, 30))
+
+        self.assertEqual(self.subscription.credits.get().used, 4)
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_other_integrity_errors_are_not_reported_as_slot_conflicts(self):
+        error = IntegrityError("FOREIGN KEY constraint failed")
+        with mock.patch("appointments.booking.consume_credit", side_effect=error):
+            with self.assertRaises(IntegrityError):
+                self.commit(time(10), time(10, 30))
+        self.assertFalse(Appointment.objects.exists())
+
+
+class AppointmentListTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.list_auth = "Bearer " + issue_tokens(self.client_user)["access"]
+
+    def list(self, **params):
+        return self.client.get("/api/v1/appointments/me/", params, HTTP_AUTHORIZATION=self.list_auth)
+
+    def test_pages_through_cursor(self):
+        ids = [
+            Appointment.objects.create(
+                client=self.client_user, barber=self.barber, service=self.service, date=self.day,
+                start_time=time(hour), end_time=time(hour, 30), status="completed",
+            ).id
+            for hour in range(9, 14)
+        ]
+        seen = []
+        with mock.patch.object(KeysetPagination, "page_size", 2):
+            page = self.list().json()
+            seen += [row["id"] for row in page["results"]]
+            while page["next"]:
+                page = self.client.get(page["next"], HTTP_AUTHORIZATION=self.list_auth).json()
+                seen += [row["id"] for row in page["results"]]
+        self.assertEqual(seen, ids[::-1])
+
+    def test_bad_cursor_values_are_not_found(self):
+        for position in [[0, ["x", "x", "x", "x"]], [0, [1, "2030-13-01", "10:00", 1]], [0, [None, None, None, None]]]:
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+            response = self.list(cursor=cursor)
+            self.assertEqual(response.status_code, 404, position)
+            self.assertEqual(response.json()["detail"], "Cursor inválido.")
+
+
+class ClearPendingAppointmentsTests(BookingTestCase):
+    def test_deletes_stale_pending_in_batches_and_frees_their_slots(self):
+        rebuild([self.barber.id], self.day, self.day)
+        stale = [
+            Appointment.objects.create(
+                client=self.client_user, barber=self.barber, service=self.service, date=self.day,
+                start_time=time(hour), end_time=time(hour, 30), status="pendent",
+            )
+            for hour in range(9, 14)
+        ]
+        Appointment.objects.filter(pk__in=[a.pk for a in stale]).update(created_at=timezone.now() - timedelta(minutes=10))
+        fresh = Appointment.objects.create(
+            client=self.client_user, barber=self.barber, service=self.service, date=self.day,
+            start_time=time(15), end_time=time(15, 30), status="pendent",
+        )
+        entry = PlanCreditEntry.objects.create(credit=self.subscription.credits.get(), appointment=stale[0], kind="consume", delta=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = clear_pending_appointments(batch_size=2)
+
+        self.assertTrue(summary.startswith("5 agendamentos pendentes excluidos (5 lidos, 3 lotes"), summary)
+        self.assertEqual(list(Appointment.objects.values_list("id", flat=True)), [fresh.id])
+        entry.refresh_from_db()
+        self.assertIsNone(entry.appointment_id)
+        self.assertEqual(find_drift([self.barber.id], self.day, self.day), [])
+        self.assertEqual(int(get_redis().get(_availability_day_version_key(self.barber.id, self.day))), 3)
+
+
+
+class ScheduledTaskTestCase(BookingTestCase):
+    now = timezone.make_aware(datetime(2030, 1, 7, 8))  # segunda-feira, 08:00
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(mock.patch("django.utils.timezone.now", return_value=self.now))
+
+    def appointment(self, hour, minute=0, day=None, status="scheduled", **extra):
+        start = datetime.combine(day or self.day, time(hour, minute))
+        return Appointment.objects.create(
+            client=self.client_user, barber=self.barber, service=self.service, date=start.date(),
+            start_time=start.time(), end_time=(start + timedelta(minutes=30)).time(), status=status, **extra,
+        )
+
+
+class SendAppointmentRemindersTests(ScheduledTaskTestCase):
+    def reminded(self):
+        return sorted(OutboundMessage.objects.filter(kind="appointment_reminder").values_list("payload__appointment_id", flat=True))
+
+    def test_queues_appointments_inside_the_window(self):
+        inside = [self.appointment(8), self.appointment(9, 30), self.appointment(11)]
+        self.appointment(7, 30)
+        self.appointment(11, 30)
+        self.appointment(9, day=self.day + timedelta(days=1))
+
+        self.assertTrue(send_appointment_reminders(hours=3).startswith("3 lembretes"))
+        self.assertEqual(self.reminded(), [appointment.id for appointment in inside])
+        self.assertEqual(Appointment.objects.filter(reminded_at__isnull=False).count(), 3)
+
+    def test_reminds_each_appointment_once(self):
+        appointment = self.appointment(9)
+        send_appointment_reminders(hours=3)
+        self.assertTrue(send_appointment_reminders(hours=3).startswith("0 lembretes"))
+
+        # Lote repetido depois de marcar o agendamento sem lembrete: a dedupe_key segura.
+        Appointment.objects.filter(pk=appointment.pk).update(reminded_at=None)
+        self.assertTrue(send_appointment_reminders(hours=3).startswith("0 lembretes"))
+        self.assertEqual(self.reminded(), [appointment.id])
+
+    def test_skips_canceled_and_already_reminded(self):
+        self.appointment(9, status="canceled")
+        self.appointment(10, reminded_at=self.now - timedelta(hours=1))
+        self.appointment(10, 30, status="pendent")
+
+        self.assertTrue(send_appointment_reminders(hours=3).startswith("0 lembretes"))
+        self.assertEqual(self.reminded(), [])
+
+
+@override_settings(APPOINTMENT_CLOSE_GRACE_MINUTES=30, APPOINTMENT_UNCHECKED_STATUS="no_show")
+class ClosePastAppointmentsTests(ScheduledTaskTestCase):
+    def test_closes_ended_appointments_by_check_in(self):
+        yesterday = self.day - timedelta(days=1)
+        attended = self.appointment(9, day=yesterday, checked_in_at=self.now - timedelta(days=1))
+        missed = self.appointment(10, day=yesterday)
+        ended_in_grace = self.appointment(7)
+
+        summary = close_past_appointments(batch_size=2)
+        self.assertTrue(summary.startswith("1 agendamentos concluídos, 2 faltas em 2 lotes"), summary)
+        statuses = dict(Appointment.objects.values_list("id", "status"))
+        self.assertEqual(
+            (statuses[attended.id], statuses[missed.id], statuses[ended_in_grace.id]), ("completed", "no_show", "no_show")
+        )
+
+    def test_leaves_future_and_already_closed_appointments_alone(self):
+        yesterday = self.day - timedelta(days=1)
+        untouched = {
+            self.appointment(7, 30).id: "scheduled",  # terminou há menos que a tolerância
+            self.appointment(9).id: "scheduled",
+            self.appointment(9, day=self.day + timedelta(days=1)).id: "scheduled",
+            self.appointment(9, day=yesterday, status="canceled").id: "canceled",
+            self.appointment(10, day=yesterday, status="completed").id: "completed",
+            self.appointment(11, day=yesterday, status="no_show", checked_in_at=self.now).id: "no_show",
+            self.appointment(12, day=yesterday, status="pendent").id: "pendent",
+        }
+        close_past_appointments()
+        self.assertEqual(dict(Appointment.objects.values_list("id", "status")), untouched)
+
+    @override_settings(APPOINTMENT_UNCHECKED_STATUS="canceled")
+    def test_rejects_an_unchecked_status_that_frees_the_slot(self):
+        with self.assertRaises(ValueError):
+            close_past_appointments()
+
+# Tabelas que crescem com o uso; uma varredura completa nelas reprova o plano.
+HOT_TABLES = [
+    "appointments_appointment",
+    "plans_plansubscription",
+    "plans_plansubscriptioncredit",
+    "plans_planbenefit",
+    "barbers_blockedtime",
+    "barbers_workinghour",
+    "barbers_dailyoccupancy",
+    "accounts_user",
+    "messaging_outboundmessage",
+]
+
+
+@override_settings(REDIS_URL="memory://")
+class HotQueryPlanTests(TestCase):
+    """Executa as consultas quentes sobre uma massa de dados e reprova as que varrem uma tabela quente inteira."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.localdate()
+        services = [Service.objects.create(name=f"Serviço {i}", duration=30, price=40) for i in range(3)]
+        cls.service = services[0]
+        barbers = []
+        for i in range(4):
+            barber = Barber.objects.create(user=User.objects.create(phone=f"219{i:08d}", name=f"Barbeiro {i}", role="barber"))
+            barber.services.set(services)
+            WorkingHour.objects.bulk_create([
+                WorkingHour(barber=barber, weekday=weekday, start_time=time(9), end_time=time(18)) for weekday in range(7)
+            ])
+            barbers.append(barber)
+        cls.barber = barbers[0]
+
+        plan = Plan.objects.create(name="Plano", slug="plano", price=100)
+        PlanBenefit.objects.create(plan=plan, service=cls.service, quantity=4)
+        clients = User.objects.bulk_create([User(phone=f"218{i:08d}", name=f"Cliente {i}") for i in range(60)])
+        cls.client_user = clients[0]
+
+        appointments = []
+        blocks = []
+        for offset in range(-10, 10):
+            day = cls.today + timedelta(days=offset)
+            for barber in barbers:
+                blocks.append(BlockedTime(barber=barber, date=day, start_time=time(12), end_time=time(13)))
+                for slot in range(8):
+                    appointments.append(Appointment(
+                        client=clients[(offset * 31 + slot * 7 + barber.id) % len(clients)], barber=barber,
+                        service=cls.service, date=day, start_time=time(9 + slot), end_time=time(9 + slot, 30),
+                        status="scheduled" if offset >= 0 else "completed",
+                    ))
+        Appointment.objects.bulk_create(appointments, batch_size=500)
+        BlockedTime.objects.bulk_create(blocks, batch_size=500)
+        PlanSubscription.objects.bulk_create([
+            PlanSubscription(user=client, plan=plan, start_date=cls.today - timedelta(days=10), end_date=cls.today + timedelta(days=20))
+            for client in clients[::3]
+        ])
+
+    def setUp(self):
+        reset_redis()
+        self.addCleanup(reset_redis)
+
+    def list_appointments(self, user):
+        token = issue_tokens(user)["access"]
+        return lambda: self.client.get("/api/v1/appointments/me/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def hot_paths(self):
+        later = self.today + timedelta(days=90)
+        return [
+            ("get_available_slots", lambda: get_available_slots(self.barber.id, later, self.service)),
+            ("get_available_slots (mapa pronto)", lambda: get_available_slots(self.barber.id, later, self.service)),
+            ("AppointmentsListView (cliente)", self.list_appointments(self.client_user)),
+            ("AppointmentsListView (barbeiro)", self.list_appointments(self.barber.user)),
+            ("load_entitlement", lambda: load_entitlement(self.client_user.phone)),
+            ("clear_pending_appointments", clear_pending_appointments),
+            ("send_appointment_reminders", lambda: send_appointment_reminders(hours=48)),
+            ("close_past_appointments", close_past_appointments),
+        ]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # Sem seq scan disponível, o planejador só escolhe varredura se não houver índice utilizável.
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute(f"EXPLAIN {sql}")
+            else:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return "\n".join(str(row[-1]) for row in cursor.fetchall())
+
+    def full_scans(self, plan):
+        scans = []
+        for line in plan.splitlines():
+            line = line.strip()
+            for table in HOT_TABLES:
+                if line.startswith(f"Seq Scan on {table}"):
+                    scans.append(table)
+                elif line.startswith(f"SCAN {table}") and "USING" not in line:
+                    scans.append(table)
+        return scans
+
+    def test_hot_queries_use_indexes(self):
+        for name, run in self.hot_paths():
+            with CaptureQueriesContext(connection) as queries:
+                run()
+            statements = [
+                query["sql"] for query in queries.captured_queries
+                if query["sql"].lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE"))
+            ]
+            self.assertTrue(statements, name)
+            for sql in statements:
+                plan = self.explain(sql)
+                with self.subTest(name, sql=sql[:100]):
+                    self.assertEqual(self.full_scans(plan), [], f"{sql}\n{plan}")
@@ -2,16 +2,29 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions, generics
 from .models import Appointment
-from .serializers import AppointmentCreateSerializer, AppointmentConfirmSerializer, AppointmentCancelSerializer, AppointmentSerializer
+from .serializers import (
+    AppointmentCreateSerializer, AppointmentConfirmSerializer, AppointmentCancelSerializer, AppointmentListSerializer,
+    AppointmentAttendanceSerializer,
+)
 from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from accounts.authentication import StatelessJWTAuthentication
 from django.db import models
 from core.choices import AppointmentStatus
+from core.pagination import KeysetPagination
+from core.throttling import IPRateThrottle, PhoneRateThrottle
 
 
 class AppointmentCreateView(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [AllowAny]
+    throttle_classes = [IPRateThrottle, PhoneRateThrottle]
+    throttle_scope = "appointment_create"
+
+    def get_throttles(self):
+        # Só o agendamento público envia código por WhatsApp.
+        if self.request.user.is_authenticated:
+            return []
+        return super().get_throttles()
 
     def post(self, request):
         serializer = AppointmentCreateSerializer(data=request.data, context={"request": request})
@@ -48,31 +61,52 @@ class AppointmentCancelView(APIView):
         return Response({"status": "error", "message": "Não foi possível cancelar o agendamento.", "data": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
-# ALTERAR FUTURAMENTE
+class AppointmentAttendanceView(APIView):
+    authentication_classes = [StatelessJWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = AppointmentAttendanceSerializer(data=request.data, context={"request": request})
+        if serializer.is_valid():
+            data = serializer.save()
+            return Response(data, status=status.HTTP_200_OK)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
 class AppointmentsListView(generics.ListAPIView):
-    authentication_classes = [JWTAuthentication]
+    """Agendamentos do usuário, paginados por cursor sobre (data, início, id).
+
+    Clientes veem primeiro os pendentes, depois os agendados e por fim o
+    histórico; por isso a ordenação deles começa pela faixa de status.
+    """
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
-    serializer_class = AppointmentSerializer
+    serializer_class = AppointmentListSerializer
+    pagination_class = KeysetPagination
+
+    @property
+    def keyset_ordering(self):
+        if self.request.user.role == "client":
+            return ("status_bucket", "-date", "-start_time", "-id")
+        return ("-date", "-start_time", "-id")
 
     def get_queryset(self):
         user = self.request.user
         qs = Appointment.objects.all()
 
         if user.role == "client":
-            qs = qs.filter(client=user).order_by(
-                models.Case(
+            qs = qs.filter(client_id=user.pk).annotate(
+                status_bucket=models.Case(
                     models.When(status=AppointmentStatus.PENDING, then=0),
                     models.When(status=AppointmentStatus.SCHEDULED, then=1),
                     default=2,
                     output_field=models.IntegerField(),
-                ),
-                '-date',
-                '-start_time'
+                )
             )
-            return qs
+            return self.get_serializer_class().setup_queryset(qs)
 
         elif user.role == "barber":
-            qs = qs.filter(barber=user.barber)
+            qs = qs.filter(barber_id=user.barber_id)
 
         date = self.request.query_params.get("date")
 
@@ -89,4 +123,4 @@ class AppointmentsListView(generics.ListAPIView):
         if status_param:
             qs = qs.filter(status=status_param)
 
-        return qs.order_by("-date", "-start_time")
+        return self.get_serializer_class().setup_queryset(qs)
@@ -0,0 +1,36 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from barbers.models import Barber
+from barbers.occupancy import find_drift, rebuild
+
+
+class Command(BaseCommand):
+    help = "Compara os mapas de ocupação gravados com os agendamentos e bloqueios de origem."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--barber", type=int, action="append", dest="barbers", help="Id do barbeiro (pode repetir).")
+        parser.add_argument("--from", type=date.fromisoformat, dest="start_date", help="Data inicial (YYYY-MM-DD). Padrão: hoje.")
+        parser.add_argument("--to", type=date.fromisoformat, dest="end_date", help="Data final (YYYY-MM-DD). Padrão: 60 dias depois da inicial.")
+        parser.add_argument("--fix", action="store_true", help="Regrava os dias divergentes.")
+
+    def handle(self, *args, **options):
+        start_date = options["start_date"] or timezone.localdate()
+        end_date = options["end_date"] or start_date + timedelta(days=60)
+        barber_ids = options["barbers"] or list(Barber.objects.values_list("id", flat=True))
+
+        drift = find_drift(barber_ids, start_date, end_date)
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Mapas de ocupação consistentes."))
+            return
+
+        for barber_id, day, field in drift:
+            self.stdout.write(f"barbeiro {barber_id} em {day}: '{field}' diverge da origem")
+
+        if options["fix"]:
+            for barber_id, day in sorted({(barber_id, day) for barber_id, day, _ in drift}):
+                rebuild([barber_id], day, day)
+            self.stdout.write(self.style.SUCCESS(f"{len(drift)} divergências corrigidas."))
+            return
+
+        raise CommandError(f"{len(drift)} divergências encontradas. Use --fix para corrigir.")
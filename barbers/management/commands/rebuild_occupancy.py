@@ -0,0 +1,22 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from barbers.models import Barber
+from barbers.occupancy import rebuild
+
+
+class Command(BaseCommand):
+    help = "Regrava os mapas de ocupação diária a partir dos agendamentos e bloqueios."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--barber", type=int, action="append", dest="barbers", help="Id do barbeiro (pode repetir).")
+        parser.add_argument("--from", type=date.fromisoformat, dest="start_date", help="Data inicial (YYYY-MM-DD). Padrão: hoje.")
+        parser.add_argument("--to", type=date.fromisoformat, dest="end_date", help="Data final (YYYY-MM-DD). Padrão: 60 dias depois da inicial.")
+
+    def handle(self, *args, **options):
+        start_date = options["start_date"] or timezone.localdate()
+        end_date = options["end_date"] or start_date + timedelta(days=60)
+        barber_ids = options["barbers"] or list(Barber.objects.values_list("id", flat=True))
+
+        count = rebuild(barber_ids, start_date, end_date)
+        self.stdout.write(self.style.SUCCESS(f"{count} mapas de ocupação regravados ({start_date} a {end_date})."))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 14:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbers', '0004_alter_barber_photo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='barber',
+            name='slot_interval',
+            field=models.PositiveIntegerField(blank=True, help_text='Intervalo entre horários em minutos. Vazio usa o da barbearia.', null=True),
+        ),
+    ]
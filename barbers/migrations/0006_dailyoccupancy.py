@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-17 14:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbers', '0005_barber_slot_interval'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('booked', models.BinaryField(default=bytes)),
+                ('blocked', models.BinaryField(default=bytes)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('barber', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='barbers.barber')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('barber', 'date'), name='unique_barber_occupancy_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-17 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbers', '0006_dailyoccupancy'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blockedtime',
+            index=models.Index(fields=['barber', 'date'], name='blockedtime_barber_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workinghour',
+            index=models.Index(fields=['barber', 'weekday'], name='workinghour_barber_wd_idx'),
+        ),
+    ]
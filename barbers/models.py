@@ -5,6 +5,7 @@ class Barber(models.Model):
     user = models.OneToOneField('accounts.User', on_delete=models.CASCADE, related_name='barber')
     photo = models.ImageField(blank=True, null=True, upload_to='barbers/')
     services = models.ManyToManyField('services.Service', related_name='barbers')
+    slot_interval = models.PositiveIntegerField(blank=True, null=True, help_text='Intervalo entre horários em minutos. Vazio usa o da barbearia.')
 
     def __str__(self):
         return self.user.name
@@ -16,6 +17,11 @@ class WorkingHour(models.Model):
     start_time = models.TimeField()
     end_time = models.TimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['barber', 'weekday'], name='workinghour_barber_wd_idx'),
+        ]
+
 
 class BlockedTime(models.Model):
     barber = models.ForeignKey('barbers.Barber', on_delete=models.CASCADE, related_name='blocked_times')
@@ -23,3 +29,25 @@ class BlockedTime(models.Model):
     start_time = models.TimeField()
     end_time = models.TimeField()
     reason = models.CharField(max_length=100, blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['barber', 'date'], name='blockedtime_barber_date_idx'),
+        ]
+
+
+class DailyOccupancy(models.Model):
+    """Mapa de ocupação de um barbeiro num dia: um bit por minuto desde a meia-noite."""
+    barber = models.ForeignKey('barbers.Barber', on_delete=models.CASCADE, related_name='occupancy')
+    date = models.DateField()
+    booked = models.BinaryField(default=bytes)
+    blocked = models.BinaryField(default=bytes)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['barber', 'date'],
+                name='unique_barber_occupancy_day'
+            )
+        ]
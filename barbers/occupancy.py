@@ -0,0 +1,228 @@
+"""Mapas de ocupação diária dos barbeiros.
+
+Cada DailyOccupancy guarda dois inteiros de 1440 bits (um por minuto): `booked`
+para agendamentos e `blocked` para bloqueios. Agendamentos não se sobrepõem,
+então criar ou cancelar um só liga ou desliga os seus bits. Bloqueios podem se
+sobrepor, e o mapa deles é recalculado por inteiro quando algum muda. Dias sem
+linha são montados a partir das tabelas de origem na primeira leitura ou
+escrita, e só os dias com expediente ganham linha. Dias passados não são mais
+lidos pela agenda; a task barbers.tasks.prune_occupancy os apaga todo dia.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from appointments.models import Appointment, AppointmentStatus
+from core.intervals import to_minutes
+from .models import BlockedTime, DailyOccupancy, WorkingHour
+
+MINUTES_PER_DAY = 24 * 60
+MASK_BYTES = MINUTES_PER_DAY // 8
+
+
+def interval_mask(start_min, end_min):
+    if end_min <= start_min:
+        return 0
+    return ((1 << (end_min - start_min)) - 1) << start_min
+
+
+def time_mask(start_time, end_time):
+    return interval_mask(to_minutes(start_time), to_minutes(end_time))
+
+
+def mask_to_intervals(mask):
+    """Converte os trechos contínuos de bits ligados em intervalos [início, fim)."""
+    intervals = []
+    while mask:
+        start = (mask & -mask).bit_length() - 1
+        shifted = mask >> start
+        length = (~shifted & (shifted + 1)).bit_length() - 1
+        intervals.append((start, start + length))
+        mask &= ~interval_mask(start, start + length)
+    return intervals
+
+
+def encode(mask):
+    return mask.to_bytes(MASK_BYTES, 'little')
+
+
+def decode(value):
+    return int.from_bytes(bytes(value or b''), 'little')
+
+
+def build_masks(barber_ids, start_date, end_date):
+    """Recalcula os mapas a partir de BlockedTime e Appointment: ({(barbeiro, dia): booked}, {...: blocked})."""
+    booked = defaultdict(int)
+    blocked = defaultdict(int)
+
+    for barber_id, date, b_start, b_end in BlockedTime.objects.filter(
+        barber_id__in=barber_ids,
+        date__range=(start_date, end_date)
+    ).values_list("barber_id", "date", "start_time", "end_time"):
+        blocked[(barber_id, date)] |= time_mask(b_start, b_end)
+
+    for barber_id, date, a_start, a_end in Appointment.objects.filter(
+        barber_id__in=barber_ids,
+        date__range=(start_date, end_date)
+    ).exclude(status=AppointmentStatus.CANCELED).values_list("barber_id", "date", "start_time", "end_time"):
+        booked[(barber_id, date)] |= time_mask(a_start, a_end)
+
+    return booked, blocked
+
+
+def get_busy_masks(barber_days):
+    """Ocupação (booked | blocked) de cada (barbeiro, dia) pedido, criando os mapas que faltarem.
+
+    Quem chama pede só os dias em que o barbeiro tem expediente: nos demais não
+    há horário a oferecer, e eles não ganham linha na tabela.
+    """
+    barber_days = set(barber_days)
+    if not barber_days:
+        return {}
+    barber_ids = {barber_id for barber_id, _ in barber_days}
+    start_date = min(day for _, day in barber_days)
+    end_date = max(day for _, day in barber_days)
+
+    masks = {}
+    for barber_id, date, booked, blocked in DailyOccupancy.objects.filter(
+        barber_id__in=barber_ids,
+        date__range=(start_date, end_date)
+    ).values_list("barber_id", "date", "booked", "blocked"):
+        if (barber_id, date) in barber_days:
+            masks[(barber_id, date)] = decode(booked) | decode(blocked)
+
+    masks.update(_create_missing(barber_days - masks.keys()))
+    return masks
+
+
+def _create_missing(barber_days):
+    """Monta e grava os mapas de (barbeiro, dia) ainda sem linha. Retorna {(barbeiro, dia): booked | blocked}.
+
+    Quem chegar primeiro grava; os demais ignoram o conflito. Uma linha gravada
+    por leitura concorrente pode ter sido montada antes de uma mudança ainda não
+    confirmada, por isso quem muda o mapa garante a linha e só então aplica a
+    própria mudança sobre ela (ver _update_booked).
+    """
+    if not barber_days:
+        return {}
+    booked, blocked = build_masks(
+        {barber_id for barber_id, _ in barber_days},
+        min(day for _, day in barber_days),
+        max(day for _, day in barber_days),
+    )
+    DailyOccupancy.objects.bulk_create([
+        DailyOccupancy(barber_id=barber_id, date=day, booked=encode(booked[(barber_id, day)]), blocked=encode(blocked[(barber_id, day)]))
+        for barber_id, day in barber_days
+    ], ignore_conflicts=True)
+    return {key: booked[key] | blocked[key] for key in barber_days}
+
+
+def working_days(barber_days):
+    """Filtra os (barbeiro, dia) em que o barbeiro tem expediente."""
+    barber_days = set(barber_days)
+    if not barber_days:
+        return set()
+    weekdays = set(WorkingHour.objects.filter(
+        barber_id__in={barber_id for barber_id, _ in barber_days},
+        weekday__in={day.weekday() for _, day in barber_days},
+    ).values_list("barber_id", "weekday"))
+    return {(barber_id, day) for barber_id, day in barber_days if (barber_id, day.weekday()) in weekdays}
+
+
+def prune(before):
+    """Apaga os mapas de dias anteriores a `before`. Retorna quantos foram apagados."""
+    deleted, _ = DailyOccupancy.objects.filter(date__lt=before).delete()
+    return deleted
+
+
+def mark_booked(barber_id, date, start_time, end_time):
+    _update_booked(barber_id, date, lambda booked: booked | time_mask(start_time, end_time))
+
+
+def release_booked(barber_id, date, start_time, end_time):
+    _update_booked(barber_id, date, lambda booked: booked & ~time_mask(start_time, end_time))
+
+
+def release_booked_many(intervals):
+    """release_booked para vários agendamentos de uma vez: [(barbeiro, dia, início, fim)].
+
+    Lê os dias afetados numa consulta, monta os que ainda não têm mapa e grava
+    todos num bulk_update.
+    """
+    masks = defaultdict(int)
+    for barber_id, date, start_time, end_time in intervals:
+        masks[(barber_id, date)] |= time_mask(start_time, end_time)
+    if not masks:
+        return
+
+    rows_of_days = DailyOccupancy.objects.filter(
+        barber_id__in={barber_id for barber_id, _ in masks},
+        date__in={date for _, date in masks},
+    )
+    with transaction.atomic():
+        _create_missing(working_days(masks.keys() - set(rows_of_days.values_list("barber_id", "date"))))
+        rows = [row for row in rows_of_days.select_for_update() if (row.barber_id, row.date) in masks]
+        now = timezone.now()
+        for row in rows:
+            row.booked = encode(decode(row.booked) & ~masks[(row.barber_id, row.date)])
+            row.updated_at = now
+        DailyOccupancy.objects.bulk_update(rows, ["booked", "updated_at"], batch_size=500)
+
+
+def refresh_blocked(barber_id, date):
+    with transaction.atomic():
+        if not DailyOccupancy.objects.filter(barber_id=barber_id, date=date).exists():
+            _create_missing(working_days({(barber_id, date)}))
+        _, blocked = build_masks([barber_id], date, date)
+        DailyOccupancy.objects.filter(barber_id=barber_id, date=date).update(blocked=encode(blocked[(barber_id, date)]))
+
+
+def rebuild(barber_ids, start_date, end_date):
+    """Regrava os mapas do intervalo a partir das tabelas de origem. Retorna o número de dias gravados.
+
+    Como na leitura, só os dias com expediente são gravados.
+    """
+    days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    barber_days = working_days((barber_id, day) for barber_id in barber_ids for day in days)
+    booked, blocked = build_masks(barber_ids, start_date, end_date)
+    rows = [
+        DailyOccupancy(barber_id=barber_id, date=day, booked=encode(booked[(barber_id, day)]), blocked=encode(blocked[(barber_id, day)]))
+        for barber_id, day in sorted(barber_days)
+    ]
+    DailyOccupancy.objects.bulk_create(
+        rows,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["barber", "date"],
+        update_fields=["booked", "blocked", "updated_at"],
+    )
+    return len(rows)
+
+
+def find_drift(barber_ids, start_date, end_date):
+    """Dias gravados cujo mapa diverge das tabelas de origem: [(barber_id, date, campo)]."""
+    booked, blocked = build_masks(barber_ids, start_date, end_date)
+    drift = []
+    for barber_id, date, stored_booked, stored_blocked in DailyOccupancy.objects.filter(
+        barber_id__in=barber_ids,
+        date__range=(start_date, end_date)
+    ).values_list("barber_id", "date", "booked", "blocked").order_by("barber_id", "date"):
+        if decode(stored_booked) != booked[(barber_id, date)]:
+            drift.append((barber_id, date, "booked"))
+        if decode(stored_blocked) != blocked[(barber_id, date)]:
+            drift.append((barber_id, date, "blocked"))
+    return drift
+
+
+def _update_booked(barber_id, date, change):
+    # `change` só liga ou desliga os bits do agendamento, então reaplicá-lo a um
+    # mapa montado depois da mudança não altera nada.
+    with transaction.atomic():
+        row = DailyOccupancy.objects.select_for_update().filter(barber_id=barber_id, date=date).first()
+        if row is None:
+            # Sem expediente no dia, ninguém monta o mapa e não há o que corrigir.
+            if not _create_missing(working_days({(barber_id, date)})):
+                return
+            row = DailyOccupancy.objects.select_for_update().get(barber_id=barber_id, date=date)
+        row.booked = encode(change(decode(row.booked)))
+        row.save(update_fields=["booked", "updated_at"])
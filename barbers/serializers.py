@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.utils import timezone
-from core.utils import get_available_slots
+from core.utils import get_cached_available_slots, get_available_slots_range, get_available_slots_for_barbers, AVAILABILITY_RANGE_MAX_DAYS
 from services.serializers import ServiceSerializer
 from services.models import Service
 from barbers.models import Barber
@@ -40,7 +40,7 @@ class BarberAvailabilitySerializer(serializers.Serializer):
         except Service.DoesNotExist:
             raise serializers.ValidationError({"service_id": "Serviço inválido."})
 
-        slots = get_available_slots(barber_id, date, service)
+        slots = get_cached_available_slots(barber_id, date, service)
         attrs.update({
             "service": service,
             "available_slots": slots,
@@ -61,3 +61,102 @@ class BarberAvailabilitySerializer(serializers.Serializer):
             "available_slots": data.get("available_slots", []),
             **({"message": data["message"]} if "message" in data else {})
         }
+
+
+class BarberAvailabilityRangeSerializer(serializers.Serializer):
+    service_id = serializers.IntegerField(required=True)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # "from" é palavra reservada, então os campos do intervalo são declarados aqui.
+        fields["from"] = serializers.DateField(required=True)
+        fields["to"] = serializers.DateField(required=True)
+        return fields
+
+    def validate(self, attrs):
+        barber_id = self.context.get("barber_id")
+        start_date = attrs["from"]
+        end_date = attrs["to"]
+        service_id = attrs["service_id"]
+
+        if not barber_id:
+            raise serializers.ValidationError({"barber_id": "Barbeiro não informado no contexto."})
+
+        if start_date < timezone.localdate():
+            raise serializers.ValidationError({"from": "Data no passado não é permitida."})
+
+        if end_date < start_date:
+            raise serializers.ValidationError({"to": "A data final deve ser igual ou posterior à data inicial."})
+
+        if (end_date - start_date).days + 1 > AVAILABILITY_RANGE_MAX_DAYS:
+            raise serializers.ValidationError({"to": f"O intervalo máximo é de {AVAILABILITY_RANGE_MAX_DAYS} dias."})
+
+        try:
+            service = Service.objects.get(id=service_id)
+        except Service.DoesNotExist:
+            raise serializers.ValidationError({"service_id": "Serviço inválido."})
+
+        attrs.update({
+            "service": service,
+            "days": get_available_slots_range(barber_id, start_date, end_date, service),
+        })
+        return attrs
+
+    def to_representation(self, instance):
+        barber_id = self.context.get("barber_id")
+        data = self.validated_data
+        return {
+            "barber_id": barber_id,
+            "service_id": data["service_id"],
+            "service_duration": int(data["service"].duration),
+            "from": data["from"].strftime("%Y-%m-%d"),
+            "to": data["to"].strftime("%Y-%m-%d"),
+            "days": [
+                {"date": day.strftime("%Y-%m-%d"), "available_slots": slots}
+                for day, slots in data["days"].items()
+            ],
+        }
+
+
+class AnyBarberAvailabilitySerializer(serializers.Serializer):
+    date = serializers.DateField(required=True)
+    service_id = serializers.IntegerField(required=True)
+
+    def validate(self, attrs):
+        date = attrs["date"]
+        service_id = attrs["service_id"]
+
+        if date < timezone.localdate():
+            raise serializers.ValidationError({"date": "Data no passado não é permitida."})
+
+        try:
+            service = Service.objects.get(id=service_id)
+        except Service.DoesNotExist:
+            raise serializers.ValidationError({"service_id": "Serviço inválido."})
+
+        barber_ids = list(Barber.objects.filter(services=service, user__is_active=True).values_list("id", flat=True))
+        slots_by_barber = get_available_slots_for_barbers(barber_ids, date, service)
+
+        merged = {}
+        for barber_id in sorted(slots_by_barber):
+            for slot in slots_by_barber[barber_id]:
+                merged.setdefault(slot, []).append(barber_id)
+
+        attrs.update({
+            "service": service,
+            "available_slots": [{"time": slot, "barber_ids": merged[slot]} for slot in sorted(merged)],
+        })
+
+        if not merged:
+            attrs["message"] = "Nenhum horário disponível para este dia."
+        return attrs
+
+    def to_representation(self, instance):
+        data = self.validated_data
+        return {
+            "date": data["date"].strftime("%Y-%m-%d"),
+            "service_id": data["service_id"],
+            "service_duration": int(data["service"].duration),
+            "available_slots": data.get("available_slots", []),
+            **({"message": data["message"]} if "message" in data else {})
+        }
@@ -0,0 +1,60 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from accounts.models import User
+from core.choices import UserRole
+from core.http_cache import bump_model_version
+from core.utils import invalidate_available_slots, invalidate_available_days
+from .occupancy import refresh_blocked
+from .models import Barber, WorkingHour, BlockedTime
+
+
+def _blocked_days(instance):
+    """Dias afetados pela mudança do bloqueio: o atual e, se ele foi movido, o anterior."""
+    days = {(instance.barber_id, instance.date)}
+    previous = getattr(instance, "_previous_day", None)
+    if previous is not None:
+        days.add(previous)
+    return days
+
+
+@receiver(pre_save, sender=BlockedTime)
+def remember_blocked_time_day(sender, instance, **kwargs):
+    instance._previous_day = None
+    if not instance._state.adding:
+        instance._previous_day = BlockedTime.objects.filter(pk=instance.pk).values_list("barber_id", "date").first()
+
+
+@receiver([post_save, post_delete], sender=BlockedTime)
+def update_blocked_time_occupancy(sender, instance, **kwargs):
+    for barber_id, date in _blocked_days(instance):
+        refresh_blocked(barber_id, date)
+
+
+@receiver([post_save, post_delete], sender=BlockedTime)
+def invalidate_blocked_time_availability(sender, instance, **kwargs):
+    days = _blocked_days(instance)
+    transaction.on_commit(lambda: invalidate_available_days(days))
+
+
+@receiver([post_save, post_delete], sender=WorkingHour)
+def invalidate_working_hour_availability(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_available_slots(instance.barber_id))
+
+
+@receiver(post_save, sender=Barber)
+def invalidate_barber_availability(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_available_slots(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Barber)
+@receiver(m2m_changed, sender=Barber.services.through)
+def bump_barber_catalog_version(sender, instance, **kwargs):
+    bump_model_version(Barber)
+
+
+@receiver(post_save, sender=User)
+def bump_barber_user_catalog_version(sender, instance, **kwargs):
+    # Nome, telefone e status do barbeiro vêm do usuário.
+    if instance.role == UserRole.BARBER:
+        bump_model_version(Barber)
@@ -0,0 +1,14 @@
+import logging
+from celery import shared_task
+from django.utils import timezone
+from .occupancy import prune
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def prune_occupancy():
+    """Apaga os mapas de ocupação de dias que já passaram."""
+    deleted = prune(timezone.localdate())
+    logger.info("Ocupação: %s dias passados apagados.", deleted)
+    return f"{deleted} mapas de ocupação apagados."
@@ -0,0 +1,304 @@
+import time as time_module
+from datetime import date, time, timedelta
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from accounts.models import User
+from appointments.models import Appointment
+from barbershops.models import BarberShop
+from core.redis_client import get_redis, reset_redis
+from core.utils import (
+    AVAILABILITY_CACHE_TTL, AVAILABILITY_CACHE_TTL_TODAY, SLOT_HOLD_TTL, _availability_barber_version_key,
+    _availability_day_version_key, get_available_slots_range, get_cached_available_slots, hold_slot,
+)
+from services.models import Service
+from .models import Barber, BlockedTime, DailyOccupancy, WorkingHour
+from .occupancy import build_masks, find_drift, get_busy_masks, prune, rebuild, time_mask
+
+
+@override_settings(REDIS_URL="memory://")
+class OccupancySignalTests(TestCase):
+    def setUp(self):
+        reset_redis()
+        self.addCleanup(reset_redis)
+        self.barber = Barber.objects.create(user=User.objects.create_user(phone="21999990000", name="Barbeiro", role="barber"))
+        self.service = Service.objects.create(name="Corte", duration=45, price=40)
+        self.client_user = User.objects.create_user(phone="21999990001", name="Cliente")
+        self.day = date(2030, 1, 7)
+        self.other_day = date(2030, 1, 8)
+        for day in (self.day, self.other_day):
+            WorkingHour.objects.create(barber=self.barber, weekday=day.weekday(), start_time=time(9), end_time=time(18))
+        rebuild([self.barber.id], self.day, self.other_day)
+
+    def book(self, hour, **kwargs):
+        return Appointment.objects.create(
+            client=self.client_user, barber=self.barber, service=self.service, date=self.day,
+            start_time=time(hour), end_time=time(hour, 45), status="scheduled", **kwargs,
+        )
+
+    def assertNoDrift(self):
+        self.assertEqual(find_drift([self.barber.id], self.day, self.other_day), [])
+
+    def day_version(self, day):
+        return int(get_redis().get(_availability_day_version_key(self.barber.id, day)) or 0)
+
+    def test_moving_an_appointment_frees_the_old_interval(self):
+        appointment = self.book(9)
+        appointment.start_time, appointment.end_time = time(15), time(15, 45)
+        appointment.save()
+        self.assertNoDrift()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.date = self.other_day
+            appointment.save()
+        self.assertNoDrift()
+        self.assertEqual((self.day_version(self.day), self.day_version(self.other_day)), (1, 1))
+
+    def test_saving_a_canceled_appointment_keeps_the_new_booking(self):
+        old = self.book(9)
+        old.cancel()
+        self.book(9)
+
+        old.cancel_reason = "Cliente desistiu"
+        old.save()
+        self.assertNoDrift()
+
+        old.delete()
+        self.assertNoDrift()
+
+    def test_moving_a_block_clears_the_old_day(self):
+        block = BlockedTime.objects.create(barber=self.barber, date=self.day, start_time=time(12), end_time=time(13))
+        with self.captureOnCommitCallbacks(execute=True):
+            block.date = self.other_day
+            block.save()
+        self.assertNoDrift()
+        self.assertEqual((self.day_version(self.day), self.day_version(self.other_day)), (1, 1))
+
+    def read_day_around(self, change):
+        """Lê o dia sem mapa gravado, aplicando `change` entre a leitura das tabelas e a gravação do mapa."""
+        DailyOccupancy.objects.all().delete()
+        pending = [change]
+
+        def build_then_change(*args):
+            masks = build_masks(*args)
+            if pending:
+                pending.pop()()
+            return masks
+
+        with mock.patch("barbers.occupancy.build_masks", side_effect=build_then_change):
+            get_busy_masks({(self.barber.id, self.day)})
+
+    def test_booking_while_the_day_is_being_built(self):
+        self.read_day_around(lambda: self.book(9))
+        self.assertNoDrift()
+        self.assertEqual(get_busy_masks({(self.barber.id, self.day)})[(self.barber.id, self.day)], time_mask(time(9), time(9, 45)))
+
+    def test_canceling_while_the_day_is_being_built(self):
+        appointment = self.book(9)
+        self.read_day_around(appointment.cancel)
+        self.assertNoDrift()
+        self.assertEqual(get_busy_masks({(self.barber.id, self.day)})[(self.barber.id, self.day)], 0)
+
+
+class BusyMaskTests(TestCase):
+    def setUp(self):
+        self.barber = Barber.objects.create(user=User.objects.create_user(phone="21999990000", name="Barbeiro", role="barber"))
+        WorkingHour.objects.create(barber=self.barber, weekday=0, start_time=time(9), end_time=time(18))
+
+    def test_availability_stores_only_working_days_and_prune_drops_past_ones(self):
+        service = Service.objects.create(name="Corte", duration=30, price=40)
+        monday = date(2030, 1, 7)
+        get_available_slots_range(self.barber.id, monday, monday + timedelta(days=6), service)
+        self.assertEqual(list(DailyOccupancy.objects.values_list("date", flat=True)), [monday])
+
+        self.assertEqual(prune(monday), 0)
+        self.assertEqual(prune(monday + timedelta(days=1)), 1)
+
+    def test_rebuild_skips_days_off(self):
+        monday = date(2030, 1, 7)
+        self.assertEqual(rebuild([self.barber.id], monday, monday + timedelta(days=13)), 2)
+        self.assertEqual(list(DailyOccupancy.objects.values_list("date", flat=True).order_by("date")), [monday, monday + timedelta(days=7)])
+
+
+@override_settings(REDIS_URL="memory://")
+class AvailabilityTestCase(TestCase):
+    day = date(2030, 1, 7)  # segunda-feira
+
+    def setUp(self):
+        reset_redis()
+        self.addCleanup(reset_redis)
+        self.barber = self.create_barber("21999990000")
+        self.service = Service.objects.create(name="Corte", duration=30, price=40)
+        self.barber.services.add(self.service)
+        self.client_user = User.objects.create_user(phone="21999990009", name="Cliente")
+
+    def create_barber(self, phone, weekday=0, start=9, end=18):
+        barber = Barber.objects.create(user=User.objects.create_user(phone=phone, name="Barbeiro", role="barber"))
+        WorkingHour.objects.create(barber=barber, weekday=weekday, start_time=time(start), end_time=time(end))
+        return barber
+
+    def book(self, barber, hour, day=None):
+        return Appointment.objects.create(
+            client=self.client_user, barber=barber, service=self.service, date=day or self.day,
+            start_time=time(hour), end_time=time(hour, 30), status="scheduled",
+        )
+
+
+class AvailabilityRangeTests(AvailabilityTestCase):
+    def get(self, start, end):
+        return self.client.get(
+            f"/api/v1/barbers/{self.barber.id}/availability-range/",
+            {"from": start.isoformat(), "to": end.isoformat(), "service_id": self.service.id},
+        )
+
+    def test_returns_every_day_of_the_range(self):
+        self.book(self.barber, 9)
+        self.book(self.barber, 10, day=self.day + timedelta(days=7))
+
+        response = self.get(self.day, self.day + timedelta(days=7))
+        self.assertEqual(response.status_code, 200)
+        days = {day["date"]: day["available_slots"] for day in response.json()["days"]}
+        self.assertEqual(len(days), 8)
+        self.assertEqual(days["2030-01-07"][:2], ["09:30", "10:00"])
+        self.assertEqual(days["2030-01-14"][:3], ["09:00", "09:30", "10:30"])
+        self.assertEqual(days["2030-01-08"], [])
+
+    def test_matches_the_single_day_endpoint(self):
+        self.book(self.barber, 11)
+        single = self.client.get(
+            f"/api/v1/barbers/{self.barber.id}/availability/",
+            {"date": self.day.isoformat(), "service_id": self.service.id},
+        ).json()
+        days = self.get(self.day, self.day).json()["days"]
+        self.assertEqual(days, [{"date": "2030-01-07", "available_slots": single["available_slots"]}])
+
+    def test_rejects_inverted_and_oversized_ranges(self):
+        self.assertEqual(self.get(self.day, self.day - timedelta(days=1)).status_code, 400)
+        self.assertEqual(self.get(self.day, self.day + timedelta(days=31)).status_code, 400)
+        self.assertEqual(self.get(self.day, self.day + timedelta(days=30)).status_code, 200)
+
+
+class AnyBarberAvailabilityTests(AvailabilityTestCase):
+    def get(self):
+        return self.client.get("/api/v1/barbers/availability/", {"date": self.day.isoformat(), "service_id": self.service.id})
+
+    def test_merges_the_slots_of_every_barber(self):
+        other = self.create_barber("21999990002", start=8, end=10)
+        other.services.add(self.service)
+        self.book(self.barber, 9)
+
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        slots = {slot["time"]: slot["barber_ids"] for slot in response.json()["available_slots"]}
+        self.assertEqual(slots["08:00"], [other.id])
+        self.assertEqual(slots["09:00"], [other.id])
+        self.assertEqual(slots["09:30"], sorted([self.barber.id, other.id]))
+        self.assertEqual(slots["17:30"], [self.barber.id])
+
+    def test_skips_inactive_barbers_and_those_without_the_service(self):
+        self.create_barber("21999990002", start=7, end=8)
+        inactive = self.create_barber("21999990003", start=7, end=8)
+        inactive.services.add(self.service)
+        inactive.user.is_active = False
+        inactive.user.save()
+
+        slots = self.get().json()["available_slots"]
+        self.assertEqual({barber_id for slot in slots for barber_id in slot["barber_ids"]}, {self.barber.id})
+
+    def test_reports_a_fully_booked_day(self):
+        for hour in range(9, 18):
+            self.book(self.barber, hour)
+            Appointment.objects.create(
+                client=self.client_user, barber=self.barber, service=self.service, date=self.day,
+                start_time=time(hour, 30), end_time=time(hour + 1), status="scheduled",
+            )
+        data = self.get().json()
+        self.assertEqual(data["available_slots"], [])
+        self.assertIn("message", data)
+
+
+class AvailabilityCacheTests(AvailabilityTestCase):
+    def slots(self, day=None):
+        return get_cached_available_slots(self.barber.id, day or self.day, self.service)
+
+    def cache_ttl(self, day):
+        return get_redis().ttl(f"availability:{self.barber.id}:{day:%Y-%m-%d}:30:0:0")
+
+    def test_appointments_invalidate_their_day(self):
+        self.assertIn("09:00", self.slots())
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = self.book(self.barber, 9)
+        self.assertNotIn("09:00", self.slots())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.cancel()
+        self.assertIn("09:00", self.slots())
+
+    def test_blocks_invalidate_their_day(self):
+        self.assertIn("12:00", self.slots())
+        with self.captureOnCommitCallbacks(execute=True):
+            block = BlockedTime.objects.create(barber=self.barber, date=self.day, start_time=time(12), end_time=time(13))
+        self.assertNotIn("12:00", self.slots())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            block.delete()
+        self.assertIn("12:00", self.slots())
+
+    def test_working_hours_invalidate_every_day_of_the_barber(self):
+        next_week = self.day + timedelta(days=7)
+        self.assertEqual(self.slots()[-1], "17:30")
+        self.assertEqual(self.slots(next_week)[-1], "17:30")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            WorkingHour.objects.filter(barber=self.barber).update(end_time=time(12))
+            WorkingHour.objects.get(barber=self.barber).save()
+        self.assertEqual(self.slots()[-1], "11:30")
+        self.assertEqual(self.slots(next_week)[-1], "11:30")
+        self.assertEqual(int(get_redis().get(_availability_barber_version_key(self.barber.id))), 1)
+
+    def test_versions_only_move_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.book(self.barber, 9)
+        self.assertEqual(get_redis().get(_availability_day_version_key(self.barber.id, self.day)), None)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(int(get_redis().get(_availability_day_version_key(self.barber.id, self.day))), 1)
+        self.assertEqual(get_redis().get(_availability_day_version_key(self.barber.id, self.day + timedelta(days=7))), None)
+
+    def test_expired_hold_frees_the_cached_slot(self):
+        self.assertIn("10:00", self.slots())
+        self.assertTrue(hold_slot(self.barber.id, self.day, time(10), time(10, 30), "21999990009"))
+        self.assertNotIn("10:00", self.slots())
+        self.assertEqual(self.slots(), get_available_slots_range(self.barber.id, self.day, self.day, self.service)[self.day])
+
+        expired = time_module.time() + SLOT_HOLD_TTL + 1
+        with mock.patch("time.time", return_value=expired):
+            self.assertIn("10:00", self.slots())
+
+    def test_today_is_cached_for_a_short_time(self):
+        today = timezone.localdate()
+        WorkingHour.objects.create(barber=self.barber, weekday=today.weekday(), start_time=time(0), end_time=time(23))
+        self.slots(today)
+        self.slots(self.day)
+        self.assertAlmostEqual(self.cache_ttl(today), AVAILABILITY_CACHE_TTL_TODAY, delta=1)
+        self.assertAlmostEqual(self.cache_ttl(self.day), AVAILABILITY_CACHE_TTL, delta=1)
+
+
+class SlotIntervalTests(AvailabilityTestCase):
+    def slots(self):
+        return get_available_slots_range(self.barber.id, self.day, self.day, self.service)[self.day][:3]
+
+    def test_defaults_to_the_service_duration(self):
+        BarberShop.objects.create()
+        self.assertEqual(self.slots(), ["09:00", "09:30", "10:00"])
+
+    def test_shop_interval_applies_to_every_barber(self):
+        BarberShop.objects.create(slot_interval=15)
+        self.assertEqual(self.slots(), ["09:00", "09:15", "09:30"])
+
+    def test_barber_interval_overrides_the_shop(self):
+        BarberShop.objects.create(slot_interval=15)
+        self.barber.slot_interval = 10
+        self.barber.save()
+        self.assertEqual(self.slots(), ["09:00", "09:10", "09:20"])
@@ -1,14 +1,17 @@
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import viewsets, status
+from core.http_cache import ConditionalGetMixin
+from services.models import Service
 from .models import Barber
-from .serializers import BarberSerializer, BarberAvailabilitySerializer
+from .serializers import BarberSerializer, BarberAvailabilitySerializer, BarberAvailabilityRangeSerializer, AnyBarberAvailabilitySerializer
 
 
-class BarberViewSet(viewsets.ModelViewSet):
-    queryset = Barber.objects.all()
+class BarberViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Barber.objects.select_related("user").prefetch_related("services")
     serializer_class = BarberSerializer
     pagination_class = None
+    cache_models = (Barber, Service)
 
     @action(detail=True, methods=["get"], url_path="availability")
     def availability(self, request, pk=None):
@@ -18,3 +21,18 @@ class BarberViewSet(viewsets.ModelViewSet):
         )
         serializer.is_valid(raise_exception=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=["get"], url_path="availability-range")
+    def availability_range(self, request, pk=None):
+        serializer = BarberAvailabilityRangeSerializer(
+            data=request.query_params,
+            context={"barber_id": pk}
+        )
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"], url_path="availability", url_name="any-availability")
+    def any_availability(self, request):
+        serializer = AnyBarberAvailabilitySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BarbershopsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'barbershops'
+
+    def ready(self):
+        import barbershops.signals
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 14:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbershops', '0002_alter_barbershop_address_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='barbershop',
+            name='slot_interval',
+            field=models.PositiveIntegerField(default=15, help_text='Intervalo entre horários em minutos.'),
+        ),
+    ]
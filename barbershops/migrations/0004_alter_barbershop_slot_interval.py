@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-17 18:20
+
+from django.db import migrations, models
+
+
+def restore_service_duration_grid(apps, schema_editor):
+    # A 0003 gravou 15 minutos em todas as barbearias, o que trocava a grade
+    # anterior (a duração do serviço). Quem ainda está no padrão volta a ela.
+    BarberShop = apps.get_model('barbershops', 'BarberShop')
+    BarberShop.objects.filter(slot_interval=15).update(slot_interval=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('barbershops', '0003_barbershop_slot_interval'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='barbershop',
+            name='slot_interval',
+            field=models.PositiveIntegerField(blank=True, help_text='Intervalo entre horários em minutos. Vazio usa a duração do serviço.', null=True),
+        ),
+        migrations.RunPython(restore_service_duration_grid, migrations.RunPython.noop),
+    ]
@@ -8,3 +8,4 @@ class BarberShop(models.Model):
     address = models.CharField(max_length=200, default='Duque de Caxias')
     phone = models.CharField(max_length=100, default='21987825934')
     coordenation = models.CharField(max_length=100, default='-22.787954, -43.310263')
+    slot_interval = models.PositiveIntegerField(blank=True, null=True, help_text='Intervalo entre horários em minutos. Vazio usa a duração do serviço.')
@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from barbers.models import Barber
+from core.http_cache import bump_model_version
+from core.utils import invalidate_available_slots
+from .models import BarberShop
+
+
+@receiver(post_save, sender=BarberShop)
+def invalidate_shop_availability(sender, instance, **kwargs):
+    def invalidate():
+        for barber_id in Barber.objects.values_list("id", flat=True):
+            invalidate_available_slots(barber_id)
+
+    transaction.on_commit(invalidate)
+
+
+@receiver([post_save, post_delete], sender=BarberShop)
+def bump_shop_catalog_version(sender, instance, **kwargs):
+    bump_model_version(BarberShop)
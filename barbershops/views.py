@@ -1,12 +1,14 @@
 from rest_framework import viewsets
+from core.http_cache import ConditionalGetMixin
 from .models import BarberShop
 from .serializers import BarberShopSerializer
 
 
-class BarberShopViewSet(viewsets.ReadOnlyModelViewSet):
+class BarberShopViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = BarberShop.objects.all()
     serializer_class = BarberShopSerializer
     pagination_class = None
+    cache_models = (BarberShop,)
 
     def get_queryset(self):
         return BarberShop.objects.all()[:1]
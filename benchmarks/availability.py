@@ -0,0 +1,97 @@
+"""Microbenchmark do cálculo de horários livres.
+
+Compara o laço aninhado antigo (cada slot contra cada bloqueio e agendamento)
+com o motor de intervalos de core.intervals em dias cada vez mais cheios.
+Não precisa de banco nem de Django:
+
+    python -m benchmarks.availability
+"""
+import random
+import timeit
+from datetime import date, datetime, time, timedelta
+
+from core.intervals import available_starts, format_minutes
+
+DAY = date(2025, 1, 6)
+OPEN = time(7, 0)
+CLOSE = time(23, 0)
+
+
+def legacy_slots(day, start_exp, end_exp, blocked, busy_appointments, duration_min):
+    def overlaps(a_start, a_end, b_start, b_end):
+        return a_start < b_end and a_end > b_start
+
+    slots = []
+    t0 = datetime.combine(day, start_exp)
+    end_boundary = datetime.combine(day, end_exp)
+    step = timedelta(minutes=duration_min)
+
+    while True:
+        t1 = t0 + step
+        if t1 > end_boundary:
+            break
+
+        slot_start = t0.time()
+        slot_end = t1.time()
+        invalid = False
+
+        for b_start, b_end in blocked:
+            if overlaps(slot_start, slot_end, b_start, b_end):
+                invalid = True
+                break
+
+        if not invalid:
+            for a_start, a_end in busy_appointments:
+                if overlaps(slot_start, slot_end, a_start, a_end):
+                    invalid = True
+                    break
+
+        if not invalid:
+            slots.append(slot_start.strftime("%H:%M"))
+
+        t0 += step
+
+    return slots
+
+
+def sweep_slots(shifts, busy, duration_min):
+    return [format_minutes(start) for start in available_starts(shifts, busy, duration_min)]
+
+
+def dense_day(busy_count, duration_min, seed=0):
+    rng = random.Random(seed)
+    open_min = OPEN.hour * 60
+    close_min = CLOSE.hour * 60
+    intervals = []
+    for _ in range(busy_count):
+        start = rng.randrange(open_min, close_min - duration_min, 5)
+        intervals.append((start, start + rng.choice((10, 15, 20, 30))))
+    blocked = intervals[: busy_count // 4]
+    appointments = intervals[busy_count // 4:]
+    return blocked, appointments
+
+
+def as_times(intervals):
+    return [(time(s // 60, s % 60), time(e // 60, e % 60)) for s, e in intervals]
+
+
+def run(busy_counts=(10, 50, 200, 800), duration_min=5, number=200):
+    shifts = [(OPEN.hour * 60, CLOSE.hour * 60)]
+    print(f"duração {duration_min} min, expediente {OPEN:%H:%M}-{CLOSE:%H:%M}, {number} execuções")
+    print(f"{'ocupados':>9} {'laço (ms)':>11} {'sweep (ms)':>11} {'ganho':>7}")
+    for busy_count in busy_counts:
+        blocked, appointments = dense_day(busy_count, duration_min)
+        blocked_t, appointments_t = as_times(blocked), as_times(appointments)
+
+        expected = legacy_slots(DAY, OPEN, CLOSE, blocked_t, appointments_t, duration_min)
+        assert sweep_slots(shifts, blocked + appointments, duration_min) == expected
+
+        legacy = timeit.timeit(
+            lambda: legacy_slots(DAY, OPEN, CLOSE, blocked_t, appointments_t, duration_min), number=number
+        )
+        sweep = timeit.timeit(lambda: sweep_slots(shifts, blocked + appointments, duration_min), number=number)
+        print(f"{busy_count:>9} {legacy / number * 1000:>11.3f} {sweep / number * 1000:>11.3f} {legacy / sweep:>6.1f}x")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,101 @@
+"""Cache HTTP condicional para os endpoints de catálogo.
+
+Cada model de catálogo tem um contador de versão no cache do Django, trocado
+pelos sinais de save/delete (ver `bump_model_version`). O ETag e o
+Last-Modified de uma listagem saem só desses contadores e da URL, então um
+If-None-Match que ainda bate é respondido com 304 sem tocar no banco. Quando a
+versão muda, o corpo JSON renderizado fica guardado no cache até a próxima troca.
+"""
+import time
+import hashlib
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework.response import Response
+
+CATALOG_CACHE_TIMEOUT = 3600
+
+
+def _version_key(model):
+    return f"catalog:version:{model._meta.label_lower}"
+
+
+def bump_model_version(sender, **kwargs):
+    """Receptor de post_save/post_delete/m2m_changed: invalida o catálogo do model `sender`."""
+    key = _version_key(sender)
+    transaction.on_commit(lambda: cache.set(key, time.time_ns(), None))
+
+
+def get_model_versions(models):
+    """Versões atuais dos models (nanossegundos da última mudança), numa ida ao cache.
+
+    Retorna None se alguma não puder ser lida (cache fora do ar).
+    """
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        now = time.time_ns()
+        for key in missing:
+            cache.add(key, now, None)
+        versions.update(cache.get_many(missing))
+    if any(key not in versions for key in keys):
+        return None
+    return [versions[key] for key in keys]
+
+
+class ConditionalGetMixin:
+    """Listagem com ETag/Last-Modified e corpo em cache.
+
+    A view declara em `cache_models` todos os models que aparecem na resposta,
+    inclusive os aninhados no serializer.
+    """
+    cache_models = ()
+    cache_timeout = CATALOG_CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        versions = get_model_versions(self.cache_models)
+        if versions is None:
+            # Sem versão não há como validar o ETag depois: responde sem ele.
+            response = super().list(request, *args, **kwargs)
+            patch_cache_control(response, no_cache=True)
+            return response
+
+        last_modified = max(versions, default=0) // 1_000_000_000
+        renderer = request.accepted_renderer.format
+        digest = hashlib.md5(f"{request.build_absolute_uri()}|{renderer}|{versions}".encode()).hexdigest()
+        etag = quote_etag(digest)
+        body_key = f"catalog:body:{digest}"
+
+        if self._not_modified(request, etag, last_modified):
+            response = HttpResponseNotModified()
+        elif renderer == "json" and (cached := cache.get(body_key)) is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+        else:
+            response = super().list(request, *args, **kwargs)
+            if renderer == "json":
+                self._catalog_body_key = body_key
+
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        body_key = getattr(self, "_catalog_body_key", None)
+        if body_key and isinstance(response, Response) and response.status_code == 200:
+            response.render()
+            cache.set(body_key, (response.rendered_content, response["Content-Type"]), self.cache_timeout)
+        return response
+
+    def _not_modified(self, request, etag, last_modified):
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return etag in tags or "*" in tags
+        if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+        return if_modified_since is not None and last_modified <= if_modified_since
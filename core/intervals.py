@@ -0,0 +1,77 @@
+"""Motor de intervalos usado no cálculo de disponibilidade.
+
+Todos os horários são tratados em minutos desde a meia-noite, o que evita criar
+objetos datetime dentro dos laços. Nada aqui depende do Django.
+"""
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def parse_minutes(value):
+    """Inverso de format_minutes: "09:30" -> 570."""
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def merge_intervals(intervals):
+    """Ordena e une intervalos [início, fim) que se sobrepõem ou se tocam."""
+    merged = []
+    for start, end in sorted(intervals):
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def free_intervals(window_start, window_end, busy):
+    """Trechos livres da janela, dado `busy` já ordenado e unido por merge_intervals."""
+    free = []
+    cursor = window_start
+    for start, end in busy:
+        if end <= cursor:
+            continue
+        if start >= window_end:
+            break
+        if start > cursor:
+            free.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < window_end:
+        free.append((cursor, window_end))
+    return free
+
+
+def slot_starts(free, duration, step, origin):
+    """Inícios na grade origin + k * step em que `duration` cabe inteiro num trecho livre."""
+    starts = []
+    for start, end in free:
+        offset = start - origin
+        first = origin + -(-offset // step) * step
+        starts.extend(range(first, end - duration + 1, step))
+    return starts
+
+
+def available_starts(shifts, busy, duration, step=None):
+    """Inícios livres (em minutos) para um dia com um ou mais expedientes.
+
+    A grade de cada expediente começa no seu próprio horário de abertura e anda
+    de `step` em `step` minutos (por padrão, a própria duração). Como os trechos
+    livres já vêm prontos, cada início é gerado direto por range(), sem testar
+    sobreposição slot a slot, o que mantém o custo baixo mesmo com grades finas.
+    """
+    step = step or duration
+    busy = merge_intervals(busy)
+    starts = set()
+    for shift_start, shift_end in shifts:
+        free = free_intervals(shift_start, shift_end, busy)
+        starts.update(slot_starts(free, duration, step, shift_start))
+    return sorted(starts)
@@ -0,0 +1,140 @@
+import json
+import base64
+import binascii
+from functools import reduce
+from operator import or_
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Paginação por chave (keyset) sobre a ordenação da view.
+
+    O cursor guarda os valores da ordenação na borda da página, e a próxima
+    página é buscada com um WHERE sobre essa tupla em vez de OFFSET. Não há
+    COUNT(*), então o custo de cada página não depende do tamanho do histórico.
+
+    A view informa a ordenação em `keyset_ordering` (ex.: ("-date", "-id")); o
+    último campo precisa ser único para desempatar. Funciona tanto com
+    instâncias quanto com querysets de values().
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    ordering = ("-id",)
+    invalid_cursor_message = "Cursor inválido."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.ordering = tuple(getattr(view, "keyset_ordering", self.ordering))
+        reverse, position = self.decode_cursor(request)
+        if position is not None:
+            position = self._parse_position(queryset, position)
+
+        ordering = [self._flip(field) for field in self.ordering] if reverse else list(self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        del rows[self.page_size:]
+
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(True, self.page[0])
+
+    def encode_cursor(self, reverse, row):
+        position = [self._value(row, field.lstrip("-")) for field in self.ordering]
+        payload = json.dumps([reverse, position], default=str, separators=(",", ":"))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """(reverse, valores) do cursor da requisição; (False, None) na primeira página."""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return False, None
+        try:
+            reverse, position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return bool(reverse), position
+
+    def _parse_position(self, queryset, position):
+        """Converte os valores do cursor para os tipos dos campos da ordenação.
+
+        Um cursor que decodifica mas traz valores que não servem aos campos
+        (texto num id, data malformada, null) é tão inválido quanto um ilegível.
+        """
+        values = []
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip("-")
+            try:
+                annotation = queryset.query.annotations.get(name)
+                model_field = annotation.output_field if annotation is not None else queryset.model._meta.get_field(name)
+                value = model_field.to_python(value)
+            except (FieldDoesNotExist, TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            values.append(value)
+        return values
+
+    def _after(self, ordering, position):
+        """Linhas que vêm depois de `position` em `ordering`: (a > x) OR (a = x AND b > y) OR ..."""
+        clauses = []
+        for i, field in enumerate(ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            clause = Q(**{f"{name}__{lookup}": position[i]})
+            for previous, value in zip(ordering[:i], position):
+                clause &= Q(**{previous.lstrip("-"): value})
+            clauses.append(clause)
+        return reduce(or_, clauses)
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def _value(row, name):
+        return row[name] if isinstance(row, dict) else getattr(row, name)
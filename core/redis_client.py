@@ -0,0 +1,236 @@
+"""Cliente Redis compartilhado pelo projeto.
+
+O cliente é criado na primeira chamada de get_redis(), não na importação: comandos
+de gerenciamento, migrações e o beat do Celery sobem sem depender do Redis. Todas
+as chamadas usam um único BlockingConnectionPool por processo, com tamanho,
+timeouts e health check vindos das configurações.
+
+Com WEB_REDIS_URL=memory:// o cliente é um InMemoryRedis: mesma interface, dados
+num dicionário do processo. Serve para testes e para rodar a API num único nó sem
+Redis. Scripts Lua não rodam nele; por isso cada script do projeto é um
+RedisScript, que carrega uma implementação Python equivalente.
+"""
+import threading
+import time
+import redis
+from django.conf import settings
+
+MEMORY_SCHEME = "memory://"
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_redis():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _create_client(settings.REDIS_URL)
+    return _client
+
+
+def reset_redis():
+    """Descarta o cliente atual (e fecha o pool); o próximo get_redis() cria outro."""
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
+
+
+def _create_client(url):
+    if url.startswith(MEMORY_SCHEME):
+        return InMemoryRedis()
+    pool = redis.BlockingConnectionPool.from_url(
+        url,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+class RedisScript:
+    """Script Lua com uma versão Python para o InMemoryRedis.
+
+    `fallback(r, keys, args)` recebe os argumentos como strings, como o Lua, e
+    roda com o lock do InMemoryRedis, o que a torna tão atômica quanto o script.
+    """
+
+    def __init__(self, lua, fallback):
+        self.lua = lua
+        self.fallback = fallback
+        self._registered = None
+
+    def __call__(self, r, keys=(), args=()):
+        if isinstance(r, InMemoryRedis):
+            with r.lock:
+                return self.fallback(r, list(keys), [str(arg) for arg in args])
+        script = self._registered
+        if script is None or script.registered_client is not r:
+            script = self._registered = r.register_script(self.lua)
+        return script(keys=keys, args=args)
+
+
+def _encode(value):
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode()
+    return str(value).encode()
+
+
+class InMemoryRedis:
+    """Subconjunto do redis.Redis usado pelo projeto, guardado na memória do processo.
+
+    Os valores voltam como bytes, como no cliente real. As chaves vencidas são
+    descartadas na leitura.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._data = {}
+        self._expires = {}
+
+    def _alive(self, key):
+        key = _encode(key)
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key if key in self._data else None
+
+    def _hash(self, name):
+        key = self._alive(name)
+        return self._data.get(key, {}) if key else {}
+
+    def ping(self):
+        return True
+
+    def close(self):
+        pass
+
+    def flushdb(self):
+        with self.lock:
+            self._data.clear()
+            self._expires.clear()
+        return True
+
+    def pipeline(self, transaction=True):
+        return InMemoryPipeline(self)
+
+    def get(self, name):
+        with self.lock:
+            key = self._alive(name)
+            return self._data[key] if key else None
+
+    def mget(self, *names):
+        with self.lock:
+            return [self.get(name) for name in names]
+
+    def set(self, name, value, ex=None, nx=False):
+        with self.lock:
+            if nx and self._alive(name):
+                return None
+            key = _encode(name)
+            self._data[key] = _encode(value)
+            self._expires.pop(key, None)
+            if ex is not None:
+                self.expire(key, ex)
+            return True
+
+    def setex(self, name, seconds, value):
+        return self.set(name, value, ex=seconds)
+
+    def delete(self, *names):
+        with self.lock:
+            deleted = 0
+            for name in names:
+                key = self._alive(name)
+                if key:
+                    del self._data[key]
+                    self._expires.pop(key, None)
+                    deleted += 1
+            return deleted
+
+    def exists(self, *names):
+        with self.lock:
+            return sum(1 for name in names if self._alive(name))
+
+    def incr(self, name, amount=1):
+        with self.lock:
+            key = self._alive(name)
+            value = int(self._data[key]) + amount if key else amount
+            key = _encode(name)
+            self._data[key] = _encode(value)
+            return value
+
+    def expire(self, name, seconds):
+        with self.lock:
+            key = self._alive(name)
+            if not key:
+                return False
+            self._expires[key] = time.monotonic() + int(seconds)
+            return True
+
+    def ttl(self, name):
+        with self.lock:
+            key = self._alive(name)
+            if not key:
+                return -2
+            expires = self._expires.get(key)
+            return -1 if expires is None else max(int(expires - time.monotonic()), 0)
+
+    def hgetall(self, name):
+        with self.lock:
+            return dict(self._hash(name))
+
+    def hset(self, name, key, value):
+        with self.lock:
+            self._alive(name)
+            mapping = self._data.setdefault(_encode(name), {})
+            created = _encode(key) not in mapping
+            mapping[_encode(key)] = _encode(value)
+            return int(created)
+
+    def hdel(self, name, *keys):
+        with self.lock:
+            mapping = self._hash(name)
+            deleted = sum(1 for key in keys if mapping.pop(_encode(key), None) is not None)
+            if deleted and not mapping:
+                self.delete(name)
+            return deleted
+
+
+class InMemoryPipeline:
+    """Acumula os comandos e os executa de uma vez, sob o lock do InMemoryRedis."""
+
+    def __init__(self, client):
+        self._client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((method, args, kwargs))
+            return self
+        return queue
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.reset()
+
+    def reset(self):
+        self._commands = []
+
+    def execute(self):
+        with self._client.lock:
+            results = [method(*args, **kwargs) for method, args, kwargs in self._commands]
+        self.reset()
+        return results
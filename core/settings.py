@@ -15,20 +15,101 @@ AUTH_USER_MODEL = 'accounts.User'
 
 REDIS_URL = config('WEB_REDIS_URL')
 
+# Pool do cliente de core/redis_client.py. Com o pool cheio, a requisição espera
+# REDIS_POOL_TIMEOUT segundos por uma conexão livre antes de falhar.
+REDIS_MAX_CONNECTIONS = config('REDIS_MAX_CONNECTIONS', default=50, cast=int)
+REDIS_POOL_TIMEOUT = config('REDIS_POOL_TIMEOUT', default=2, cast=float)
+REDIS_SOCKET_TIMEOUT = config('REDIS_SOCKET_TIMEOUT', default=1, cast=float)
+REDIS_CONNECT_TIMEOUT = config('REDIS_CONNECT_TIMEOUT', default=1, cast=float)
+REDIS_HEALTH_CHECK_INTERVAL = config('REDIS_HEALTH_CHECK_INTERVAL', default=30, cast=int)
+
+if REDIS_URL.startswith('memory://'):
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                # Cache fora do ar não derruba a API: as leituras viram miss.
+                "IGNORE_EXCEPTIONS": True,
+                "SOCKET_TIMEOUT": REDIS_SOCKET_TIMEOUT,
+                "SOCKET_CONNECT_TIMEOUT": REDIS_CONNECT_TIMEOUT,
+                "CONNECTION_POOL_KWARGS": {
+                    "max_connections": REDIS_MAX_CONNECTIONS,
+                    "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+                },
+            },
+        }
+    }
+
 EVOLUTION_API_URL = config('EVOLUTION_API_URL')
+EVOLUTION_API_KEY = config('EVOLUTION_API_KEY', default='')
+EVOLUTION_INSTANCE = config('EVOLUTION_INSTANCE', default='barbearia')
+EVOLUTION_TIMEOUT = config('EVOLUTION_TIMEOUT', default=5, cast=float)
+EVOLUTION_POOL_SIZE = config('EVOLUTION_POOL_SIZE', default=10, cast=int)
+# Mensagens por segundo na instância, somando todos os workers.
+EVOLUTION_RATE_LIMIT = config('EVOLUTION_RATE_LIMIT', default=5, cast=int)
 
 CELERY_BROKER_URL = 'redis://127.0.0.1:6379/1'
 
 REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
-    "PAGE_SIZE": 10
+    "PAGE_SIZE": 10,
+    # Limites de core/throttling.py por escopo da view, por IP e por telefone.
+    "DEFAULT_THROTTLE_RATES": {
+        "login_code.ip": "20/h",
+        "login_code.phone": "5/h",
+        "appointment_create.ip": "20/h",
+        "appointment_create.phone": "5/h",
+        "client_check.ip": "60/m",
+        "client_check.phone": "20/m",
+        "plan_check.ip": "120/m",
+        "plan_check.phone": "60/m",
+    },
 }
 
+# Antecedência com que os agendamentos recebem o lembrete por WhatsApp.
+APPOINTMENT_REMINDER_HOURS = config('APPOINTMENT_REMINDER_HOURS', default=3, cast=int)
+
+# Status dado pelo close_past_appointments a agendamentos passados sem check-in
+# ('completed' ou 'no_show'). Com check-in, o agendamento é sempre concluído.
+APPOINTMENT_UNCHECKED_STATUS = config('APPOINTMENT_UNCHECKED_STATUS', default='completed')
+# Minutos depois do fim do horário até o agendamento ser encerrado.
+APPOINTMENT_CLOSE_GRACE_MINUTES = config('APPOINTMENT_CLOSE_GRACE_MINUTES', default=30, cast=int)
+
 CELERY_BEAT_SCHEDULE = {
     'clear-pending-every-5-min': {
         'task': 'appointments.tasks.clear_pending_appointments',
         'schedule': crontab(minute='*/5'),
     },
+    'expire-subscriptions-daily': {
+        'task': 'plans.tasks.expire_subscriptions',
+        'schedule': crontab(hour=0, minute=10),
+    },
+    'close-past-appointments-every-15-min': {
+        'task': 'appointments.tasks.close_past_appointments',
+        'schedule': crontab(minute='*/15'),
+    },
+    'send-appointment-reminders-every-15-min': {
+        'task': 'appointments.tasks.send_appointment_reminders',
+        'schedule': crontab(minute='*/15'),
+    },
+    'requeue-stale-messages-every-minute': {
+        'task': 'messaging.tasks.requeue_stale_messages',
+        'schedule': crontab(),
+    },
+    'prune-occupancy-daily': {
+        'task': 'barbers.tasks.prune_occupancy',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    'reconcile-plan-credits-daily': {
+        'task': 'plans.tasks.reconcile_plan_credits',
+        'schedule': crontab(hour=3, minute=0),
+    },
 }
 
 
@@ -46,7 +127,8 @@ INSTALLED_APPS = [
     'services',
     'appointments',
     'barbershops',
-    'plans'
+    'plans',
+    'messaging',
 ]
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from services.models import Service
+from .intervals import available_starts, format_minutes
+
+
+def span(start, end):
+    """Intervalo em minutos a partir de horas fracionárias: span(9.5, 10) é 09:30-10:00."""
+    return int(start * 60), int(end * 60)
+
+
+class AvailableStartsTests(SimpleTestCase):
+    shift = [span(9, 12)]
+
+    def starts(self, busy, duration=30, step=None, shifts=None):
+        return [format_minutes(start) for start in available_starts(shifts or self.shift, busy, duration, step)]
+
+    def test_free_shift_follows_the_duration_grid(self):
+        self.assertEqual(self.starts([]), ["09:00", "09:30", "10:00", "10:30", "11:00", "11:30"])
+
+    def test_adjacent_intervals_leave_no_gap(self):
+        busy = [span(9.5, 10), span(10, 10.5)]
+        self.assertEqual(self.starts(busy), ["09:00", "10:30", "11:00", "11:30"])
+
+    def test_overlapping_intervals_are_merged(self):
+        busy = [span(9.5, 10.5), span(10, 11), span(10.25, 10.75)]
+        self.assertEqual(self.starts(busy), ["09:00", "11:00", "11:30"])
+
+    def test_grid_keeps_the_shift_origin_after_a_busy_interval(self):
+        busy = [(9 * 60 + 10, 9 * 60 + 40)]
+        self.assertEqual(self.starts(busy, step=15), ["09:45", "10:00", "10:15", "10:30", "10:45", "11:00", "11:15", "11:30"])
+
+    def test_break_between_shifts(self):
+        shifts = [span(9, 12), span(13, 14)]
+        self.assertEqual(self.starts([], duration=60, shifts=shifts), ["09:00", "10:00", "11:00", "13:00"])
+
+    def test_busy_interval_spanning_the_break(self):
+        shifts = [span(9, 12), span(13, 14)]
+        self.assertEqual(self.starts([span(11.5, 13.5)], shifts=shifts), ["09:00", "09:30", "10:00", "10:30", "11:00", "13:30"])
+
+    def test_day_end_off_the_grid(self):
+        shift = [(9 * 60, 10 * 60 + 50)]
+        self.assertEqual(self.starts([], duration=45, step=15, shifts=shift), ["09:00", "09:15", "09:30", "09:45", "10:00"])
+        self.assertEqual(self.starts([], duration=30, shifts=shift), ["09:00", "09:30", "10:00"])
+
+    def test_duration_longer_than_every_gap(self):
+        self.assertEqual(self.starts([span(10, 11)], duration=90), [])
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        Service.objects.create(name="Corte", duration=30, price=40)
+
+    def get(self, **headers):
+        return self.client.get("/api/v1/services/", headers=headers)
+
+    def test_matching_etag_is_not_modified(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.get(if_none_match=first["ETag"]).status_code, 304)
+        self.assertEqual(self.get(if_modified_since=first["Last-Modified"]).status_code, 304)
+
+    def test_change_serves_the_new_list(self):
+        etag = self.get()["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Service.objects.create(name="Barba", duration=30, price=20)
+
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.json()), 2)
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}})
+    def test_without_cache_there_are_no_validators(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+        self.assertEqual(self.get(if_none_match="*").status_code, 200)
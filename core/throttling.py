@@ -0,0 +1,135 @@
+"""Limite de requisições por janela deslizante, guardado no Redis.
+
+Cada chave usa dois contadores de janela fixa: o da janela atual e o da anterior.
+A contagem estimada é `atual + anterior * fração da janela anterior que ainda
+cabe na janela deslizante`, o que dá o efeito de janela deslizante com duas
+chaves por identificador, sem guardar um registro por requisição.
+
+As views declaram `throttle_scope`, e os limites ficam em
+REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"] como "<scope>.ip" e "<scope>.phone".
+Com o Redis fora do ar a requisição passa: o limite protege a API, não pode
+derrubá-la.
+"""
+import re
+import math
+import time
+import logging
+import redis
+from rest_framework.throttling import SimpleRateThrottle
+from core.redis_client import RedisScript, get_redis
+
+logger = logging.getLogger(__name__)
+
+
+def _hit(r, keys, args):
+    limit, window_ms, elapsed_ms, ttl = (int(arg) for arg in args)
+    current = int(r.get(keys[0]) or 0)
+    previous = int(r.get(keys[1]) or 0)
+    if current + previous * (window_ms - elapsed_ms) / window_ms >= limit:
+        if current >= limit or previous == 0:
+            return window_ms - elapsed_ms
+        return max(math.ceil(window_ms - (limit - current) * window_ms / previous - elapsed_ms), 1)
+    r.incr(keys[0])
+    r.expire(keys[0], ttl)
+    return 0
+
+
+# KEYS: contador da janela atual, contador da anterior.
+# ARGV: limite, duração da janela (ms), tempo decorrido na janela atual (ms), TTL do contador (s).
+# Retorna 0 se a requisição foi contada, ou quantos ms faltam para a próxima ser aceita.
+HIT_SCRIPT = RedisScript("""
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if current + previous * (window - elapsed) / window >= limit then
+    if current >= limit or previous == 0 then
+        return window - elapsed
+    end
+    return math.max(math.ceil(window - (limit - current) * window / previous - elapsed), 1)
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 0
+""", _hit)
+
+
+def hit(key, limit, duration, r=None):
+    """Conta uma ocorrência em `key` se couber em `limit` por `duration` segundos.
+
+    Retorna 0 se contou, ou quantos milissegundos faltam para caber a próxima.
+    """
+    r = r or get_redis()
+    window_ms = duration * 1000
+    now_ms = int(time.time() * 1000)
+    window = now_ms // window_ms
+    return HIT_SCRIPT(
+        r,
+        keys=[f"{key}:{window}", f"{key}:{window - 1}"],
+        args=[limit, window_ms, now_ms - window * window_ms, duration * 2],
+    )
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """Base dos limites por escopo da view. Subclasses definem `kind` e `get_ident_for`."""
+    kind = None
+    cache_format = "throttle:{scope}:{ident}"
+
+    def __init__(self):
+        # O escopo vem da view, então a taxa só é lida em allow_request().
+        self.wait_ms = 0
+
+    def get_ident_for(self, request):
+        raise NotImplementedError
+
+    def get_cache_key(self, request, view):
+        ident = self.get_ident_for(request)
+        if not ident:
+            return None
+        return self.cache_format.format(scope=self.scope, ident=ident)
+
+    def allow_request(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        if not scope:
+            return True
+        self.scope = f"{scope}.{self.kind}"
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        try:
+            self.wait_ms = hit(key, self.num_requests, self.duration)
+        except redis.RedisError:
+            logger.warning("Redis indisponível, ignorando o limite %s.", self.scope, exc_info=True)
+            return True
+        return not self.wait_ms
+
+    def wait(self):
+        return math.ceil(self.wait_ms / 1000)
+
+
+class IPRateThrottle(SlidingWindowThrottle):
+    kind = "ip"
+
+    def get_ident_for(self, request):
+        return self.get_ident(request)
+
+
+class PhoneRateThrottle(SlidingWindowThrottle):
+    """Limite pelo telefone do corpo ou da query string, só com os dígitos.
+
+    Requisições sem telefone aproveitável ficam só com o limite por IP; a própria
+    view responde o erro de validação.
+    """
+    kind = "phone"
+
+    def get_ident_for(self, request):
+        data = request.data if isinstance(request.data, dict) else {}
+        phone = data.get("phone") or request.query_params.get("phone")
+        phone = re.sub(r"\D", "", str(phone or ""))
+        return phone if len(phone) == 11 else None
+
@@ -1,15 +1,22 @@
 import re
+import json
+import time
+import logging
 import secrets
 import string
 import redis
-from django.conf import settings
 from rest_framework import serializers
-from datetime import datetime, timedelta
+from datetime import timedelta
 from django.utils import timezone
-from barbers.models import WorkingHour, BlockedTime
-from appointments.models import Appointment, AppointmentStatus
+from django.db.models import Subquery
+from django.db.models.functions import Coalesce
+from barbers.models import WorkingHour
+from barbers.occupancy import get_busy_masks, mask_to_intervals
+from barbershops.models import BarberShop
+from core.intervals import to_minutes, format_minutes, parse_minutes, available_starts
+from core.redis_client import RedisScript, get_redis
 
-redis_client = redis.Redis.from_url(settings.REDIS_URL)
+logger = logging.getLogger(__name__)
 
 
 def clean_phone(phone):
@@ -25,16 +32,78 @@ def clean_phone(phone):
     return phone
 
 
+CODE_TTL = 300
+CODE_RESEND_COOLDOWN = 60
+CODE_MAX_ATTEMPTS = 3
+CODE_ATTEMPTS_TTL = 300
+
+
+def _generate_code(r, keys, args):
+    if not r.set(keys[1], "1", nx=True, ex=int(args[2])) and r.exists(keys[0]):
+        return 0
+    r.set(keys[0], args[0], ex=int(args[1]))
+    return 1
+
+
+# KEYS: código, cooldown. ARGV: código novo, TTL do código, cooldown.
+# Dentro do cooldown o código anterior continua valendo e nada é gravado.
+GENERATE_CODE_SCRIPT = RedisScript("""
+if not redis.call('SET', KEYS[2], '1', 'NX', 'EX', ARGV[3]) and redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+""", _generate_code)
+
+
+def _validate_code(r, keys, args):
+    if int(r.get(keys[1]) or 0) >= int(args[1]):
+        return -1
+    if r.get(keys[0]) == args[0].encode():
+        r.delete(*keys)
+        return 1
+    if r.incr(keys[1]) == 1:
+        r.expire(keys[1], int(args[2]))
+    return 0
+
+
+# KEYS: código, tentativas, cooldown. ARGV: código informado, máximo de tentativas, TTL das tentativas.
+# Retorna 1 (válido, chaves apagadas), 0 (incorreto ou expirado) ou -1 (tentativas esgotadas).
+VALIDATE_CODE_SCRIPT = RedisScript("""
+if tonumber(redis.call('GET', KEYS[2]) or '0') >= tonumber(ARGV[2]) then
+    return -1
+end
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1], KEYS[2], KEYS[3])
+    return 1
+end
+if redis.call('INCR', KEYS[2]) == 1 then
+    redis.call('EXPIRE', KEYS[2], ARGV[3])
+end
+return 0
+""", _validate_code)
+
+
 def generate_code(phone, key, r=None, length=6):
+    """Grava um código novo para `phone` e o retorna.
+
+    Retorna None se um código foi gerado há menos de CODE_RESEND_COOLDOWN
+    segundos e ainda não foi usado: o anterior continua valendo.
+    """
     phone = clean_phone(phone)
     code = ''.join(secrets.choice(string.digits) for _ in range(length))
 
-    r = r or redis_client
-    r.setex(key, 300, code)
-    return code
+    r = r or get_redis()
+    created = GENERATE_CODE_SCRIPT(
+        r,
+        keys=[key, f"{key}:cooldown"],
+        args=[code, CODE_TTL, CODE_RESEND_COOLDOWN],
+    )
+    return code if created else None
 
 
 def validate_code(code, key, phone, r=None):
+    """Confere o código numa única chamada ao Redis e o invalida se estiver certo."""
     phone = clean_phone(phone)
 
     if not code:
@@ -44,87 +113,309 @@ def validate_code(code, key, phone, r=None):
     if not key:
         raise serializers.ValidationError("Ocorreu um erro ao verificar o código.")
 
-    r = r or redis_client
-
-    attempts_key = f"login_attempts:{phone}"
-    attempts = r.get(attempts_key)
-    if attempts and int(attempts) >= 3:
+    r = r or get_redis()
+    result = VALIDATE_CODE_SCRIPT(
+        r,
+        keys=[key, f"login_attempts:{phone}", f"{key}:cooldown"],
+        args=[code, CODE_MAX_ATTEMPTS, CODE_ATTEMPTS_TTL],
+    )
+    if result == -1:
         raise serializers.ValidationError("Muitas tentativas inválidas. Tente novamente em alguns minutos.")
-
-    r_code = r.get(key)
-    if r_code is None or r_code.decode() != code:
-        # r.incr(attempts_key)
-        # r.expire(attempts_key, 300)
+    if result != 1:
         raise serializers.ValidationError("O código informado está incorreto ou expirado.")
-
-    r.delete(attempts_key)
     return True
 
 
-def delete_key_redis(phone):
-    r = redis_client
+AVAILABILITY_RANGE_MAX_DAYS = 31
 
-    r.delete(f'login_code:{phone}')
-    r.delete(f'login_name:{phone}')
+AVAILABILITY_CACHE_TTL = 60 * 60
+AVAILABILITY_CACHE_TTL_TODAY = 60
+AVAILABILITY_VERSION_TTL = 60 * 60 * 24
+AVAILABILITY_LOCK_TTL = 10
+AVAILABILITY_LOCK_WAIT = 0.05
+AVAILABILITY_LOCK_RETRIES = 40
 
 
-def get_available_slots(barber_id, date, service):
+def get_available_slots(barber_id, date, service, with_holds=True):
+    return get_available_slots_range(barber_id, date, date, service, with_holds)[date]
 
-    weekday = date.weekday()
-    working_hours = WorkingHour.objects.filter(barber_id=barber_id, weekday=weekday).first()
-    if not working_hours:
-        return []
 
+def get_cached_available_slots(barber_id, date, service, r=None):
+    """Versão de get_available_slots com cache no Redis.
+
+    A chave carrega um contador de versão do barbeiro (expediente) e outro do
+    dia (agendamentos e bloqueios); invalidar é só incrementar o contador, então
+    um cálculo antigo nunca sobrescreve a versão nova. Só um worker recalcula uma
+    chave fria: os demais aguardam o resultado dele.
+
+    O cache guarda os horários sem as reservas temporárias, que vencem sozinhas
+    em SLOT_HOLD_TTL; elas são descontadas a cada leitura.
+    """
+    r = r or get_redis()
+    duration_min = int(service.duration)
+
+    try:
+        barber_version, day_version = r.mget(
+            _availability_barber_version_key(barber_id),
+            _availability_day_version_key(barber_id, date),
+        )
+        key = f"availability:{barber_id}:{date:%Y-%m-%d}:{duration_min}:{int(barber_version or 0)}:{int(day_version or 0)}"
+        cached = r.get(key)
+        if cached is not None:
+            return _without_holds(barber_id, date, json.loads(cached), duration_min, r)
+
+        lock_key = f"{key}:lock"
+        if not r.set(lock_key, 1, nx=True, ex=AVAILABILITY_LOCK_TTL):
+            for _ in range(AVAILABILITY_LOCK_RETRIES):
+                time.sleep(AVAILABILITY_LOCK_WAIT)
+                cached = r.get(key)
+                if cached is not None:
+                    return _without_holds(barber_id, date, json.loads(cached), duration_min, r)
+            return get_available_slots(barber_id, date, service)
+    except redis.RedisError:
+        logger.warning("Redis indisponível, calculando horários sem cache.", exc_info=True)
+        return get_available_slots(barber_id, date, service)
+
+    try:
+        slots = get_available_slots(barber_id, date, service, with_holds=False)
+        ttl = AVAILABILITY_CACHE_TTL_TODAY if date == timezone.localdate() else AVAILABILITY_CACHE_TTL
+        r.set(key, json.dumps(slots), ex=ttl)
+    finally:
+        try:
+            r.delete(lock_key)
+        except redis.RedisError:
+            logger.warning("Não foi possível liberar o lock de disponibilidade %s.", lock_key, exc_info=True)
+    return _without_holds(barber_id, date, slots, duration_min, r)
+
+
+def _without_holds(barber_id, date, slots, duration_min, r):
+    """Remove de `slots` ("HH:MM") os horários que se sobrepõem a reservas temporárias vivas."""
+    holds = get_slot_holds([barber_id], [date], r=r).get((int(barber_id), date))
+    if not holds:
+        return slots
+    free = []
+    for slot in slots:
+        start = parse_minutes(slot)
+        if not any(h_start < start + duration_min and h_end > start for h_start, h_end in holds):
+            free.append(slot)
+    return free
+
+
+def invalidate_available_slots(barber_id, date=None, r=None):
+    """Invalida o cache de horários de um dia do barbeiro ou, sem data, de todos os dias."""
+    r = r or get_redis()
+    if date is None:
+        key = _availability_barber_version_key(barber_id)
+    else:
+        key = _availability_day_version_key(barber_id, date)
+
+    try:
+        pipe = r.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, AVAILABILITY_VERSION_TTL)
+        pipe.execute()
+    except redis.RedisError:
+        logger.warning("Não foi possível invalidar o cache de horários (%s).", key, exc_info=True)
+
+
+def invalidate_available_days(barber_days, r=None):
+    """invalidate_available_slots para vários (barbeiro, dia), numa única ida ao Redis."""
+    if not barber_days:
+        return
+    r = r or get_redis()
+    try:
+        pipe = r.pipeline()
+        for barber_id, date in barber_days:
+            key = _availability_day_version_key(barber_id, date)
+            pipe.incr(key)
+            pipe.expire(key, AVAILABILITY_VERSION_TTL)
+        pipe.execute()
+    except redis.RedisError:
+        logger.warning("Não foi possível invalidar o cache de %s dias de barbeiros.", len(barber_days), exc_info=True)
+
+
+def _availability_barber_version_key(barber_id):
+    return f"availability:version:{barber_id}"
+
+
+def _availability_day_version_key(barber_id, date):
+    return f"availability:version:{barber_id}:{date:%Y-%m-%d}"
+
+
+def get_available_slots_range(barber_id, start_date, end_date, service, with_holds=True):
+    """Horários livres de um barbeiro para cada dia entre start_date e end_date.
+
+    O expediente e os mapas de ocupação são lidos uma única vez para todo o
+    intervalo; os dias são calculados em memória.
+    """
+    return _compute_slots([barber_id], start_date, end_date, service, with_holds)[barber_id]
+
+
+def get_available_slots_for_barbers(barber_ids, date, service):
+    """Horários livres de vários barbeiros no mesmo dia, em consultas agregadas."""
+    slots = _compute_slots(barber_ids, date, date, service)
+    return {barber_id: days[date] for barber_id, days in slots.items()}
+
+
+def load_shifts(barber_ids, weekdays):
+    """Expedientes por (barbeiro, dia da semana) em minutos e o intervalo de grade de cada barbeiro."""
+    shop_interval = BarberShop.objects.order_by("id").values("slot_interval")[:1]
+    shifts = {}
+    slot_intervals = {}
+    for barber_id, weekday, wh_start, wh_end, slot_interval in WorkingHour.objects.filter(
+        barber_id__in=barber_ids,
+        weekday__in=weekdays
+    ).annotate(
+        slot_interval=Coalesce("barber__slot_interval", Subquery(shop_interval))
+    ).values_list("barber_id", "weekday", "start_time", "end_time", "slot_interval"):
+        shifts.setdefault((barber_id, weekday), []).append((to_minutes(wh_start), to_minutes(wh_end)))
+        slot_intervals[barber_id] = slot_interval
+    return shifts, slot_intervals
+
+
+def compute_day_slots(day, shifts, busy_mask, duration_min, slot_interval=None, lead=None, holds=()):
+    """Horários livres ("HH:MM") de um dia a partir de dados já carregados."""
+    if not shifts:
+        return []
+    today, lead_cutoff = lead or _lead_time_cutoff()
+    busy = mask_to_intervals(busy_mask)
+    busy.extend(holds)
+    if day == today:
+        busy.append((0, lead_cutoff))
+    starts = available_starts(shifts, busy, duration_min, slot_interval)
+    return [format_minutes(start) for start in starts]
+
+
+def _compute_slots(barber_ids, start_date, end_date, service, with_holds=True):
+    days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    # Os ids podem chegar como string (kwargs da URL); as chaves seguem o que o chamador passou.
+    keys = {int(barber_id): barber_id for barber_id in barber_ids}
+
+    shifts, slot_intervals = load_shifts(keys, {day.weekday() for day in days})
+    working = list({barber_id for barber_id, _ in shifts})
+    busy_masks = get_busy_masks(
+        (barber_id, day) for barber_id in working for day in days if (barber_id, day.weekday()) in shifts
+    )
+    holds = get_slot_holds(working, days) if with_holds else {}
+
+    lead = _lead_time_cutoff()
     duration_min = int(service.duration)
-    start_exp = working_hours.start_time
-    end_exp = working_hours.end_time
-
-    blocked = list(BlockedTime.objects.filter(
-        barber_id=barber_id,
-        date=date
-    ).values_list("start_time", "end_time"))
-
-    busy_appointments = list(Appointment.objects.filter(
-        barber_id=barber_id,
-        date=date
-    ).exclude(status=AppointmentStatus.CANCELED).values_list("start_time", "end_time"))
-
-    def overlaps(a_start, a_end, b_start, b_end):
-        return a_start < b_end and a_end > b_start
-
-    slots = []
-    t0 = datetime.combine(date, start_exp)
-    end_boundary = datetime.combine(date, end_exp)
-    step = timedelta(minutes=duration_min)
-
-    while True:
-        t1 = t0 + step
-        if t1 > end_boundary:
-            break
-
-        slot_start = t0.time()
-        slot_end = t1.time()
-        invalid = False
-
-        for b_start, b_end in blocked:
-            if overlaps(slot_start, slot_end, b_start, b_end):
-                invalid = True
-                break
-
-        if not invalid:
-            for a_start, a_end in busy_appointments:
-                if overlaps(slot_start, slot_end, a_start, a_end):
-                    invalid = True
-                    break
-
-        now = timezone.localtime()
-        if not invalid and date == now.date():
-            if timezone.make_aware(datetime.combine(date, slot_start)) < now + timedelta(minutes=30):
-                invalid = True
-
-        if not invalid:
-            slots.append(slot_start.strftime("%H:%M"))
-
-        t0 += step
-
-    return slots
+    return {
+        key: {
+            day: compute_day_slots(
+                day,
+                shifts.get((barber_id, day.weekday())),
+                busy_masks.get((barber_id, day), 0),
+                duration_min,
+                slot_intervals.get(barber_id),
+                lead,
+                holds.get((barber_id, day), ()),
+            )
+            for day in days
+        }
+        for barber_id, key in keys.items()
+    }
+
+
+def _lead_time_cutoff():
+    """Dia de hoje e o primeiro minuto que ainda respeita a antecedência mínima de 30 minutos."""
+    now = timezone.localtime()
+    lead = now + timedelta(minutes=30)
+    if lead.date() != now.date():
+        return now.date(), 24 * 60
+    cutoff = lead.hour * 60 + lead.minute
+    if lead.second or lead.microsecond:
+        cutoff += 1
+    return now.date(), cutoff
+
+
+SLOT_HOLD_TTL = 300
+
+
+def _hold_slot(r, keys, args):
+    owner = args[0]
+    start_min, end_min, now, ttl = (int(arg) for arg in args[1:])
+    for h_owner, value in r.hgetall(keys[0]).items():
+        h_start, h_end, h_exp = (int(part) for part in value.split(b"|"))
+        if h_exp <= now:
+            r.hdel(keys[0], h_owner)
+        elif h_owner.decode() != owner and h_start < end_min and h_end > start_min:
+            return 0
+    r.hset(keys[0], owner, f"{start_min}|{end_min}|{now + ttl}")
+    r.expire(keys[0], ttl)
+    return 1
+
+
+# Reserva um trecho do dia para `owner` se nenhuma reserva viva de outro dono se
+# sobrepuser a ele. Cada dono tem no máximo uma reserva por barbeiro/dia: a nova
+# substitui a anterior. Reservas vencidas são descartadas no caminho.
+HOLD_SLOT_SCRIPT = RedisScript("""
+local now = tonumber(ARGV[4])
+local start_min = tonumber(ARGV[2])
+local end_min = tonumber(ARGV[3])
+local entries = redis.call('HGETALL', KEYS[1])
+for i = 1, #entries, 2 do
+    local h_start, h_end, h_exp = string.match(entries[i + 1], '(%d+)|(%d+)|(%d+)')
+    if tonumber(h_exp) <= now then
+        redis.call('HDEL', KEYS[1], entries[i])
+    elseif entries[i] ~= ARGV[1] and tonumber(h_start) < end_min and tonumber(h_end) > start_min then
+        return 0
+    end
+end
+redis.call('HSET', KEYS[1], ARGV[1], start_min .. '|' .. end_min .. '|' .. (now + tonumber(ARGV[5])))
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return 1
+""", _hold_slot)
+
+
+def hold_slot(barber_id, date, start_time, end_time, owner, r=None):
+    """Segura o horário para `owner` entre o envio do código e a confirmação.
+
+    Retorna False se outro cliente já segura um trecho que se sobrepõe a este.
+    """
+    r = r or get_redis()
+    held = HOLD_SLOT_SCRIPT(
+        r,
+        keys=[_slot_holds_key(barber_id, date)],
+        args=[owner, to_minutes(start_time), to_minutes(end_time), int(time.time()), SLOT_HOLD_TTL],
+    )
+    return bool(held)
+
+
+def release_slot_hold(barber_id, date, owner, r=None):
+    """Solta a reserva de `owner`. Com o Redis fora do ar, ela vence sozinha em SLOT_HOLD_TTL."""
+    r = r or get_redis()
+    try:
+        r.hdel(_slot_holds_key(barber_id, date), owner)
+    except redis.RedisError:
+        logger.warning("Não foi possível liberar a reserva de %s.", owner, exc_info=True)
+
+
+def get_slot_holds(barber_ids, days, exclude_owner=None, r=None):
+    """Trechos segurados por barbeiro e dia: {(barber_id, dia): [(início, fim)]}, em minutos."""
+    r = r or get_redis()
+    keys = [(int(barber_id), day) for barber_id in barber_ids for day in days]
+    if not keys:
+        return {}
+
+    try:
+        pipe = r.pipeline(transaction=False)
+        for barber_id, day in keys:
+            pipe.hgetall(_slot_holds_key(barber_id, day))
+        results = pipe.execute()
+    except redis.RedisError:
+        logger.warning("Redis indisponível, ignorando reservas temporárias.", exc_info=True)
+        return {}
+
+    now = int(time.time())
+    holds = {}
+    for key, entries in zip(keys, results):
+        for owner, value in entries.items():
+            h_start, h_end, h_exp = (int(part) for part in value.split(b"|"))
+            if h_exp > now and owner.decode() != exclude_owner:
+                holds.setdefault(key, []).append((h_start, h_end))
+    return holds
+
+
+def _slot_holds_key(barber_id, date):
+    return f"slot_holds:{barber_id}:{date:%Y-%m-%d}"
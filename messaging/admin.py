@@ -0,0 +1,13 @@
+from django.contrib import admin
+from .models import OutboundMessage
+
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ("phone", "kind", "status", "attempts", "created_at", "sent_at")
+    list_filter = ("status", "kind")
+    search_fields = ("phone", "provider_id")
+    readonly_fields = ("phone", "kind", "status", "attempts", "provider_id", "last_error", "created_at", "sent_at")
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,75 @@
+"""Cliente HTTP da Evolution API.
+
+Uma única requests.Session por processo mantém as conexões abertas
+(keep-alive) num pool do tamanho de EVOLUTION_POOL_SIZE. As novas tentativas
+ficam com a task de envio, não com o adaptador.
+"""
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+
+class EvolutionError(Exception):
+    """Falha ao enviar pela Evolution API. `retryable` diz se vale tentar de novo."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class EvolutionClient:
+    def __init__(self, base_url, api_key, instance, timeout, pool_size):
+        self.base_url = base_url.rstrip("/")
+        self.instance = instance
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"apikey": api_key})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def send_text(self, phone, text):
+        """Envia `text` para um celular brasileiro (só dígitos, com DDD). Retorna o id da mensagem."""
+        try:
+            response = self.session.post(
+                f"{self.base_url}/message/sendText/{self.instance}",
+                json={"number": f"55{phone}", "text": text},
+                timeout=self.timeout,
+            )
+        except requests.RequestException as exc:
+            raise EvolutionError(f"Evolution API inacessível: {exc}") from exc
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise EvolutionError(f"Evolution API respondeu {response.status_code}.")
+        if response.status_code >= 400:
+            raise EvolutionError(
+                f"Evolution API recusou a mensagem ({response.status_code}): {response.text[:200]}",
+                retryable=False,
+            )
+        try:
+            return str(response.json()["key"]["id"])
+        except (ValueError, KeyError, TypeError):
+            return ""
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_evolution_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = EvolutionClient(
+                    settings.EVOLUTION_API_URL,
+                    settings.EVOLUTION_API_KEY,
+                    settings.EVOLUTION_INSTANCE,
+                    settings.EVOLUTION_TIMEOUT,
+                    settings.EVOLUTION_POOL_SIZE,
+                )
+    return _client
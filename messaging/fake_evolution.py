@@ -0,0 +1,89 @@
+"""Servidor falso da Evolution API, para testes e desenvolvimento local.
+
+Responde a POST /message/sendText/<instância> como a API real e guarda o que
+recebeu em `messages`. `fail_with` faz as próximas respostas saírem com os
+códigos de erro da lista, na ordem.
+
+    with FakeEvolutionServer() as server:
+        settings.EVOLUTION_API_URL = server.url
+        ...
+        server.messages  # [{"instance": ..., "apikey": ..., "number": ..., "text": ...}]
+
+Para rodar sozinho: python -m messaging.fake_evolution 8081
+"""
+import sys
+import json
+import uuid
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeEvolutionServer:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.messages = []
+        self.fail_with = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                parts = self.path.strip("/").split("/")
+                if parts[:2] != ["message", "sendText"] or len(parts) != 3:
+                    return self._reply(404, {"error": "Not Found"})
+
+                with fake._lock:
+                    status = fake.fail_with.pop(0) if fake.fail_with else 201
+                    if status < 400:
+                        fake.messages.append({
+                            "instance": parts[2], "apikey": self.headers.get("apikey"),
+                            "number": body.get("number"), "text": body.get("text"),
+                        })
+                if status >= 400:
+                    return self._reply(status, {"error": "Falha simulada"})
+                self._reply(201, {"key": {"id": uuid.uuid4().hex.upper()}, "status": "PENDING"})
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    server = FakeEvolutionServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8081)
+    print(f"Evolution falsa em {server.url}")
+    server._server.serve_forever()
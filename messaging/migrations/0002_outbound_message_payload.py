@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-17 15:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0001_outbound_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundmessage',
+            name='dedupe_key',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='outboundmessage',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='outboundmessage',
+            name='kind',
+            field=models.CharField(choices=[('login_code', 'Código de acesso'), ('appointment_reminder', 'Lembrete de agendamento')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import models
+
+
+class OutboundMessage(models.Model):
+    """Mensagem de WhatsApp na fila de envio e o resultado da entrega.
+
+    O texto não é gravado: ele é montado na hora do envio a partir de `kind` e
+    `payload` (ver messaging/tasks.py). Assim o código de login nunca fica no
+    banco. `dedupe_key` impede que a mesma mensagem entre duas vezes na fila.
+    """
+    KIND_CHOICES = [
+        ("login_code", "Código de acesso"),
+        ("appointment_reminder", "Lembrete de agendamento"),
+    ]
+    STATUS_CHOICES = [
+        ("queued", "Na fila"),
+        ("sending", "Enviando"),
+        ("sent", "Enviada"),
+        ("failed", "Falhou"),
+        ("expired", "Expirada"),
+    ]
+
+    phone = models.CharField(max_length=15)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict, blank=True)
+    dedupe_key = models.CharField(max_length=100, unique=True, blank=True, null=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    provider_id = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Quando um worker pegou a mensagem pela última vez (ver requeue_stale_messages).
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="outbound_status_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} para {self.phone} ({self.get_status_display()})"
@@ -0,0 +1,43 @@
+import logging
+from django.db import transaction
+from kombu.exceptions import OperationalError
+from .models import OutboundMessage
+from .tasks import send_message
+
+logger = logging.getLogger(__name__)
+
+
+def queue_message(phone, kind):
+    """Registra a mensagem e a entrega ao Celery depois do commit. Não espera o envio."""
+    message = OutboundMessage.objects.create(phone=phone, kind=kind)
+    transaction.on_commit(lambda: _dispatch(message.id))
+    return message
+
+
+def queue_messages(messages):
+    """Versão em lote de queue_message para mensagens com `dedupe_key`.
+
+    Chaves que já estão na tabela são ignoradas, então repetir o lote não
+    duplica envios. Retorna quantas mensagens novas entraram na fila.
+    """
+    if not messages:
+        return 0
+    keys = [message.dedupe_key for message in messages]
+    existing = set(OutboundMessage.objects.filter(dedupe_key__in=keys).values_list("id", flat=True))
+    OutboundMessage.objects.bulk_create(messages, ignore_conflicts=True)
+    ids = [
+        message_id for message_id in
+        OutboundMessage.objects.filter(dedupe_key__in=keys).values_list("id", flat=True)
+        if message_id not in existing
+    ]
+    for message_id in ids:
+        transaction.on_commit(lambda message_id=message_id: _dispatch(message_id))
+    return len(ids)
+
+
+def _dispatch(message_id):
+    try:
+        send_message.delay(message_id)
+    except OperationalError:
+        # A mensagem continua "queued" e é reenviada por requeue_stale_messages.
+        logger.warning("Broker indisponível, mensagem %s fica para a varredura.", message_id, exc_info=True)
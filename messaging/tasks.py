@@ -0,0 +1,123 @@
+import random
+import logging
+from datetime import date, timedelta
+import redis
+from celery import shared_task
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from core.redis_client import get_redis
+from core.throttling import hit
+from core.utils import CODE_TTL
+from .client import EvolutionError, get_evolution_client
+from .models import OutboundMessage
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_MAX_RETRIES = 6
+MESSAGE_BACKOFF_BASE = 2
+MESSAGE_BACKOFF_MAX = 120
+STALE_MESSAGE_AFTER = timedelta(minutes=1)
+# Acima de EVOLUTION_TIMEOUT + MESSAGE_BACKOFF_MAX: pega há mais tempo que isso e
+# ainda não resolvida, a mensagem perdeu o worker ou a nova tentativa.
+STALE_CLAIM_AFTER = timedelta(minutes=3)
+REQUEUE_WINDOW = timedelta(hours=1)
+
+
+def render(message):
+    """Texto da mensagem, montado na hora do envio. None se ela não faz mais sentido."""
+    if message.kind == "login_code":
+        code = get_redis().get(f"login_code:{message.phone}")
+        if code is None:
+            return None
+        return f"Seu código de acesso é {code.decode()}. Ele vale por {CODE_TTL // 60} minutos."
+    if message.kind == "appointment_reminder":
+        data = message.payload
+        day = date.fromisoformat(data["date"])
+        return (
+            f"Olá, {data['client']}! Lembrete do seu horário: {data['service']} com {data['barber']} "
+            f"em {day:%d/%m} às {data['start_time'][:5]}. Se não puder vir, cancele pelo app."
+        )
+    raise ValueError(f"Tipo de mensagem desconhecido: {message.kind}")
+
+
+def backoff(retries):
+    return min(MESSAGE_BACKOFF_BASE * 2 ** retries, MESSAGE_BACKOFF_MAX) + random.uniform(0, 1)
+
+
+@shared_task(bind=True, max_retries=MESSAGE_MAX_RETRIES, ignore_result=True)
+def send_message(self, message_id):
+    """Envia uma OutboundMessage pela Evolution API e grava o resultado.
+
+    Só um worker envia cada mensagem: ela passa de "queued" para "sending" num
+    UPDATE condicional. Falhas temporárias voltam para a fila com espera
+    exponencial; o limite de mensagens por segundo da instância é compartilhado
+    por todos os workers via Redis.
+    """
+    messages = OutboundMessage.objects.filter(pk=message_id)
+    try:
+        wait_ms = hit(f"messaging:rate:{settings.EVOLUTION_INSTANCE}", settings.EVOLUTION_RATE_LIMIT, 1)
+    except redis.RedisError:
+        logger.warning("Redis indisponível, enviando sem limite de taxa.", exc_info=True)
+        wait_ms = 0
+    if wait_ms:
+        # Esperar a vez não conta como tentativa.
+        send_message.apply_async((message_id,), countdown=wait_ms / 1000, retries=self.request.retries)
+        return
+
+    claimed = messages.filter(status="queued").update(
+        status="sending", attempts=F("attempts") + 1, claimed_at=timezone.now()
+    )
+    if not claimed:
+        return
+    message = messages.get()
+
+    try:
+        text = render(message)
+        if text is None:
+            messages.update(status="expired")
+            return
+        provider_id = get_evolution_client().send_text(message.phone, text)
+    except (EvolutionError, redis.RedisError) as exc:
+        if getattr(exc, "retryable", True) and self.request.retries < self.max_retries:
+            messages.update(status="queued", last_error=str(exc))
+            raise self.retry(exc=exc, countdown=backoff(self.request.retries))
+        messages.update(status="failed", last_error=str(exc))
+        logger.warning("Mensagem %s não enviada: %s", message_id, exc)
+        return
+    except Exception as exc:
+        # Ex.: payload de lembrete inválido. Tentar de novo não resolve.
+        messages.update(status="failed", last_error=f"{type(exc).__name__}: {exc}")
+        raise
+
+    messages.update(status="sent", sent_at=timezone.now(), provider_id=provider_id, last_error="")
+
+
+@shared_task
+def requeue_stale_messages():
+    """Reenfileira mensagens que pararam no caminho.
+
+    São as "queued" que nunca chegaram a um worker (ex.: broker fora do ar no
+    envio) ou cuja nova tentativa se perdeu, e as "sending" de um worker que
+    morreu no meio do envio. Essas podem ter saído antes da queda, então o
+    envio pode se repetir. Sem tentativas restantes, ou com mais de
+    REQUEUE_WINDOW (mesmo as que nenhum worker pegou), elas falham.
+    """
+    now = timezone.now()
+    recent = OutboundMessage.objects.filter(created_at__gte=now - REQUEUE_WINDOW)
+    stalled = OutboundMessage.objects.filter(status__in=["queued", "sending"], claimed_at__lt=now - STALE_CLAIM_AFTER)
+    expired = Q(created_at__lt=now - REQUEUE_WINDOW)
+    failed = OutboundMessage.objects.filter(
+        Q(claimed_at__lt=now - STALE_CLAIM_AFTER) & (Q(attempts__gt=MESSAGE_MAX_RETRIES) | expired)
+        | Q(claimed_at__isnull=True) & expired,
+        status__in=["queued", "sending"],
+    ).update(status="failed", last_error="Envio interrompido.")
+    stalled.filter(status="sending").update(status="queued", last_error="Envio interrompido.")
+
+    ids = list(recent.filter(
+        Q(attempts=0, created_at__lt=now - STALE_MESSAGE_AFTER) | Q(claimed_at__lt=now - STALE_CLAIM_AFTER),
+        status="queued",
+    ).values_list("id", flat=True))
+    for message_id in ids:
+        send_message.delay(message_id)
+    return f"{len(ids)} mensagens reenfileiradas, {failed} com falha."
@@ -0,0 +1,95 @@
+from datetime import timedelta
+from unittest import mock
+import redis
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from core.redis_client import reset_redis
+from core.utils import generate_code
+from .fake_evolution import FakeEvolutionServer
+from .models import OutboundMessage
+from .tasks import MESSAGE_MAX_RETRIES, requeue_stale_messages, send_message
+
+PHONE = "21999990001"
+
+
+@override_settings(REDIS_URL="memory://", EVOLUTION_RATE_LIMIT=1000, EVOLUTION_INSTANCE="barbearia", EVOLUTION_API_KEY="chave")
+class SendMessageTests(TestCase):
+    def setUp(self):
+        reset_redis()
+        self.addCleanup(reset_redis)
+        self.server = self.enterContext(FakeEvolutionServer())
+        self.enterContext(override_settings(EVOLUTION_API_URL=self.server.url))
+        # Cliente novo para a URL do servidor falso, e novas tentativas sem espera.
+        self.enterContext(mock.patch("messaging.client._client", None))
+        self.enterContext(mock.patch("messaging.tasks.backoff", return_value=0))
+        self.code = generate_code(PHONE, f"login_code:{PHONE}")
+        self.message = OutboundMessage.objects.create(phone=PHONE, kind="login_code")
+
+    def send(self):
+        send_message.apply((self.message.id,))
+        self.message.refresh_from_db()
+
+    def test_sends_login_code(self):
+        self.send()
+        self.assertEqual((self.message.status, self.message.attempts), ("sent", 1))
+        self.assertTrue(self.message.provider_id)
+        [sent] = self.server.messages
+        self.assertEqual((sent["instance"], sent["apikey"], sent["number"]), ("barbearia", "chave", f"55{PHONE}"))
+        self.assertIn(self.code, sent["text"])
+
+    def test_retries_rate_limit_and_server_errors(self):
+        self.server.fail_with = [429, 503]
+        self.send()
+        self.assertEqual((self.message.status, self.message.attempts), ("sent", 3))
+        self.assertEqual(len(self.server.messages), 1)
+
+    def test_client_error_fails_without_retry(self):
+        self.server.fail_with = [400]
+        self.send()
+        self.assertEqual((self.message.status, self.message.attempts), ("failed", 1))
+        self.assertIn("400", self.message.last_error)
+        self.assertEqual(self.server.messages, [])
+
+    def test_redis_error_while_rendering_is_retried(self):
+        with mock.patch("messaging.tasks.render", side_effect=[redis.ConnectionError("fora do ar"), "Seu código"]):
+            self.send()
+        self.assertEqual((self.message.status, self.message.attempts), ("sent", 2))
+
+    def test_bad_payload_fails_instead_of_staying_in_sending(self):
+        reminder = OutboundMessage.objects.create(phone=PHONE, kind="appointment_reminder", payload={"date": "x"})
+        send_message.apply((reminder.id,))
+        reminder.refresh_from_db()
+        self.assertEqual(reminder.status, "failed")
+        self.assertEqual(self.server.messages, [])
+
+
+class RequeueStaleMessagesTests(TestCase):
+    def test_requeues_stalled_sends_and_fails_exhausted_ones(self):
+        long_ago = timezone.now() - timedelta(minutes=10)
+        stalled = OutboundMessage.objects.create(phone=PHONE, kind="login_code", status="sending", attempts=1, claimed_at=long_ago)
+        exhausted = OutboundMessage.objects.create(
+            phone=PHONE, kind="login_code", status="sending", attempts=MESSAGE_MAX_RETRIES + 1, claimed_at=long_ago,
+        )
+        in_flight = OutboundMessage.objects.create(phone=PHONE, kind="login_code", status="sending", attempts=1, claimed_at=timezone.now())
+
+        with mock.patch.object(send_message, "delay") as delay:
+            requeue_stale_messages()
+
+        delay.assert_called_once_with(stalled.id)
+        statuses = dict(OutboundMessage.objects.values_list("id", "status"))
+        self.assertEqual(
+            (statuses[stalled.id], statuses[exhausted.id], statuses[in_flight.id]), ("queued", "failed", "sending")
+        )
+
+    def test_fails_messages_never_claimed_within_the_window(self):
+        abandoned = OutboundMessage.objects.create(phone=PHONE, kind="login_code")
+        waiting = OutboundMessage.objects.create(phone=PHONE, kind="login_code")
+        OutboundMessage.objects.filter(pk=abandoned.pk).update(created_at=timezone.now() - timedelta(hours=2))
+        OutboundMessage.objects.filter(pk=waiting.pk).update(created_at=timezone.now() - timedelta(minutes=10))
+
+        with mock.patch.object(send_message, "delay") as delay:
+            requeue_stale_messages()
+
+        delay.assert_called_once_with(waiting.id)
+        statuses = dict(OutboundMessage.objects.values_list("id", "status"))
+        self.assertEqual((statuses[abandoned.id], statuses[waiting.id]), ("failed", "queued"))
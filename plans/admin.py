@@ -1,6 +1,6 @@
 from django.contrib import admin
-from .models import Plan, PlanBenefit, PlanSubscription, PlanSubscriptionCredit
-from .signals import create_plan_subscription_credits
+from .models import Plan, PlanBenefit, PlanSubscription, PlanSubscriptionCredit, PlanCreditEntry
+from .provisioning import provision_credits
 
 
 class PlanBenefitInline(admin.TabularInline):
@@ -57,8 +57,8 @@ class PlanSubscriptionCreditInline(admin.TabularInline):
 
 @admin.register(PlanSubscription)
 class PlanSubscriptionAdmin(admin.ModelAdmin):
-    list_display = ("user", "plan", "status", "start_date", "end_date")
-    list_filter = ("status", "plan")
+    list_display = ("user", "plan", "status", "start_date", "end_date", "auto_renew")
+    list_filter = ("status", "plan", "auto_renew")
     search_fields = ("user__name", "user__phone", "plan__name")
     autocomplete_fields = ["user", "plan"]
     inlines = [PlanSubscriptionCreditInline]
@@ -67,7 +67,7 @@ class PlanSubscriptionAdmin(admin.ModelAdmin):
 
         super().save_model(request, obj, form, change)
         if not obj.credits.exists():
-            create_plan_subscription_credits(PlanSubscription, obj, created=True)
+            provision_credits([obj])
 
 
 @admin.register(PlanSubscriptionCredit)
@@ -76,3 +76,22 @@ class PlanSubscriptionCreditAdmin(admin.ModelAdmin):
     list_filter = ("service",)
     search_fields = ("subscription__user__name", "subscription__plan__name")
     autocomplete_fields = ["subscription", "service"]
+    # O consumo é movimentado pelo livro (PlanCreditEntry).
+    readonly_fields = ("used",)
+
+
+@admin.register(PlanCreditEntry)
+class PlanCreditEntryAdmin(admin.ModelAdmin):
+    list_display = ("credit", "kind", "delta", "appointment", "created_at")
+    list_filter = ("kind",)
+    search_fields = ("credit__subscription__user__name", "credit__subscription__user__phone")
+    readonly_fields = ("credit", "appointment", "kind", "delta", "created_at")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
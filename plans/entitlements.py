@@ -0,0 +1,206 @@
+"""Direitos de plano de um cliente, resolvidos numa única consulta.
+
+O retrato (Entitlement) traz as assinaturas ativas do cliente com os
+benefícios do plano e o saldo de crédito de cada um. Ele fica no Redis numa
+chave com dois contadores de versão: um do telefone, incrementado quando uma
+assinatura ou um crédito do cliente muda (ver plans/signals.py e
+appointments/booking.py), e um global, incrementado quando planos e benefícios
+mudam. Invalidar é só incrementar o contador, então um retrato lido antes da
+mudança e gravado depois dela cai numa chave que ninguém mais lê.
+"""
+import json
+import logging
+from dataclasses import astuple, dataclass
+from datetime import date as date_cls
+import redis
+from django.db.models import Exists, FilteredRelation, OuterRef, Q, Subquery
+from accounts.models import User
+from core.redis_client import get_redis
+from .models import PlanSubscription, PlanSubscriptionCredit
+
+logger = logging.getLogger(__name__)
+
+ENTITLEMENT_CACHE_TTL = 3600
+ENTITLEMENT_VERSION_TTL = 60 * 60 * 24
+ENTITLEMENT_VERSION_KEY = "entitlement:version"
+
+WEEKDAY_CODES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+WEEKDAY_NAMES = {"mon": "Segunda", "tue": "Terça", "wed": "Quarta", "thu": "Quinta", "fri": "Sexta", "sat": "Sábado", "sun": "Domingo"}
+
+
+@dataclass(frozen=True)
+class Benefit:
+    service_id: int
+    quantity: int
+    allowed_days: tuple
+    credit_id: int | None
+    used: int
+    total: int
+
+    def remaining(self):
+        return max(self.total - self.used, 0)
+
+    def allows(self, day):
+        return not self.allowed_days or WEEKDAY_CODES[day.weekday()] in self.allowed_days
+
+    def allowed_days_pt(self):
+        return ", ".join(WEEKDAY_NAMES[d] for d in self.allowed_days if d in WEEKDAY_NAMES)
+
+
+@dataclass(frozen=True)
+class Subscription:
+    id: int
+    plan_id: int
+    plan_name: str
+    start_date: date_cls
+    end_date: date_cls
+    benefits: tuple
+
+    def benefit(self, service_id):
+        return next((b for b in self.benefits if b.service_id == service_id), None)
+
+
+@dataclass(frozen=True)
+class Entitlement:
+    user_id: str
+    phone: str
+    ever_had_plan: bool
+    subscriptions: tuple
+
+    def subscription(self, day):
+        """Assinatura ativa que cobre o dia, como o antigo .filter(...).first()."""
+        return next((s for s in self.subscriptions if s.start_date <= day <= s.end_date), None)
+
+    def to_json(self):
+        return json.dumps({
+            "user_id": self.user_id,
+            "phone": self.phone,
+            "ever_had_plan": self.ever_had_plan,
+            "subscriptions": [
+                {
+                    "id": s.id, "plan_id": s.plan_id, "plan_name": s.plan_name,
+                    "start_date": s.start_date.isoformat(), "end_date": s.end_date.isoformat(),
+                    "benefits": [astuple(b) for b in s.benefits],
+                }
+                for s in self.subscriptions
+            ],
+        })
+
+    @classmethod
+    def from_json(cls, raw):
+        data = json.loads(raw)
+        return cls(
+            user_id=data["user_id"],
+            phone=data["phone"],
+            ever_had_plan=data["ever_had_plan"],
+            subscriptions=tuple(
+                Subscription(
+                    id=s["id"], plan_id=s["plan_id"], plan_name=s["plan_name"],
+                    start_date=date_cls.fromisoformat(s["start_date"]),
+                    end_date=date_cls.fromisoformat(s["end_date"]),
+                    benefits=tuple(
+                        Benefit(service_id, quantity, tuple(days), credit_id, used, total)
+                        for service_id, quantity, days, credit_id, used, total in s["benefits"]
+                    ),
+                )
+                for s in data["subscriptions"]
+            ),
+        )
+
+
+def load_entitlement(phone):
+    """Monta o retrato direto do banco. Retorna None se não houver usuário com o telefone."""
+    credits = PlanSubscriptionCredit.objects.filter(
+        subscription=OuterRef("active__id"),
+        service=OuterRef("active__plan__benefits__service"),
+    )
+    rows = User.objects.filter(phone=phone).annotate(
+        active=FilteredRelation("subscriptions", condition=Q(subscriptions__status="active")),
+        ever_had_plan=Exists(PlanSubscription.objects.filter(user=OuterRef("pk"))),
+        credit_id=Subquery(credits.values("id")[:1]),
+        credit_used=Subquery(credits.values("used")[:1]),
+        credit_total=Subquery(credits.values("total")[:1]),
+    ).values_list(
+        "id", "ever_had_plan",
+        "active__id", "active__plan_id", "active__plan__name", "active__start_date", "active__end_date",
+        "active__plan__benefits__service_id", "active__plan__benefits__quantity", "active__plan__benefits__allowed_days",
+        "credit_id", "credit_used", "credit_total",
+    ).order_by("active__id", "active__plan__benefits__id")
+
+    user_id = ever_had_plan = None
+    subscriptions = {}
+    for (user_id, ever_had_plan, sub_id, plan_id, plan_name, start_date, end_date,
+         service_id, quantity, allowed_days, credit_id, used, total) in rows:
+        if sub_id is None:
+            continue
+        subscription = subscriptions.setdefault(sub_id, (plan_id, plan_name, start_date, end_date, []))
+        if service_id is not None:
+            subscription[4].append(Benefit(
+                service_id=service_id,
+                quantity=int(quantity or 0),
+                allowed_days=tuple(allowed_days or ()),
+                credit_id=credit_id,
+                used=int(used or 0),
+                total=int(total or quantity or 0),
+            ))
+
+    if user_id is None:
+        return None
+    return Entitlement(
+        user_id=str(user_id),
+        phone=phone,
+        ever_had_plan=ever_had_plan,
+        subscriptions=tuple(
+            Subscription(sub_id, plan_id, plan_name, start_date, end_date, tuple(benefits))
+            for sub_id, (plan_id, plan_name, start_date, end_date, benefits) in subscriptions.items()
+        ),
+    )
+
+
+def get_entitlement(phone, r=None):
+    """Retrato em cache de `phone`; None se o telefone não tiver usuário (resultado que não é guardado)."""
+    r = r or get_redis()
+    try:
+        version, phone_version = r.mget(ENTITLEMENT_VERSION_KEY, _entitlement_version_key(phone))
+        key = f"entitlement:{phone}:{int(version or 0)}:{int(phone_version or 0)}"
+        cached = r.get(key)
+        if cached is not None:
+            return Entitlement.from_json(cached.decode())
+    except redis.RedisError:
+        logger.warning("Redis indisponível, consultando plano sem cache.", exc_info=True)
+        return load_entitlement(phone)
+
+    entitlement = load_entitlement(phone)
+    if entitlement is not None:
+        try:
+            r.set(key, entitlement.to_json(), ex=ENTITLEMENT_CACHE_TTL)
+        except redis.RedisError:
+            logger.warning("Não foi possível guardar o plano de %s no cache.", phone, exc_info=True)
+    return entitlement
+
+
+def invalidate_entitlement(*phones, r=None):
+    if not phones:
+        return
+    r = r or get_redis()
+    try:
+        pipe = r.pipeline()
+        for phone in phones:
+            key = _entitlement_version_key(phone)
+            pipe.incr(key)
+            pipe.expire(key, ENTITLEMENT_VERSION_TTL)
+        pipe.execute()
+    except redis.RedisError:
+        logger.warning("Não foi possível invalidar o plano de %s.", ", ".join(phones), exc_info=True)
+
+
+def invalidate_all_entitlements(r=None):
+    r = r or get_redis()
+    try:
+        r.incr(ENTITLEMENT_VERSION_KEY)
+    except redis.RedisError:
+        logger.warning("Não foi possível invalidar os planos em cache.", exc_info=True)
+
+
+def _entitlement_version_key(phone):
+    return f"entitlement:version:{phone}"
@@ -0,0 +1,79 @@
+"""Consumo e estorno de créditos de plano.
+
+Cada movimento grava um PlanCreditEntry e ajusta o saldo em cache
+(PlanSubscriptionCredit.used) com um UPDATE condicional, que é o que impede
+consumir além do total. O livro é a fonte da verdade: `reconcile_credits`
+recalcula os saldos a partir dele e aponta as divergências.
+"""
+import logging
+from django.db import IntegrityError, transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from .entitlements import invalidate_entitlement
+from .models import PlanCreditEntry, PlanSubscriptionCredit
+
+logger = logging.getLogger(__name__)
+
+
+def consume_credit(credit_id, appointment):
+    """Debita um uso do crédito para o agendamento. Retorna False se não houver saldo."""
+    consumed = PlanSubscriptionCredit.objects.filter(pk=credit_id, used__lt=F("total")).update(used=F("used") + 1)
+    if not consumed:
+        return False
+    PlanCreditEntry.objects.create(credit_id=credit_id, appointment=appointment, kind="consume", delta=1)
+    return True
+
+
+def refund_credit(appointment):
+    """Devolve o crédito consumido por um agendamento. Retorna False se não houver o que estornar."""
+    if not appointment.paid_with_plan:
+        return False
+    credit_id = PlanCreditEntry.objects.filter(
+        appointment=appointment, kind="consume",
+    ).values_list("credit_id", flat=True).first()
+    if credit_id is None:
+        return False
+
+    try:
+        with transaction.atomic():
+            PlanCreditEntry.objects.create(credit_id=credit_id, appointment=appointment, kind="refund", delta=-1)
+            if not PlanSubscriptionCredit.objects.filter(pk=credit_id, used__gt=0).update(used=F("used") - 1):
+                # Saldo já zerado: o livro não pode ganhar um estorno sem débito correspondente.
+                transaction.set_rollback(True)
+                return False
+    except IntegrityError:
+        return False  # já estornado
+
+    phone = appointment.client.phone
+    transaction.on_commit(lambda: invalidate_entitlement(phone))
+    return True
+
+
+def ledger_used():
+    """Soma dos lançamentos do crédito da linha externa."""
+    total = PlanCreditEntry.objects.filter(credit=OuterRef("pk")).values("credit").annotate(total=Sum("delta")).values("total")
+    return Coalesce(Subquery(total), Value(0), output_field=IntegerField())
+
+
+def reconcile_credits(fix=True):
+    """Créditos cujo saldo em cache diverge do livro: [(credit_id, used, ledger_used)].
+
+    Com `fix`, regrava `used` com o valor do livro.
+    """
+    drift = list(
+        PlanSubscriptionCredit.objects.annotate(ledger_used=ledger_used())
+        .exclude(used=F("ledger_used"))
+        .values_list("id", "used", "ledger_used")
+    )
+    for credit_id, used, expected in drift:
+        logger.warning("Crédito %s diverge do livro: used=%s, livro=%s.", credit_id, used, expected)
+
+    if fix and drift:
+        with transaction.atomic():
+            ids = [credit_id for credit_id, _, _ in drift]
+            PlanSubscriptionCredit.objects.filter(pk__in=ids).update(used=ledger_used())
+            phones = list(
+                PlanSubscriptionCredit.objects.filter(pk__in=ids).values_list("subscription__user__phone", flat=True).distinct()
+            )
+            transaction.on_commit(lambda: invalidate_entitlement(*phones))
+    return drift
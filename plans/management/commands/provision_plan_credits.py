@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from plans.models import PlanSubscription
+from plans.provisioning import provision_credits, PROVISION_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Cria os créditos que faltam nas assinaturas (idempotente)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--status", default="active", help="Status das assinaturas a provisionar. Padrão: active.")
+
+    def handle(self, *args, **options):
+        ids = list(PlanSubscription.objects.filter(status=options["status"]).order_by("id").values_list("id", flat=True))
+        for start in range(0, len(ids), PROVISION_BATCH_SIZE):
+            provision_credits(PlanSubscription.objects.filter(id__in=ids[start:start + PROVISION_BATCH_SIZE]))
+
+        self.stdout.write(self.style.SUCCESS(f"{len(ids)} assinaturas provisionadas."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from plans.models import Plan
+from plans.pricing import refresh_price_original
+
+
+class Command(BaseCommand):
+    help = "Recalcula o preço original (soma dos serviços) dos planos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--plan", type=int, action="append", dest="plans", help="Id do plano (pode repetir).")
+
+    def handle(self, *args, **options):
+        plans = Plan.objects.all()
+        if options["plans"]:
+            plans = plans.filter(pk__in=options["plans"])
+
+        count = refresh_price_original(plans)
+        self.stdout.write(self.style.SUCCESS(f"{count} planos recalculados."))
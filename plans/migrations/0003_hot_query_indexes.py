@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-17 14:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0002_remove_plan_price_original_plansubscription_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plansubscription',
+            index=models.Index(fields=['user', 'status', 'start_date', 'end_date'], name='plansub_user_status_dates_idx'),
+        ),
+    ]
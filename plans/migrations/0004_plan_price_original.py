@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-17 15:03
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_price_original(apps, schema_editor):
+    Plan = apps.get_model("plans", "Plan")
+    PlanBenefit = apps.get_model("plans", "PlanBenefit")
+    decimal = DecimalField(max_digits=10, decimal_places=2)
+    total = PlanBenefit.objects.filter(plan=OuterRef("pk")).values("plan").annotate(
+        total=Sum(ExpressionWrapper(F("quantity") * F("service__price"), output_field=decimal))
+    ).values("total")
+    Plan.objects.update(price_original=Coalesce(Subquery(total), Value(Decimal("0")), output_field=decimal))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plan',
+            name='price_original',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(fill_price_original, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-17 15:05
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicate_credits(apps, schema_editor):
+    """O serializer de assinatura criava créditos em duplicidade com o sinal.
+
+    Em cada par (assinatura, serviço) fica o crédito mais consumido, que é o
+    que os agendamentos vinham debitando.
+    """
+    PlanSubscriptionCredit = apps.get_model("plans", "PlanSubscriptionCredit")
+    duplicated = PlanSubscriptionCredit.objects.values("subscription_id", "service_id").annotate(n=Count("id")).filter(n__gt=1)
+    for pair in duplicated:
+        credits = PlanSubscriptionCredit.objects.filter(
+            subscription_id=pair["subscription_id"], service_id=pair["service_id"]
+        ).order_by("-used", "id")
+        keep = credits.first()
+        credits.exclude(pk=keep.pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0004_plan_price_original'),
+        ('services', '0003_service_is_popular'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_credits, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='plansubscriptioncredit',
+            constraint=models.UniqueConstraint(fields=('subscription', 'service'), name='unique_subscription_service_credit'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-17 15:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0005_unique_subscription_credit'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plansubscription',
+            name='auto_renew',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='plansubscription',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['end_date'], name='plansub_active_end_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-17 15:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_balances(apps, schema_editor):
+    """Lança o `used` atual de cada crédito como saldo inicial do livro."""
+    PlanSubscriptionCredit = apps.get_model("plans", "PlanSubscriptionCredit")
+    PlanCreditEntry = apps.get_model("plans", "PlanCreditEntry")
+    PlanCreditEntry.objects.bulk_create(
+        (
+            PlanCreditEntry(credit_id=credit_id, kind="opening", delta=used)
+            for credit_id, used in PlanSubscriptionCredit.objects.filter(used__gt=0).values_list("id", "used").iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_hot_query_indexes'),
+        ('plans', '0006_subscription_auto_renew'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanCreditEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('opening', 'Saldo inicial'), ('consume', 'Consumo'), ('refund', 'Estorno')], max_length=10)),
+                ('delta', models.SmallIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('appointment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='credit_entries', to='appointments.appointment')),
+                ('credit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='plans.plansubscriptioncredit')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('appointment__isnull', False)), fields=('appointment', 'kind'), name='unique_appointment_credit_entry')],
+            },
+        ),
+        migrations.RunPython(open_balances, migrations.RunPython.noop),
+    ]
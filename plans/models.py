@@ -12,14 +12,8 @@ class Plan(models.Model):
     is_popular = models.BooleanField(default=False)
     color = models.CharField(max_length=50, blank=True, null=True)
     card_color = models.CharField(max_length=50, blank=True, null=True)
-
-    @property
-    def price_original(self):
-        """Soma do valor dos serviços no plano."""
-        total = 0
-        for benefit in self.benefits.select_related("service").all():
-            total += benefit.service.price * benefit.quantity
-        return total
+    # Soma do valor dos serviços no plano, mantida por plans/pricing.py.
+    price_original = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
 
     @property
     def economia(self):
@@ -62,6 +56,14 @@ class PlanSubscription(models.Model):
     start_date = models.DateField(default=timezone.now)
     end_date = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="active")
+    auto_renew = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "status", "start_date", "end_date"], name="plansub_user_status_dates_idx"),
+            # Usado por plans.tasks.expire_subscriptions; só cobre as assinaturas ativas.
+            models.Index(fields=["end_date"], condition=models.Q(status="active"), name="plansub_active_end_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.name} - {self.plan.name}"
@@ -78,8 +80,47 @@ class PlanSubscriptionCredit(models.Model):
     used = models.PositiveIntegerField(default=0)
     total = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["subscription", "service"], name="unique_subscription_service_credit"),
+        ]
+
     def remaining(self):
         return self.total - self.used
 
     def __str__(self):
         return f"{self.service.name}: {self.used}/{self.total}"
+
+
+class PlanCreditEntry(models.Model):
+    """Lançamento do livro de créditos. Só recebe inserções.
+
+    `delta` é o efeito no `used` do crédito: a soma dos lançamentos é o saldo
+    consumido, que PlanSubscriptionCredit.used guarda já somado.
+    """
+    KIND_CHOICES = [
+        ("opening", "Saldo inicial"),
+        ("consume", "Consumo"),
+        ("refund", "Estorno"),
+    ]
+
+    credit = models.ForeignKey(PlanSubscriptionCredit, related_name="entries", on_delete=models.CASCADE)
+    appointment = models.ForeignKey(
+        "appointments.Appointment", related_name="credit_entries", on_delete=models.SET_NULL, blank=True, null=True
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    delta = models.SmallIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Cada agendamento consome e é estornado no máximo uma vez.
+            models.UniqueConstraint(
+                fields=["appointment", "kind"],
+                condition=models.Q(appointment__isnull=False),
+                name="unique_appointment_credit_entry",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.delta:+d} ({self.credit_id})"
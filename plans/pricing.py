@@ -0,0 +1,17 @@
+from decimal import Decimal
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from .models import PlanBenefit
+
+
+def price_original_expression():
+    """Soma de quantidade x preço dos benefícios do plano, calculada no banco."""
+    total = PlanBenefit.objects.filter(plan=OuterRef("pk")).values("plan").annotate(
+        total=Sum(ExpressionWrapper(F("quantity") * F("service__price"), output_field=DecimalField(max_digits=10, decimal_places=2)))
+    ).values("total")
+    return Coalesce(Subquery(total), Value(Decimal("0")), output_field=DecimalField(max_digits=10, decimal_places=2))
+
+
+def refresh_price_original(plans):
+    """Regrava price_original dos planos do queryset num único UPDATE. Retorna quantos foram gravados."""
+    return plans.update(price_original=price_original_expression())
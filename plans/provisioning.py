@@ -0,0 +1,49 @@
+"""Criação dos créditos de assinatura.
+
+Todo caminho que cria assinaturas (sinal, serializer, admin, renovação em lote)
+passa por `provision_credits`. A restrição única (assinatura, serviço) e o
+bulk_create com ignore_conflicts tornam a chamada idempotente: repetir o
+provisionamento de uma assinatura não duplica créditos.
+"""
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import QuerySet
+from accounts.models import User
+from .entitlements import invalidate_entitlement
+from .models import PlanBenefit, PlanSubscriptionCredit
+
+PROVISION_BATCH_SIZE = 1000
+
+
+def provision_credits(subscriptions):
+    """Cria os créditos que faltam para as assinaturas, um por benefício do plano.
+
+    Aceita instâncias ou um queryset; o custo é uma consulta aos benefícios e um
+    INSERT a cada PROVISION_BATCH_SIZE créditos, seja qual for o número de assinaturas.
+    """
+    if isinstance(subscriptions, QuerySet):
+        rows = list(subscriptions.values_list("id", "plan_id"))
+        subscription_filter = subscriptions.values("id")
+    else:
+        rows = [(subscription.pk, subscription.plan_id) for subscription in subscriptions]
+        subscription_filter = [subscription_id for subscription_id, _ in rows]
+    if not rows:
+        return 0
+
+    benefits = defaultdict(list)
+    for plan_id, service_id, quantity in PlanBenefit.objects.filter(
+        plan_id__in={plan_id for _, plan_id in rows}
+    ).values_list("plan_id", "service_id", "quantity"):
+        benefits[plan_id].append((service_id, quantity))
+
+    credits = [
+        PlanSubscriptionCredit(subscription_id=subscription_id, service_id=service_id, total=quantity, used=0)
+        for subscription_id, plan_id in rows
+        for service_id, quantity in benefits[plan_id]
+    ]
+    PlanSubscriptionCredit.objects.bulk_create(credits, batch_size=PROVISION_BATCH_SIZE, ignore_conflicts=True)
+
+    # bulk_create não dispara sinais; o retrato de plano dos clientes precisa cair aqui.
+    phones = list(User.objects.filter(subscriptions__in=subscription_filter).values_list("phone", flat=True).distinct())
+    transaction.on_commit(lambda: invalidate_entitlement(*phones))
+    return len(rows)
@@ -36,6 +36,7 @@ class PlanSerializer(serializers.ModelSerializer):
         plan = Plan.objects.create(**validated_data)
         for b in benefits_data:
             PlanBenefit.objects.create(plan=plan, **b)
+        plan.refresh_from_db(fields=["price_original"])
         return plan
 
     def update(self, instance, validated_data):
@@ -44,6 +45,7 @@ class PlanSerializer(serializers.ModelSerializer):
         instance.benefits.all().delete()
         for b in benefits_data:
             PlanBenefit.objects.create(plan=instance, **b)
+        instance.refresh_from_db(fields=["price_original"])
         return instance
 
 
@@ -98,12 +100,5 @@ class CreatePlanSubscriptionSerializer(serializers.ModelSerializer):
             end_date=timezone.now() + timezone.timedelta(days=plan.duration_days),
             status="active"
         )
-
-        for benefit in plan.benefits.all():
-            PlanSubscriptionCredit.objects.create(
-                subscription=sub,
-                service=benefit.service,
-                total=benefit.quantity
-            )
-
+        # Os créditos são criados pelo sinal de post_save (plans.provisioning).
         return sub
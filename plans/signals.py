@@ -1,19 +1,59 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import PlanSubscription, PlanSubscriptionCredit, PlanBenefit
+from accounts.models import User
+from core.http_cache import bump_model_version
+from services.models import Service
+from .entitlements import invalidate_entitlement, invalidate_all_entitlements
+from .models import Plan, PlanSubscription, PlanSubscriptionCredit, PlanBenefit
+from .pricing import refresh_price_original
+from .provisioning import provision_credits
 
 @receiver(post_save, sender=PlanSubscription)
 def create_plan_subscription_credits(sender, instance, created, **kwargs):
-
     if created:
-        if instance.credits.exists():
-            return
-        
-        benefits = PlanBenefit.objects.filter(plan=instance.plan)
-        for benefit in benefits:
-            PlanSubscriptionCredit.objects.create(
-                subscription=instance,
-                service=benefit.service,
-                total=benefit.quantity,
-                used=0
-            )
+        provision_credits([instance])
+
+
+def _invalidate_user_entitlement(users):
+    phone = users.values_list("phone", flat=True).first()
+    if phone:
+        transaction.on_commit(lambda: invalidate_entitlement(phone))
+
+
+@receiver([post_save, post_delete], sender=PlanSubscription)
+def invalidate_subscription_entitlement(sender, instance, **kwargs):
+    _invalidate_user_entitlement(User.objects.filter(pk=instance.user_id))
+
+
+@receiver([post_save, post_delete], sender=PlanSubscriptionCredit)
+def invalidate_credit_entitlement(sender, instance, **kwargs):
+    _invalidate_user_entitlement(User.objects.filter(subscriptions=instance.subscription_id))
+
+
+@receiver([post_save, post_delete], sender=Plan)
+@receiver([post_save, post_delete], sender=PlanBenefit)
+def invalidate_plan_entitlements(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_all_entitlements)
+
+
+@receiver([post_save, post_delete], sender=PlanBenefit)
+def refresh_benefit_plan_price(sender, instance, **kwargs):
+    refresh_price_original(Plan.objects.filter(pk=instance.plan_id))
+
+
+@receiver(post_save, sender=Service)
+def refresh_service_plan_prices(sender, instance, **kwargs):
+    refresh_price_original(Plan.objects.filter(benefits__service=instance))
+
+
+@receiver(post_save, sender=Plan)
+def refresh_plan_price(sender, instance, **kwargs):
+    # Um save() com a instância desatualizada regravaria o valor antigo.
+    refresh_price_original(Plan.objects.filter(pk=instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Plan)
+@receiver([post_save, post_delete], sender=PlanBenefit)
+def bump_plan_catalog_version(sender, instance, **kwargs):
+    bump_model_version(sender)
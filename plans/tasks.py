@@ -0,0 +1,78 @@
+import time
+import logging
+from datetime import timedelta
+from celery import shared_task
+from django.db import transaction
+from django.utils import timezone
+from accounts.models import User
+from .entitlements import invalidate_entitlement
+from .ledger import reconcile_credits
+from .models import PlanSubscription
+from .provisioning import provision_credits
+
+logger = logging.getLogger(__name__)
+
+LIFECYCLE_BATCH_SIZE = 1000
+LIFECYCLE_MAX_BATCHES = 50
+
+
+@shared_task
+def expire_subscriptions(batch_size=LIFECYCLE_BATCH_SIZE, max_batches=LIFECYCLE_MAX_BATCHES):
+    """Vence as assinaturas ativas cujo período acabou e renova as que têm auto_renew.
+
+    Trabalha em lotes de `batch_size`, cada um numa transação com um UPDATE, um
+    INSERT das renovações e o provisionamento dos créditos delas. Para depois de
+    `max_batches` lotes; o que sobrar fica para a próxima execução.
+    """
+    started = time.monotonic()
+    today = timezone.localdate()
+    expired = renewed = batches = 0
+
+    while batches < max_batches:
+        with transaction.atomic():
+            rows = list(
+                PlanSubscription.objects.select_for_update(skip_locked=True, of=("self",))
+                .filter(status="active", end_date__lt=today)
+                .order_by("end_date", "id")
+                .values_list("id", "user_id", "plan_id", "end_date", "auto_renew", "plan__duration_days")[:batch_size]
+            )
+            if not rows:
+                break
+
+            ids = [row[0] for row in rows]
+            expired += PlanSubscription.objects.filter(id__in=ids).update(status="expired")
+
+            renewals = []
+            for _, user_id, plan_id, end_date, auto_renew, duration_days in rows:
+                if not auto_renew:
+                    continue
+                start_date = max(end_date + timedelta(days=1), today)
+                renewals.append(PlanSubscription(
+                    user_id=user_id,
+                    plan_id=plan_id,
+                    start_date=start_date,
+                    end_date=start_date + timedelta(days=duration_days),
+                    status="active",
+                    auto_renew=True,
+                ))
+            if renewals:
+                provision_credits(PlanSubscription.objects.bulk_create(renewals))
+                renewed += len(renewals)
+
+            # UPDATE e bulk_create não disparam sinais; os retratos de plano caem aqui.
+            phones = list(User.objects.filter(subscriptions__in=ids).values_list("phone", flat=True).distinct())
+            transaction.on_commit(lambda phones=phones: invalidate_entitlement(*phones))
+        batches += 1
+
+    elapsed = time.monotonic() - started
+    logger.info("Assinaturas: %s vencidas, %s renovadas em %s lotes (%.2fs).", expired, renewed, batches, elapsed)
+    return f"{expired} assinaturas vencidas, {renewed} renovadas em {batches} lotes ({elapsed:.2f}s)."
+
+
+@shared_task
+def reconcile_plan_credits(fix=True):
+    """Recalcula o saldo dos créditos a partir do livro e corrige as divergências."""
+    started = time.monotonic()
+    drift = reconcile_credits(fix=fix)
+    elapsed = time.monotonic() - started
+    return f"{len(drift)} créditos divergentes do livro ({elapsed:.2f}s)."
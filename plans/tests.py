@@ -1,3 +1,308 @@
-from django.test import TestCase
+from datetime import date, time, timedelta
+from unittest import mock
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from accounts.models import User
+from appointments.models import Appointment
+from barbers.models import Barber
+from core.redis_client import reset_redis
+from core.throttling import SlidingWindowThrottle
+from services.models import Service
+from .entitlements import get_entitlement, invalidate_entitlement, load_entitlement
+from .ledger import consume_credit, refund_credit, reconcile_credits
+from .models import Plan, PlanBenefit, PlanCreditEntry, PlanSubscription, PlanSubscriptionCredit
+from .provisioning import provision_credits
+from .tasks import expire_subscriptions
 
-# Create your tests here.
+
+class LoadEntitlementTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(phone="21999990001", name="Cliente")
+        self.corte = Service.objects.create(name="Corte", duration=30, price=40)
+        self.barba = Service.objects.create(name="Barba", duration=30, price=20)
+        self.plan = Plan.objects.create(name="Mensal", slug="mensal", price=100)
+        PlanBenefit.objects.create(plan=self.plan, service=self.corte, quantity=4, allowed_days=["mon", "tue"])
+        PlanBenefit.objects.create(plan=self.plan, service=self.barba, quantity=2)
+        self.start = date(2025, 1, 6)  # segunda-feira
+        self.subscription = PlanSubscription.objects.create(
+            user=self.user, plan=self.plan, start_date=self.start, end_date=self.start + timedelta(days=30)
+        )
+
+    def test_unknown_phone(self):
+        self.assertIsNone(load_entitlement("21000000000"))
+
+    def test_loads_everything_in_one_query(self):
+        PlanSubscriptionCredit.objects.filter(subscription=self.subscription, service=self.corte).update(used=3)
+
+        with self.assertNumQueries(1):
+            entitlement = load_entitlement(self.user.phone)
+
+        subscription = entitlement.subscription(self.start)
+        self.assertEqual(subscription.plan_name, "Mensal")
+        corte = subscription.benefit(self.corte.id)
+        self.assertEqual((corte.used, corte.total, corte.remaining()), (3, 4, 1))
+        self.assertTrue(corte.allows(self.start))
+        self.assertFalse(corte.allows(self.start + timedelta(days=2)))
+        self.assertEqual(corte.allowed_days_pt(), "Segunda, Terça")
+        self.assertEqual(subscription.benefit(self.barba.id).remaining(), 2)
+
+    def test_subscription_outside_dates_or_inactive(self):
+        entitlement = load_entitlement(self.user.phone)
+        self.assertIsNone(entitlement.subscription(self.start + timedelta(days=31)))
+
+        self.subscription.status = "expired"
+        self.subscription.save()
+        entitlement = load_entitlement(self.user.phone)
+        self.assertTrue(entitlement.ever_had_plan)
+        self.assertIsNone(entitlement.subscription(self.start))
+
+    def test_json_round_trip(self):
+        entitlement = load_entitlement(self.user.phone)
+        self.assertEqual(type(entitlement).from_json(entitlement.to_json()), entitlement)
+
+
+@override_settings(REDIS_URL="memory://")
+class GetEntitlementTests(TestCase):
+    def setUp(self):
+        reset_redis()
+        self.addCleanup(reset_redis)
+        self.user = User.objects.create_user(phone="21999990001", name="Cliente")
+        corte = Service.objects.create(name="Corte", duration=30, price=40)
+        plan = Plan.objects.create(name="Mensal", slug="mensal", price=100)
+        PlanBenefit.objects.create(plan=plan, service=corte, quantity=4)
+        subscription = PlanSubscription.objects.create(user=self.user, plan=plan, end_date=date(2030, 1, 1))
+        provision_credits([subscription])
+        self.credit = subscription.credits.get()
+
+    def used(self):
+        return get_entitlement(self.user.phone).subscription(timezone.localdate()).benefit(self.credit.service_id).used
+
+    def test_caches_until_invalidated(self):
+        self.assertEqual(self.used(), 0)
+        PlanSubscriptionCredit.objects.filter(pk=self.credit.pk).update(used=1)
+        self.assertEqual(self.used(), 0)
+
+        invalidate_entitlement(self.user.phone)
+        self.assertEqual(self.used(), 1)
+
+    def test_late_write_of_a_stale_read_is_not_served(self):
+        def load_then_consume(phone):
+            # O retrato é lido antes do consumo, que é gravado e invalidado antes do set no cache.
+            entitlement = load_entitlement(phone)
+            PlanSubscriptionCredit.objects.filter(pk=self.credit.pk).update(used=1)
+            invalidate_entitlement(phone)
+            return entitlement
+
+        with mock.patch("plans.entitlements.load_entitlement", side_effect=load_then_consume):
+            self.assertEqual(self.used(), 0)
+        self.assertEqual(self.used(), 1)
+
+
+class PlanPriceOriginalTests(TestCase):
+    def setUp(self):
+        self.corte = Service.objects.create(name="Corte", duration=30, price=40)
+        self.barba = Service.objects.create(name="Barba", duration=30, price=20)
+
+    def create_plan(self, slug):
+        plan = Plan.objects.create(name=slug, slug=slug, price=100)
+        PlanBenefit.objects.create(plan=plan, service=self.corte, quantity=4)
+        PlanBenefit.objects.create(plan=plan, service=self.barba, quantity=2)
+        return plan
+
+    def test_follows_benefits_and_service_price(self):
+        plan = self.create_plan("mensal")
+        plan.refresh_from_db()
+        self.assertEqual(plan.price_original, 200)
+        self.assertEqual(plan.economia, 100)
+
+        self.barba.price = 30
+        self.barba.save()
+        plan.refresh_from_db()
+        self.assertEqual(plan.price_original, 220)
+
+        plan.benefits.get(service=self.corte).delete()
+        plan.refresh_from_db()
+        self.assertEqual(plan.price_original, 60)
+
+    def test_plan_list_query_count_does_not_grow(self):
+        self.create_plan("a")
+        with CaptureQueriesContext(connection) as few:
+            self.client.get("/api/v1/plans/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for slug in "bcdef":
+                self.create_plan(slug)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get("/api/v1/plans/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 6)
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(response.json()["results"][0]["price_original"], 200)
+
+
+class ProvisionCreditsTests(TestCase):
+    def setUp(self):
+        self.corte = Service.objects.create(name="Corte", duration=30, price=40)
+        self.barba = Service.objects.create(name="Barba", duration=30, price=20)
+        self.plan = Plan.objects.create(name="Mensal", slug="mensal", price=100)
+        PlanBenefit.objects.create(plan=self.plan, service=self.corte, quantity=4)
+        PlanBenefit.objects.create(plan=self.plan, service=self.barba, quantity=2)
+
+    def test_new_subscription_gets_one_credit_per_benefit(self):
+        user = User.objects.create_user(phone="21999990001", name="Cliente")
+        subscription = PlanSubscription.objects.create(user=user, plan=self.plan, end_date=date(2030, 1, 1))
+        provision_credits([subscription])
+
+        credits = sorted(subscription.credits.values_list("service_id", "total", "used"))
+        self.assertEqual(credits, [(self.corte.id, 4, 0), (self.barba.id, 2, 0)])
+
+    def test_bulk_provisioning_is_constant_and_idempotent(self):
+        users = User.objects.bulk_create([User(phone=f"2199999{i:04d}", name=f"Cliente {i}") for i in range(50)])
+        PlanSubscription.objects.bulk_create([
+            PlanSubscription(user=user, plan=self.plan, end_date=date(2030, 1, 1)) for user in users
+        ])
+        subscriptions = PlanSubscription.objects.filter(plan=self.plan)
+
+        with self.assertNumQueries(4):
+            provision_credits(subscriptions)
+        provision_credits(subscriptions)
+
+        self.assertEqual(PlanSubscriptionCredit.objects.count(), 100)
+
+
+class ExpireSubscriptionsTests(TestCase):
+    def setUp(self):
+        corte = Service.objects.create(name="Corte", duration=30, price=40)
+        self.plan = Plan.objects.create(name="Mensal", slug="mensal", price=100, duration_days=30)
+        PlanBenefit.objects.create(plan=self.plan, service=corte, quantity=4)
+        self.today = timezone.localdate()
+
+    def subscribe(self, phone, end_date, auto_renew=False):
+        user = User.objects.create_user(phone=phone, name="Cliente")
+        return PlanSubscription.objects.create(
+            user=user, plan=self.plan, start_date=end_date - timedelta(days=30), end_date=end_date, auto_renew=auto_renew
+        )
+
+    def test_expires_lapsed_and_renews_auto_renew(self):
+        lapsed = self.subscribe("21999990001", self.today - timedelta(days=1))
+        renewing = self.subscribe("21999990002", self.today - timedelta(days=1), auto_renew=True)
+        current = self.subscribe("21999990003", self.today)
+
+        expire_subscriptions(batch_size=1)
+
+        lapsed.refresh_from_db()
+        renewing.refresh_from_db()
+        current.refresh_from_db()
+        self.assertEqual((lapsed.status, renewing.status, current.status), ("expired", "expired", "active"))
+
+        renewal = PlanSubscription.objects.get(user=renewing.user, status="active")
+        self.assertEqual((renewal.start_date, renewal.end_date), (self.today, self.today + timedelta(days=30)))
+        self.assertTrue(renewal.auto_renew)
+        self.assertEqual(list(renewal.credits.values_list("total", "used")), [(4, 0)])
+        self.assertFalse(PlanSubscription.objects.filter(user=lapsed.user, status="active").exists())
+
+    def test_respects_max_batches(self):
+        for i in range(3):
+            self.subscribe(f"2199999001{i}", self.today - timedelta(days=2))
+
+        expire_subscriptions(batch_size=1, max_batches=2)
+
+        self.assertEqual(PlanSubscription.objects.filter(status="active").count(), 1)
+
+
+class CreditLedgerTests(TestCase):
+    def setUp(self):
+        barber_user = User.objects.create_user(phone="21999990000", name="Barbeiro", role="barber")
+        self.barber = Barber.objects.create(user=barber_user)
+        self.corte = Service.objects.create(name="Corte", duration=30, price=40)
+        plan = Plan.objects.create(name="Mensal", slug="mensal", price=100)
+        PlanBenefit.objects.create(plan=plan, service=self.corte, quantity=2)
+        self.client_user = User.objects.create_user(phone="21999990001", name="Cliente")
+        self.subscription = PlanSubscription.objects.create(user=self.client_user, plan=plan, end_date=date(2030, 1, 1))
+        self.credit = self.subscription.credits.get()
+
+    def book(self, hour):
+        appointment = Appointment.objects.create(
+            client=self.client_user, barber=self.barber, service=self.corte, date=date(2029, 1, 1),
+            start_time=time(hour), end_time=time(hour, 30), status="scheduled",
+            paid_with_plan=True, plan_subscription=self.subscription,
+        )
+        return appointment, consume_credit(self.credit.id, appointment)
+
+    def test_consume_refund_and_overdraft(self):
+        first, consumed = self.book(9)
+        self.assertTrue(consumed)
+        self.assertTrue(self.book(10)[1])
+        self.assertFalse(self.book(11)[1])
+
+        first.cancel()
+        self.assertTrue(refund_credit(first))
+        self.assertFalse(refund_credit(first))
+
+        self.credit.refresh_from_db()
+        self.assertEqual(self.credit.used, 1)
+        self.assertEqual(list(self.credit.entries.order_by("id").values_list("kind", "delta")), [
+            ("consume", 1), ("consume", 1), ("refund", -1),
+        ])
+        self.assertEqual(reconcile_credits(), [])
+
+    def test_refund_needs_a_consume_entry(self):
+        appointment, _ = self.book(9)
+        PlanCreditEntry.objects.filter(appointment=appointment).delete()
+        PlanSubscriptionCredit.objects.filter(pk=self.credit.pk).update(used=0)
+
+        unpaid = Appointment.objects.create(
+            client=self.client_user, barber=self.barber, service=self.corte, date=date(2029, 1, 1),
+            start_time=time(10), end_time=time(10, 30), status="scheduled",
+            paid_with_plan=True, plan_subscription=self.subscription,
+        )
+        self.assertFalse(refund_credit(unpaid))
+        self.assertFalse(refund_credit(appointment))
+        self.assertFalse(PlanCreditEntry.objects.filter(kind="refund").exists())
+
+    def test_refund_rolls_back_when_the_balance_is_already_zero(self):
+        appointment, _ = self.book(9)
+        PlanSubscriptionCredit.objects.filter(pk=self.credit.pk).update(used=0)
+
+        self.assertFalse(refund_credit(appointment))
+        self.assertFalse(PlanCreditEntry.objects.filter(kind="refund").exists())
+        self.credit.refresh_from_db()
+        self.assertEqual(self.credit.used, 0)
+
+    def test_reconcile_fixes_drift(self):
+        self.book(9)
+        PlanSubscriptionCredit.objects.filter(pk=self.credit.pk).update(used=2)
+
+        self.assertEqual(reconcile_credits(), [(self.credit.id, 2, 1)])
+        self.credit.refresh_from_db()
+        self.assertEqual(self.credit.used, 1)
+
+
+@override_settings(REDIS_URL="memory://")
+class CheckActivePlanThrottleTests(TestCase):
+    rates = {"plan_check.ip": "5/m", "plan_check.phone": "2/m"}
+
+    def setUp(self):
+        reset_redis()
+        self.addCleanup(reset_redis)
+        patcher = mock.patch.object(SlidingWindowThrottle, "THROTTLE_RATES", self.rates)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def check(self, phone):
+        return self.client.get("/api/v1/clients/check-plan", {"phone": phone, "service_id": 1, "date": "2030-01-01"})
+
+    def test_limits_by_phone_then_by_ip(self):
+        self.assertEqual(self.check("(21) 99999-0001").status_code, 200)
+        self.assertEqual(self.check("21999990001").status_code, 200)
+
+        blocked = self.check("21 99999 0001")
+        self.assertEqual(blocked.status_code, 429)
+        self.assertGreaterEqual(int(blocked["Retry-After"]), 1)
+
+        self.assertEqual(self.check("21999990002").status_code, 200)
+        self.assertEqual(self.check("21999990003").status_code, 200)
+        self.assertEqual(self.check("21999990004").status_code, 429)
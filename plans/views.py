@@ -1,19 +1,21 @@
 from rest_framework import viewsets, permissions
-from .models import Plan
+from core.http_cache import ConditionalGetMixin
+from core.throttling import IPRateThrottle, PhoneRateThrottle
+from services.models import Service
+from .models import Plan, PlanBenefit
 from .serializers import PlanSerializer
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from accounts.models import User
 from datetime import datetime
-from plans.models import PlanSubscription, PlanSubscriptionCredit, PlanBenefit
-from appointments.models import Appointment
+from .entitlements import get_entitlement, WEEKDAY_CODES, WEEKDAY_NAMES
 
 
-class PlanViewSet(viewsets.ModelViewSet):
+class PlanViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Plan.objects.prefetch_related("benefits__service").all()
     serializer_class = PlanSerializer
     permission_classes = [permissions.AllowAny]
+    cache_models = (Plan, PlanBenefit, Service)
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -25,6 +27,8 @@ class PlanViewSet(viewsets.ModelViewSet):
 
 class CheckActivePlanView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [IPRateThrottle, PhoneRateThrottle]
+    throttle_scope = "plan_check"
 
     def get(self, request, *args, **kwargs):
         raw_phone = request.query_params.get("phone", "").strip()
@@ -46,31 +50,20 @@ class CheckActivePlanView(APIView):
         except ValueError:
             return Response({"detail": "date deve estar no formato YYYY-MM-DD."}, status=400)
 
-        try:
-            user = User.objects.get(phone=phone)
-        except User.DoesNotExist:
+        entitlement = get_entitlement(phone)
+        if entitlement is None:
             return Response({"has_plan": False, "reason": "no_plan"})
 
-        subscription = PlanSubscription.objects.filter(
-            user=user,
-            status="active",
-            start_date__lte=appointment_date,
-            end_date__gte=appointment_date
-        ).first()
-        ever_had_plan = PlanSubscription.objects.filter(user=user).exists()
-
+        subscription = entitlement.subscription(appointment_date)
         if not subscription:
-            return Response({"has_plan": False, "reason": "no_plan", "ever_had_plan": ever_had_plan})
+            return Response({"has_plan": False, "reason": "no_plan", "ever_had_plan": entitlement.ever_had_plan})
 
-        benefit = PlanBenefit.objects.filter(
-            plan=subscription.plan,
-            service_id=service_id
-        ).first()
+        benefit = subscription.benefit(service_id)
 
         if not benefit:
             return Response({
                 "has_plan": True,
-                "plan_name": subscription.plan.name,
+                "plan_name": subscription.plan_name,
                 "remaining": 0,
                 "total": 0,
                 "can_use": False,
@@ -78,49 +71,27 @@ class CheckActivePlanView(APIView):
                 "ever_had_plan": True
             })
 
-        credit = PlanSubscriptionCredit.objects.filter(
-            subscription=subscription,
-            service_id=service_id
-        ).first()
-
-        if credit:
-            used = int(credit.used)
-            total = int(credit.total or benefit.quantity)
-            remaining = int(max(total - used, 0))
-        else:
-            usable_status = ["pending", "scheduled", "completed"]
-            used = Appointment.objects.filter(
-                plan_subscription=subscription,
-                service_id=service_id,
-                paid_with_plan=True,
-                status__in=usable_status
-            ).count()
-            total = int(benefit.quantity or 0)
-            remaining = int(max(total - used, 0))
-
-        allowed_days = benefit.allowed_days or []
-        if allowed_days:
-            day_map = {0: "mon", 1: "tue", 2: "wed", 3: "thu", 4: "fri", 5: "sat", 6: "sun"}
-            pt_map = {"mon": "Segunda", "tue": "Terça", "wed": "Quarta", "thu": "Quinta", "fri": "Sexta", "sat": "Sábado", "sun": "Domingo"}
-            weekday_code = day_map[appointment_date.weekday()]
-            if weekday_code not in allowed_days:
-                allowed_days_pt = ", ".join(pt_map[d] for d in allowed_days if d in pt_map)
-                return Response({
-                    "has_plan": True,
-                    "plan_name": subscription.plan.name,
-                    "remaining": remaining,
-                    "total": total,
-                    "can_use": False,
-                    "reason": "not_allowed_day",
-                    "allowed_days_pt": allowed_days_pt,
-                    "weekday_pt": pt_map.get(weekday_code, ""),
-                    "ever_had_plan": True
-                })
+        total = benefit.total
+        # Sem linha de crédito o benefício não pode ser usado (ver provision_plan_credits).
+        remaining = benefit.remaining() if benefit.credit_id is not None else 0
+
+        if not benefit.allows(appointment_date):
+            return Response({
+                "has_plan": True,
+                "plan_name": subscription.plan_name,
+                "remaining": remaining,
+                "total": total,
+                "can_use": False,
+                "reason": "not_allowed_day",
+                "allowed_days_pt": benefit.allowed_days_pt(),
+                "weekday_pt": WEEKDAY_NAMES[WEEKDAY_CODES[appointment_date.weekday()]],
+                "ever_had_plan": True
+            })
 
         if remaining <= 0:
             return Response({
                 "has_plan": True,
-                "plan_name": subscription.plan.name,
+                "plan_name": subscription.plan_name,
                 "remaining": remaining,
                 "total": total,
                 "can_use": False,
@@ -130,7 +101,7 @@ class CheckActivePlanView(APIView):
 
         return Response({
             "has_plan": True,
-            "plan_name": subscription.plan.name,
+            "plan_name": subscription.plan_name,
             "remaining": remaining,
             "total": total,
             "can_use": True,
@@ -0,0 +1,9 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core.http_cache import bump_model_version
+from .models import Service
+
+
+@receiver([post_save, post_delete], sender=Service)
+def bump_service_catalog_version(sender, instance, **kwargs):
+    bump_model_version(Service)
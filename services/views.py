@@ -1,9 +1,11 @@
 from rest_framework import viewsets
+from core.http_cache import ConditionalGetMixin
 from .models import Service
 from .serializers import ServiceSerializer
 
 
-class ServiceViewSet(viewsets.ReadOnlyModelViewSet):
+class ServiceViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Service.objects.filter(is_active=True)
     serializer_class = ServiceSerializer
     pagination_class = None
+    cache_models = (Service,)